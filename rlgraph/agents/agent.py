@@ -31,6 +31,7 @@ from rlgraph.spaces import Space, ContainerSpace
 from rlgraph.utils.decorators import rlgraph_api, graph_fn
 from rlgraph.utils.input_parsing import parse_execution_spec, parse_observe_spec, parse_update_spec, \
     parse_value_function_spec
+from rlgraph.utils.numpy import n_step_returns
 from rlgraph.utils.specifiable import Specifiable
 
 if get_backend() == "tf":
@@ -220,6 +221,31 @@ class Agent(Specifiable):
         del self.next_states_buffer[env_id]  # = ([] for _ in range(len(self.flat_state_space)))
         del self.terminals_buffer[env_id]  # = []
 
+    def _remove_from_env_buffers(self, env_id, num_records):
+        """
+        Removes the first records from an environment buffer, e.g. after inserting them while the remaining ones
+        still need subsequent records for n-step post-processing.
+
+        Args:
+            env_id (str): Environment id.
+            num_records (int): Number of records to remove.
+        """
+        if self.flat_state_space is not None:
+            for states, next_states in zip(self.states_buffer[env_id], self.next_states_buffer[env_id]):
+                del states[:num_records]
+                del next_states[:num_records]
+        else:
+            del self.states_buffer[env_id][:num_records]
+            del self.next_states_buffer[env_id][:num_records]
+        if self.flat_action_space is not None:
+            for actions in self.actions_buffer[env_id]:
+                del actions[:num_records]
+        else:
+            del self.actions_buffer[env_id][:num_records]
+        del self.internals_buffer[env_id][:num_records]
+        del self.rewards_buffer[env_id][:num_records]
+        del self.terminals_buffer[env_id][:num_records]
+
     def define_graph_api(self, *args, **kwargs):
         """
         Can be used to specify and then `self.define_api_method` the Agent's CoreComponent's API methods.
@@ -433,32 +459,55 @@ class Agent(Specifiable):
 
             buffer_is_full = len(self.rewards_buffer[env_id]) >= self.observe_spec["buffer_size"]
 
-            # If the buffer (per environment) is full OR the episode was aborted:
-            # Change terminal of last record artificially to True, insert and flush the buffer.
+            # If the buffer (per environment) is full OR the episode was aborted: Insert and flush the buffer.
             if buffer_is_full or self.terminals_buffer[env_id][-1]:
-                self.terminals_buffer[env_id][-1] = True
-
-                # TODO: Apply n-step post-processing if necessary.
-                if self.flat_action_space is not None:
-                    actions_ = {}
-                    for i, key in enumerate(self.flat_action_space.keys()):
-                        actions_[key] = np.asarray(self.actions_buffer[env_id][i])
-                        # Squeeze, but do not squeeze (1,) to ().
-                        if len(actions_[key]) > 1:
-                            actions_[key] = np.squeeze(actions_[key])
-                        else:
-                            actions_[key] = np.reshape(actions_[key], (1,))
+                n_step = self.observe_spec["n_step"]
+                # Without n-step post-processing, change terminal of last record artificially to True.
+                if n_step == 1:
+                    self.terminals_buffer[env_id][-1] = True
+                rewards_ = np.asarray(self.rewards_buffer[env_id])
+                next_states_ = np.asarray(self.next_states_buffer[env_id])
+                terminals_ = np.asarray(self.terminals_buffer[env_id])
+                num_records = len(rewards_)
+
+                # N-step post-processing. If the episode is still running, the last n - 1 records do not see their
+                # full horizon yet: They are kept in the buffer for the next flush.
+                if n_step > 1:
+                    rewards_, next_indices, terminals_ = n_step_returns(rewards_, terminals_, n_step, self.discount)
+                    num_records = len(rewards_)
+                    # Container state buffers hold one list per flat state component.
+                    next_states_ = np.take(next_states_, next_indices, axis=1 if self.flat_state_space is not None
+                                           else 0)
+
+                if num_records > 0:
+                    if self.flat_action_space is not None:
+                        actions_ = {}
+                        for i, key in enumerate(self.flat_action_space.keys()):
+                            actions_[key] = np.asarray(self.actions_buffer[env_id][i][:num_records])
+                            # Squeeze, but do not squeeze (1,) to ().
+                            if len(actions_[key]) > 1:
+                                actions_[key] = np.squeeze(actions_[key])
+                            else:
+                                actions_[key] = np.reshape(actions_[key], (1,))
+                    else:
+                        actions_ = np.asarray(self.actions_buffer[env_id][:num_records])
+                    if self.flat_state_space is not None:
+                        states_ = np.asarray([states[:num_records] for states in self.states_buffer[env_id]])
+                    else:
+                        states_ = np.asarray(self.states_buffer[env_id][:num_records])
+
+                    self._observe_graph(
+                        preprocessed_states=states_,
+                        actions=actions_,
+                        internals=np.asarray(self.internals_buffer[env_id][:num_records]),
+                        rewards=rewards_,
+                        next_states=next_states_,
+                        terminals=terminals_
+                    )
+                if num_records == len(self.rewards_buffer[env_id]):
+                    self.reset_env_buffers(env_id)
                 else:
-                    actions_ = np.asarray(self.actions_buffer[env_id])
-                self._observe_graph(
-                    preprocessed_states=np.asarray(self.states_buffer[env_id]),
-                    actions=actions_,
-                    internals=np.asarray(self.internals_buffer[env_id]),
-                    rewards=np.asarray(self.rewards_buffer[env_id]),
-                    next_states=np.asarray(self.next_states_buffer[env_id]),
-                    terminals=np.asarray(self.terminals_buffer[env_id])
-                )
-                self.reset_env_buffers(env_id)
+                    self._remove_from_env_buffers(env_id, num_records)
         else:
             if not batched:
                 preprocessed_states = self.preprocessed_state_space.force_batch(preprocessed_states)
@@ -17,6 +17,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from collections import deque
+
 import numpy as np
 from rlgraph.agents import DQNAgent
 from rlgraph.utils import util
@@ -123,15 +125,11 @@ class ApexAgent(DQNAgent):
             store_last_q_table=store_last_q_table,
         )
         self.num_updates = 0
+        # Sizes of the batches enqueued via `prefetch_batch` and not yet consumed.
+        self.prefetched_batch_sizes = deque()
 
     def update(self, batch=None):
-        # In apex, syncing is based on num steps trained, not steps sampled.
-        sync_call = None
-        # Apex uses train time steps for syncing.
-        self.steps_since_target_net_sync += len(batch["terminals"])
-        if self.steps_since_target_net_sync >= self.update_spec["sync_interval"]:
-            sync_call = "sync_target_qnet"
-            self.steps_since_target_net_sync = 0
+        sync_call = self._get_sync_call(len(batch["terminals"]))
         return_ops = [0, 1]
         self.num_updates += 1
         if batch is None:
@@ -152,13 +150,7 @@ class ApexAgent(DQNAgent):
             return ret[1]
         else:
             # Add some additional return-ops to pull (left out normally for performance reasons).
-            pps_dtype = self.preprocessed_state_space.dtype
-            batch_input = [np.asarray(batch["states"], dtype=util.convert_dtype(dtype=pps_dtype, to='np')),
-                           batch["actions"],
-                           batch["rewards"], batch["terminals"],
-                           np.asarray(batch["next_states"], dtype=util.convert_dtype(dtype=pps_dtype, to='np')),
-                           batch["importance_weights"],
-                           True]
+            batch_input = self._get_external_batch_input(batch)
             ret = self.graph_executor.execute(("update_from_external_batch", batch_input), sync_call)
             # Remove unnecessary return dicts (e.g. sync-op).
             if isinstance(ret, dict):
@@ -174,5 +166,59 @@ class ApexAgent(DQNAgent):
             # Return [1]=total loss, [2]=loss-per-item (skip [0]=update noop).
             return ret[1], ret[2]
 
+    @property
+    def input_prefetching(self):
+        """
+        Returns:
+            bool: Whether external batches can be prefetched via `prefetch_batch` (requires `input_prefetching`
+                for "update_from_external_batch" in the execution spec).
+        """
+        has_input_queue = getattr(self.graph_executor, "has_input_queue", None)
+        return has_input_queue is not None and has_input_queue("update_from_external_batch")
+
+    def prefetch_batch(self, batch):
+        """
+        Enqueues an external batch into the in-graph input queue of `update_from_external_batch` without waiting
+        for the copy to finish. Batches are consumed by `update_from_prefetched_batch` in FIFO order.
+
+        Args:
+            batch (dict): External batch, see `update`.
+        """
+        self.prefetched_batch_sizes.append(len(batch["terminals"]))
+        self.graph_executor.prefetch(("update_from_external_batch", self._get_external_batch_input(batch)))
+
+    def update_from_prefetched_batch(self):
+        """
+        Updates from the oldest batch enqueued via `prefetch_batch` without feeding it. Blocks until that batch
+        has been enqueued.
+
+        Returns:
+            tuple: Total loss and loss per item.
+        """
+        sync_call = self._get_sync_call(self.prefetched_batch_sizes.popleft())
+        self.num_updates += 1
+        ret = self.graph_executor.execute(("update_from_external_batch", None), sync_call)
+        # Remove unnecessary return dicts (e.g. sync-op).
+        if isinstance(ret, dict):
+            ret = ret["update_from_external_batch"]
+        return ret[1], ret[2]
+
+    def _get_sync_call(self, num_records):
+        # In apex, syncing is based on num steps trained, not steps sampled.
+        self.steps_since_target_net_sync += num_records
+        if self.steps_since_target_net_sync >= self.update_spec["sync_interval"]:
+            self.steps_since_target_net_sync = 0
+            return "sync_target_qnet"
+        return None
+
+    def _get_external_batch_input(self, batch):
+        pps_dtype = self.preprocessed_state_space.dtype
+        return [np.asarray(batch["states"], dtype=util.convert_dtype(dtype=pps_dtype, to='np')),
+                batch["actions"],
+                batch["rewards"], batch["terminals"],
+                np.asarray(batch["next_states"], dtype=util.convert_dtype(dtype=pps_dtype, to='np')),
+                batch["importance_weights"],
+                True]
+
     def __repr__(self):
         return "ApexAgent"
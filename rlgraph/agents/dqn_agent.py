@@ -18,7 +18,9 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
+from six.moves import xrange as range_
 
+from rlgraph import get_backend
 from rlgraph.agents import Agent
 from rlgraph.components import Memory, PrioritizedReplay, DQNLossFunction, ContainerMerger, ContainerSplitter
 from rlgraph.spaces import FloatBox, BoolBox
@@ -26,6 +28,11 @@ from rlgraph.utils import RLGraphError
 from rlgraph.utils.decorators import rlgraph_api
 from rlgraph.utils.util import strip_list
 
+if get_backend() == "tf":
+    import tensorflow as tf
+elif get_backend() == "pytorch":
+    import torch
+
 
 class DQNAgent(Agent):
     """
@@ -166,7 +173,9 @@ class DQNAgent(Agent):
             next_states=preprocessed_state_space,
             preprocessed_next_states=preprocessed_state_space,
             importance_weights=weight_space,
-            apply_postprocessing=bool
+            apply_postprocessing=bool,
+            num_steps=int,
+            steps_since_sync=int
         ))
         if self.value_function is not None:
             self.input_spaces["value_function_weights"] = "variables:{}".format(self.value_function.scope),
@@ -334,6 +343,75 @@ class DQNAgent(Agent):
                 step_op = root._graph_fn_training_step(step_op)
                 return step_op, loss, loss_per_item, q_values_s
 
+        # Learn from memory for several steps within one graph call (not supported by multi-GPU strategies).
+        if self.execution_spec["device_strategy"] != "multi_gpu_sync":
+            @rlgraph_api(component=self.root_component)
+            def _graph_fn_update_from_memory_steps(root, num_steps, steps_since_sync):
+                """
+                Runs `num_steps` sample-from-memory-and-update iterations in a single loop. The steps since the last
+                target net sync are advanced by the update interval per iteration and the target net is synced
+                (after that iteration's update) whenever they reach the sync interval.
+
+                Returns:
+                    tuple:
+                        - The losses of all iterations [num_steps].
+                        - The losses per item of all iterations [num_steps, batch size].
+                        - The steps since the last target net sync after the last iteration.
+                """
+                update_interval = agent.update_spec["update_interval"]
+                sync_interval = agent.update_spec["sync_interval"]
+
+                if get_backend() == "tf":
+                    def update_step(index_, steps_since_sync_, losses_, losses_per_item_):
+                        out = root.update_from_memory(True)
+                        # Step op and, for prioritized memories, the priority update op.
+                        update_ops = [out[0]] + list(out[5:])
+                        loss, loss_per_item = out[1], out[2]
+                        loss_per_item.set_shape((agent.update_spec["batch_size"],))
+
+                        def sync_target_net():
+                            with tf.control_dependencies(update_ops):
+                                sync_op = root.sync_target_qnet()
+                            with tf.control_dependencies([sync_op]):
+                                return tf.zeros_like(steps_since_sync_)
+
+                        def no_sync():
+                            return steps_since_sync_ + update_interval
+
+                        with tf.control_dependencies(update_ops):
+                            steps_since_sync_ = tf.cond(
+                                pred=steps_since_sync_ + update_interval >= sync_interval,
+                                true_fn=sync_target_net,
+                                false_fn=no_sync
+                            )
+                            return index_ + 1, steps_since_sync_, losses_.write(index_, loss), \
+                                losses_per_item_.write(index_, loss_per_item)
+
+                    _, steps_since_sync, losses, losses_per_item = tf.while_loop(
+                        cond=lambda index_, *_: index_ < num_steps,
+                        body=update_step,
+                        loop_vars=[
+                            0,
+                            steps_since_sync,
+                            tf.TensorArray(dtype=tf.float32, size=num_steps),
+                            tf.TensorArray(dtype=tf.float32, size=num_steps)
+                        ],
+                        parallel_iterations=1
+                    )
+                    return losses.stack(), losses_per_item.stack(), steps_since_sync
+
+                elif get_backend() == "pytorch":
+                    losses, losses_per_item = [], []
+                    for _ in range_(int(num_steps)):
+                        out = root.update_from_memory(True)
+                        losses.append(out[1])
+                        losses_per_item.append(out[2])
+                        steps_since_sync += update_interval
+                        if steps_since_sync >= sync_interval:
+                            root.sync_target_qnet()
+                            steps_since_sync = 0
+                    return torch.stack(losses), torch.stack(losses_per_item), steps_since_sync
+
         @rlgraph_api(component=self.root_component)
         def get_td_loss(root, preprocessed_states, actions, rewards,
                         terminals, preprocessed_next_states, importance_weights):
@@ -399,7 +477,21 @@ class DQNAgent(Agent):
     def _observe_graph(self, preprocessed_states, actions, internals, rewards, next_states, terminals):
         self.graph_executor.execute(("insert_records", [preprocessed_states, actions, rewards, next_states, terminals]))
 
-    def update(self, batch=None):
+    def update(self, batch=None, num_steps=1):
+        """
+        Args:
+            batch (Optional[dict]): Optional external data batch to use for update. If None, samples from the memory.
+            num_steps (int): Number of sample-from-memory-and-update iterations to run in a single graph call (only
+                if `batch` is None). Target net syncs due within these iterations are performed inside the graph.
+                Storing the last memory batch or Q-table is not supported for `num_steps` > 1.
+
+        Returns:
+            tuple: The loss and the loss per item. For `num_steps` > 1, the losses [num_steps] and losses per item
+                [num_steps, batch size] of all iterations.
+        """
+        if batch is None and num_steps > 1:
+            return self._update_from_memory_steps(num_steps)
+
         # Should we sync the target net?
         self.steps_since_target_net_sync += self.update_spec["update_interval"]
         if self.steps_since_target_net_sync >= self.update_spec["sync_interval"]:
@@ -458,6 +550,16 @@ class DQNAgent(Agent):
         # 2=loss per item for external update, records for update from memory
         return ret[1], ret[2]
 
+    def _update_from_memory_steps(self, num_steps):
+        if "update_from_memory_steps" not in self.root_component.api_methods:
+            raise RLGraphError("ERROR: Multi-step updates are not supported with the 'multi_gpu_sync' strategy!")
+        # [0]=losses, [1]=losses-per-item, [2]=steps since last target net sync.
+        ret = self.graph_executor.execute(
+            ("update_from_memory_steps", [num_steps, self.steps_since_target_net_sync])
+        )
+        self.steps_since_target_net_sync = int(ret[2])
+        return ret[0], ret[1]
+
     def reset(self):
         """
         Resets our preprocessor, but only if it contains stateful PreprocessLayer Components (meaning
@@ -24,7 +24,8 @@ from rlgraph.components.component import Component
 from rlgraph.components.neural_networks.actor_component import ActorComponent
 from rlgraph.environments.environment import Environment
 from rlgraph.utils.ops import DataOpTuple, DataOpDict, flatten_op, unflatten_op
-from rlgraph.spaces import Space, Dict
+from rlgraph.spaces import Space, Dict, BoolBox
+from rlgraph.spaces.box_space import BoxSpace
 from rlgraph.utils.decorators import rlgraph_api
 from rlgraph.utils.specifiable_server import SpecifiableServer
 
@@ -37,6 +38,10 @@ class EnvironmentStepper(Component):
     """
     A Component that takes an Environment object, a PreprocessorStack and a Policy to step
     n times through the environment, each time picking actions depending on the states that the environment produces.
+
+    With `num_environments` > 1, a vector of environments is stepped in lock-step and the ActorComponent computes
+    the actions for all of them in one batched pass. All outputs then have a batch rank of size `num_environments`
+    following the time rank.
     """
 
     def __init__(self, environment_spec, actor_component_spec, num_steps=20,
@@ -45,7 +50,7 @@ class EnvironmentStepper(Component):
                  add_action_probs=False, action_probs_space=None,
                  add_action=False, add_reward=False,
                  add_previous_action_to_state=False, add_previous_reward_to_state=False,
-                 scope="environment-stepper",
+                 shared_memory=False, num_environments=1, scope="environment-stepper",
                  **kwargs):
         """
         Args:
@@ -80,6 +85,11 @@ class EnvironmentStepper(Component):
             add_previous_reward_to_state (bool): Whether to add the previous reward as another input channel to the
                 ActionComponent's (NN's) input at each step. This is only possible if the state space is already a Dict.
                 It will be added under the key "previous_reward". Default: False.
+            shared_memory (bool): Whether the SpecifiableServer running the Environment should return states,
+                rewards and terminals through shared memory instead of pickling them through a pipe.
+                Default: False.
+            num_environments (int): The number of environments to step as a batch. All environments are hosted by
+                the same SpecifiableServer (as a SequentialVectorEnv). Default: 1.
         """
         super(EnvironmentStepper, self).__init__(scope=scope, **kwargs)
 
@@ -147,14 +157,28 @@ class EnvironmentStepper(Component):
                 "ERROR: If `add_action_probs` is True, must provide an `action_probs_space`!"
 
         self.environment_spec = environment_spec
+        self.num_environments = num_environments
+        if self.num_environments > 1:
+            server_spec = dict(
+                type="sequential-vector-env", num_environments=self.num_environments, env_spec=environment_spec
+            )
+            server_state_spaces = [self._batched_server_space(space) for space in self.state_space_env_list]
+            step_flow_spaces = server_state_spaces + [
+                self._batched_server_space(self.reward_space), BoolBox(shape=(self.num_environments,))
+            ]
+        else:
+            server_spec = environment_spec
+            server_state_spaces = self.state_space_env_list
+            step_flow_spaces = self.state_space_env_list + [self.reward_space, bool]
         self.environment_server = SpecifiableServer(
             specifiable_class=Environment,
-            spec=environment_spec,
+            spec=server_spec,
             output_spaces=dict(
-                step_flow=self.state_space_env_list + [self.reward_space, bool],
-                reset_flow=self.state_space_env_list
+                step_flow=step_flow_spaces,
+                reset_flow=server_state_spaces
             ),
-            shutdown_method="terminate"
+            shutdown_method="terminate",
+            shared_memory=shared_memory
         )
         # Add the sub-components.
         self.actor_component = ActorComponent.from_spec(actor_component_spec)  # type: ActorComponent
@@ -176,15 +200,17 @@ class EnvironmentStepper(Component):
         self.time_step = self.get_variable(
             name="time-step", dtype="int32", initializer=0, trainable=False, local=True, use_resource=True
         )
+        # Multiple environments: Current states are batched.
+        batch_rank_kwargs = dict(add_batch_rank=self.num_environments) if self.num_environments > 1 else dict()
         self.current_state = self.get_variable(
             name="current-state", from_space=self.state_space_actor, initializer=0, flatten=True, trainable=False,
-            local=True, use_resource=True
+            local=True, use_resource=True, **batch_rank_kwargs
         )
         if self.has_rnn:
             self.current_internal_states = self.get_variable(
                 name="current-internal-states", from_space=self.internal_states_space,
                 initializer=0.0, flatten=True, trainable=False, local=True, use_resource=True,
-                add_batch_rank=1
+                add_batch_rank=self.num_environments
             )
 
     @rlgraph_api(returns=1)
@@ -205,8 +231,12 @@ class EnvironmentStepper(Component):
                     # Add a simple (size 1) batch rank to the state so it'll pass through the NN.
                     # - Also have to add a time-rank for RNN processing.
                     expanded = state[i]
-                    for _ in range(1 if self.has_rnn is False else 2):
-                        expanded = tf.expand_dims(input=expanded, axis=0)
+                    if self.num_environments == 1:
+                        for _ in range(1 if self.has_rnn is False else 2):
+                            expanded = tf.expand_dims(input=expanded, axis=0)
+                    # States of multiple environments are already batched, only add the time-rank.
+                    elif self.has_rnn is True:
+                        expanded = tf.expand_dims(input=expanded, axis=1)
                     # Make None so it'll be recognized as batch-rank by the auto-Space detector.
                     flat_state[flat_key] = tf.placeholder_with_default(
                         input=expanded, shape=(None,) + ((None,) if self.has_rnn is True else ()) +
@@ -231,7 +261,15 @@ class EnvironmentStepper(Component):
                 current_internal_states = out.get("last_internal_states")
 
                 # Strip the batch (and maybe time) ranks again from the action in case the Env doesn't like it.
-                a_no_extra_ranks = a[0, 0] if self.has_rnn is True else a[0]
+                if self.num_environments == 1:
+                    a_no_extra_ranks = a[0, 0] if self.has_rnn is True else a[0]
+                    action_probs = None if action_probs is None else \
+                        (action_probs[0][0] if self.has_rnn is True else action_probs[0])
+                # Keep the batch rank for multiple environments.
+                else:
+                    a_no_extra_ranks = a[:, 0] if self.has_rnn is True else a
+                    action_probs = None if action_probs is None else \
+                        (action_probs[:, 0] if self.has_rnn is True else action_probs)
                 # Step through the Env and collect next state (tuple!), reward and terminal as single values
                 # (not batched).
                 out = self.environment_server.step_flow(a_no_extra_ranks)
@@ -250,27 +288,27 @@ class EnvironmentStepper(Component):
                 ret = [t_, s_] + \
                     ([a_no_extra_ranks] if self.add_action else []) + \
                     ([r] if self.add_reward else []) + \
-                    ([(action_probs[0][0] if self.has_rnn is True else action_probs[0])] if
-                     self.add_action_probs is True else []) + \
+                    ([action_probs] if self.add_action_probs is True else []) + \
                     ([tuple(current_internal_states)] if self.has_rnn is True else [])
 
                 return tuple(ret)
 
             # Initialize the tf.scan run.
+            batch_shape = (self.num_environments,) if self.num_environments > 1 else ()
             initializer = [
                 # terminals
-                tf.zeros(shape=(), dtype=tf.bool),
+                tf.zeros(shape=batch_shape, dtype=tf.bool),
                 # current (raw) state (flattened components if ContainerSpace).
                 tuple(map(lambda x: x.read_value(), self.current_state.values()))
             ]
             # Append actions and rewards if needed.
             if self.add_action:
-                initializer.append(tf.zeros(shape=self.action_space.shape, dtype=self.action_space.dtype))
+                initializer.append(tf.zeros(shape=batch_shape + self.action_space.shape, dtype=self.action_space.dtype))
             if self.add_reward:
-                initializer.append(tf.zeros(shape=self.reward_space.shape))
+                initializer.append(tf.zeros(shape=batch_shape + self.reward_space.shape))
             # Append action probs if needed.
             if self.add_action_probs is True:
-                initializer.append(tf.zeros(shape=self.action_probs_space.shape))
+                initializer.append(tf.zeros(shape=batch_shape + self.action_probs_space.shape))
             # Append internal states if needed.
             if self.current_internal_states is not None:
                 initializer.append(tuple(
@@ -302,9 +340,14 @@ class EnvironmentStepper(Component):
                 # Remove batch rank from internal states again.
                 internal_states_wo_batch = list()
                 for i, var_ref in enumerate(self.current_internal_states.values()):  #range(len(step_results[slot])):
-                    # 1=batch axis (which has dim=1); 0=time axis.
-                    internal_states_component = tf.squeeze(step_results[slot][i], axis=1)
-                    assigns.append(self.assign_variable(var_ref, internal_states_component[-1:]))
+                    if self.num_environments == 1:
+                        # 1=batch axis (which has dim=1); 0=time axis.
+                        internal_states_component = tf.squeeze(step_results[slot][i], axis=1)
+                        assigns.append(self.assign_variable(var_ref, internal_states_component[-1:]))
+                    # Multiple environments: Keep the batch axis.
+                    else:
+                        internal_states_component = step_results[slot][i]
+                        assigns.append(self.assign_variable(var_ref, internal_states_component[-1]))
                     internal_states_wo_batch.append(internal_states_component)
                 step_results[slot] = tuple(internal_states_wo_batch)
 
@@ -315,10 +358,11 @@ class EnvironmentStepper(Component):
                 for slot in range(len(step_results)):
                     first_values, rest_values = initializer[slot], step_results[slot]
                     # Internal states need a slightly different concatenating as the batch rank is missing.
-                    if self.current_internal_states is not None and slot == len(step_results) - 1:
+                    if self.current_internal_states is not None and slot == len(step_results) - 1 and \
+                            self.num_environments == 1:
                         full_results.append(nest.map_structure(self._concat, first_values, rest_values))
-                    # States need concatenating (first state needed).
-                    elif slot == 1:
+                    # States (and batched internal states) need concatenating (first state needed).
+                    elif slot == 1 or (self.current_internal_states is not None and slot == len(step_results) - 1):
                         full_results.append(nest.map_structure(
                             lambda first, rest: tf.concat([[first], rest], axis=0), first_values, rest_values)
                         )
@@ -342,6 +386,13 @@ class EnvironmentStepper(Component):
 
             return full_results
 
+    def _batched_server_space(self, space):
+        """
+        Returns a Space for the SpecifiableServer's return values with a leading rank of size `num_environments`.
+        The server only uses dtype and shape, so bounds are not kept.
+        """
+        return BoxSpace(low=0, high=0, shape=(self.num_environments,) + tuple(space.shape), dtype=space.dtype)
+
     @staticmethod
     def _concat(first, rest):
         """
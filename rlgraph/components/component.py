@@ -32,6 +32,7 @@ from rlgraph.utils.decorators import rlgraph_api, component_api_registry, compon
 from rlgraph.utils.rlgraph_errors import RLGraphError, RLGraphObsoletedError
 from rlgraph.utils.specifiable import Specifiable
 from rlgraph.utils.ops import DataOpDict, FLAT_TUPLE_OPEN, FLAT_TUPLE_CLOSE, TraceContext
+from rlgraph.utils.profiler import Profiler
 from rlgraph.utils import util
 
 if get_backend() == "tf":
@@ -59,10 +60,8 @@ class Component(Specifiable):
     A component also has a variable registry, the ability to save the component's structure and variable-values to disk,
     and supports adding its graph_fns to the overall computation graph.
     """
-    call_count = 0
-
-    # List of tuples (method_name, runtime)
-    call_times = []
+    # Profiler for define-by-run API-method and graph_fn calls (disabled by default).
+    profiler = Profiler()
 
     def __init__(self, *sub_components, **kwargs):
         """
@@ -1327,10 +1326,9 @@ class Component(Specifiable):
     @staticmethod
     def reset_profile():
         """
-        Sets profiling values to 0.
+        Drops all collected profiling data.
         """
-        Component.call_count = 0
-        Component.call_times = []
+        Component.profiler.reset()
 
     def __str__(self):
         return "{}('{}' api={})".format(type(self).__name__, self.name, str(list(self.api_methods.keys())))
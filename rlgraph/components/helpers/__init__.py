@@ -17,6 +17,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from rlgraph.components.helpers.fused_preprocessor import FusedPreprocessor
+from rlgraph.components.helpers.mem_frame_storage import MemFrameStorage
 from rlgraph.components.helpers.mem_segment_tree import MemSegmentTree
 from rlgraph.components.helpers.segment_tree import SegmentTree
 from rlgraph.components.helpers.softmax import SoftMax
@@ -26,5 +28,5 @@ from rlgraph.components.helpers.clipping import Clipping
 from rlgraph.components.helpers.generalized_advantage_estimation import GeneralizedAdvantageEstimation
 
 
-__all__ = ["MemSegmentTree", "SegmentTree", "SoftMax", "VTraceFunction", "SequenceHelper",
-           "GeneralizedAdvantageEstimation", "Clipping"]
+__all__ = ["FusedPreprocessor", "MemFrameStorage", "MemSegmentTree", "SegmentTree", "SoftMax", "VTraceFunction",
+           "SequenceHelper", "GeneralizedAdvantageEstimation", "Clipping"]
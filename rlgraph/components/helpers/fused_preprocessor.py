@@ -0,0 +1,348 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import cv2
+import numpy as np
+from six.moves import xrange as range_
+
+from rlgraph.components.layers.preprocessing import GrayScale, ImageCrop, ImageResize, ConvertType, Multiply, \
+    Divide, Sequence
+from rlgraph.spaces import ContainerSpace
+from rlgraph.utils.rlgraph_errors import RLGraphError
+from rlgraph.utils.util import convert_dtype
+
+
+class FusedPreprocessor(object):
+    """
+    Runs the python-backend `PreprocessorStack`s of several environments as one fused pipeline.
+
+    The stack is planned once from the input space: Crops become views, gray-scaling and resizing write into their
+    output buffers via cv2's `dst` argument, consecutive type conversions, multiplications and divisions are merged
+    into in-place passes over one buffer and frame sequencing shifts a per-environment output buffer in place. All
+    buffers are preallocated with a leading environment rank. Layers without a fused implementation run their
+    regular python graph function (per environment, on that environment's own stack) and are copied into a buffer.
+
+    Inputs are processed like a batch of size 1 by the layer-by-layer path.
+    """
+    def __init__(self, preprocessor_stacks, in_space):
+        """
+        Args:
+            preprocessor_stacks (List[PreprocessorStack]): One built python-backend stack per environment. Only used
+                for their configuration and for layers that are not fused.
+            in_space (Space): The (non-container) input space, with or without batch rank.
+        """
+        if isinstance(in_space, ContainerSpace):
+            raise RLGraphError("FusedPreprocessor does not support container input spaces ({}).".format(in_space))
+        self.preprocessor_stacks = preprocessor_stacks
+        self.num_environments = len(preprocessor_stacks)
+        self.in_shape = tuple(in_space.shape)
+
+        self.stages = []
+        shape, dtype = self.in_shape, np.dtype(convert_dtype(in_space.dtype, to="np"))
+        for scope, layer in preprocessor_stacks[0].sub_components.items():
+            if scope in ["time-rank-folder_", "time-rank-unfolder_"]:
+                continue
+            stage = self._plan_layer(scope, layer, shape, dtype)
+            # Merge into the previous elementwise stage if the dtype does not change in between.
+            if isinstance(stage, _ElementwiseStage) and len(self.stages) > 0 and \
+                    isinstance(self.stages[-1], _ElementwiseStage) and self.stages[-1].dtype == stage.dtype:
+                self.stages[-1].ops.extend(stage.ops)
+            else:
+                self.stages.append(stage)
+            shape, dtype = stage.shape, stage.dtype
+        # Views do not own memory -> Copy into an output buffer.
+        if len(self.stages) == 0 or self.stages[-1].buffer is None:
+            self.stages.append(_ElementwiseStage(self.num_environments, shape, dtype, ops=[]))
+        self.output_buffer = self.stages[-1].buffer
+        self.out_shape = shape
+
+        self.reset()
+
+    def _plan_layer(self, scope, layer, shape, dtype):
+        """
+        Creates the stage executing one layer.
+
+        Args:
+            scope (str): The layer's scope within the stack.
+            layer (PreprocessLayer): The layer (of the first environment's stack).
+            shape (tuple): Per-environment input shape (without batch rank).
+            dtype (np.dtype): Input dtype.
+
+        Returns:
+            _Stage: The stage.
+        """
+        rank = len(shape)
+        if isinstance(layer, ImageCrop) and rank in [2, 3]:
+            return _CropStage(layer, shape, dtype)
+        # cv2 gray-scaling expects 3 color channels, resizing at most one channel rank.
+        elif isinstance(layer, GrayScale) and rank == 3 and shape[-1] == 3:
+            return _GrayScaleStage(self.num_environments, layer, shape, dtype)
+        elif isinstance(layer, ImageResize) and rank in [2, 3]:
+            return _ResizeStage(self.num_environments, layer, shape, dtype)
+        elif isinstance(layer, (ConvertType, Multiply, Divide)):
+            if isinstance(layer, ConvertType):
+                out_dtype = np.dtype(convert_dtype(layer.to_dtype, to="np"))
+                op = _cast_op
+            elif isinstance(layer, Multiply):
+                out_dtype = (np.zeros(shape=(1,), dtype=dtype) * layer.factor).dtype
+                op = _binary_op(np.multiply, layer.factor)
+            else:
+                out_dtype = (np.zeros(shape=(1,), dtype=dtype) / layer.divisor).dtype
+                op = _binary_op(np.true_divide, layer.divisor)
+            return _ElementwiseStage(self.num_environments, shape, out_dtype, ops=[op])
+        # Transposed output sequences are not fused.
+        elif isinstance(layer, Sequence) and rank > 0 and not \
+                (layer.in_data_format == "channels_last" and layer.out_data_format == "channels_first"):
+            return _SequenceStage(self.num_environments, layer, shape, dtype)
+        return _FallbackStage(
+            [stack.sub_components[scope] for stack in self.preprocessor_stacks], shape, dtype
+        )
+
+    def preprocess(self, inputs, index=0):
+        """
+        Preprocesses the input of one environment.
+
+        Args:
+            inputs (ndarray): The environment's input, either without batch rank or with a batch rank of size 1.
+            index (int): The environment's index.
+
+        Returns:
+            ndarray: The preprocessed input (with batch rank if `inputs` had one). This is a view into the output
+                buffer and will be overwritten by the next call for the same environment.
+        """
+        inputs = np.asarray(inputs)
+        has_batch_rank = inputs.ndim > len(self.in_shape)
+        if has_batch_rank:
+            if inputs.shape[0] != 1:
+                raise RLGraphError("FusedPreprocessor processes one input per environment, but batch size is "
+                                   "{}.".format(inputs.shape[0]))
+            inputs = inputs[0]
+        for stage in self.stages:
+            inputs = stage.apply(inputs, index)
+        return inputs[None] if has_batch_rank else inputs
+
+    def preprocess_batch(self, inputs):
+        """
+        Preprocesses one input for each environment.
+
+        Args:
+            inputs (Union[ndarray,list]): Inputs of shape [num environments, ...].
+
+        Returns:
+            ndarray: The output buffer of shape [num environments, ...] holding the preprocessed inputs.
+        """
+        for i in range_(self.num_environments):
+            self.preprocess(inputs[i], i)
+        return self.output_buffer
+
+    def reset(self, index=None):
+        """
+        Resets the preprocessing state of one or all environments (e.g. after an episode ended).
+
+        Args:
+            index (Optional[int]): The environment to reset. If None, resets all environments.
+        """
+        indices = range_(self.num_environments) if index is None else [index]
+        for stage in self.stages:
+            for i in indices:
+                stage.reset(i)
+
+    def get_environment_preprocessor(self, index):
+        """
+        Returns:
+            _EnvironmentPreprocessor: A drop-in replacement of the `index`-th environment's `PreprocessorStack`.
+        """
+        return _EnvironmentPreprocessor(self, index)
+
+    @staticmethod
+    def fuse(preprocessors, in_space):
+        """
+        Replaces per-environment python preprocessor stacks (as set up by the workers) with handles into one
+        `FusedPreprocessor`.
+
+        Args:
+            preprocessors (Dict[str,PreprocessorStack]): Environment id -> stack, ordered by environment index.
+            in_space (Space): The input space.
+
+        Returns:
+            tuple:
+                - Optional[FusedPreprocessor]: The fused preprocessor or None if there is nothing to fuse.
+                - dict: Environment id -> per-environment preprocessor. Returned unchanged if there is nothing to
+                    fuse.
+        """
+        stacks = list(preprocessors.values())
+        if len(stacks) == 0 or any(stack is None for stack in stacks) or isinstance(in_space, ContainerSpace):
+            return None, preprocessors
+        fused = FusedPreprocessor(stacks, in_space)
+        return fused, {env_id: fused.get_environment_preprocessor(i) for i, env_id in enumerate(preprocessors.keys())}
+
+
+class _EnvironmentPreprocessor(object):
+    """
+    Exposes the `preprocess`/`reset` interface of a python `PreprocessorStack` for one environment of a
+    `FusedPreprocessor`. Like `FusedPreprocessor.preprocess`, returns views into the output buffer which callers
+    holding on to preprocessed states need to copy.
+    """
+    def __init__(self, fused_preprocessor, index):
+        self.fused_preprocessor = fused_preprocessor
+        self.index = index
+
+    def preprocess(self, inputs):
+        return self.fused_preprocessor.preprocess(inputs, self.index)
+
+    def reset(self):
+        self.fused_preprocessor.reset(self.index)
+
+
+class _Stage(object):
+    """
+    One step of a fused pipeline. Writes the output for environment `index` into `buffer[index]` (or returns a view
+    of its input if `buffer` is None).
+    """
+    def __init__(self, num_environments, shape, dtype, allocate=True):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.buffer = np.zeros(shape=(num_environments,) + self.shape, dtype=self.dtype) if allocate else None
+
+    def apply(self, inputs, index):
+        raise NotImplementedError
+
+    def reset(self, index):
+        pass
+
+
+class _CropStage(_Stage):
+    def __init__(self, layer, shape, dtype):
+        self.x, self.y, self.width, self.height = layer.x, layer.y, layer.width, layer.height
+        # Python slicing semantics (clipped at the image border).
+        out_shape = (len(range_(shape[0])[self.y:self.y + self.height]),
+                     len(range_(shape[1])[self.x:self.x + self.width])) + tuple(shape[2:])
+        super(_CropStage, self).__init__(0, out_shape, dtype, allocate=False)
+
+    def apply(self, inputs, index):
+        return inputs[self.y:self.y + self.height, self.x:self.x + self.width]
+
+
+class _GrayScaleStage(_Stage):
+    def __init__(self, num_environments, layer, shape, dtype):
+        out_shape = tuple(shape[:-1]) + ((1,) if layer.keep_rank else ())
+        super(_GrayScaleStage, self).__init__(num_environments, out_shape, dtype)
+        self.keep_rank = layer.keep_rank
+
+    def apply(self, inputs, index):
+        out = self.buffer[index]
+        _write(cv2.cvtColor(inputs, cv2.COLOR_RGB2GRAY, dst=out[..., 0] if self.keep_rank else out), out)
+        return out
+
+
+class _ResizeStage(_Stage):
+    def __init__(self, num_environments, layer, shape, dtype):
+        super(_ResizeStage, self).__init__(num_environments, (layer.height, layer.width) + tuple(shape[2:]), dtype)
+        self.dsize = (layer.width, layer.height)
+        self.interpolation = layer.cv2_interpolation
+        # cv2 drops single color channels.
+        self.single_channel = len(shape) == 3 and shape[-1] == 1
+
+    def apply(self, inputs, index):
+        out = self.buffer[index]
+        if self.single_channel:
+            inputs, dst = inputs[..., 0], out[..., 0]
+        else:
+            dst = out
+        _write(cv2.resize(inputs, dsize=self.dsize, dst=dst, interpolation=self.interpolation), dst)
+        return out
+
+
+class _ElementwiseStage(_Stage):
+    def __init__(self, num_environments, shape, dtype, ops):
+        super(_ElementwiseStage, self).__init__(num_environments, shape, dtype)
+        # Functions (inputs, out) writing into `out`. The first reads the stage input, all others work in place.
+        self.ops = ops
+
+    def apply(self, inputs, index):
+        out = self.buffer[index]
+        if len(self.ops) == 0:
+            np.copyto(out, inputs, casting="unsafe")
+        for i, op in enumerate(self.ops):
+            op(inputs if i == 0 else out, out)
+        return out
+
+
+class _SequenceStage(_Stage):
+    def __init__(self, num_environments, layer, shape, dtype):
+        self.sequence_length = layer.sequence_length
+        self.add_rank = layer.add_rank
+        if self.add_rank:
+            out_shape = tuple(shape) + (self.sequence_length,)
+        else:
+            out_shape = tuple(shape[:-1]) + (shape[-1] * self.sequence_length,)
+        super(_SequenceStage, self).__init__(num_environments, out_shape, dtype)
+        # Number of entries of the last rank taken by one item.
+        self.item_size = 1 if self.add_rank else shape[-1]
+        self.needs_reset = np.ones(shape=(num_environments,), dtype=np.bool_)
+
+    def apply(self, inputs, index):
+        out = self.buffer[index]
+        if self.add_rank:
+            inputs = inputs[..., None]
+        # After a reset, fill the entire sequence with the input.
+        if self.needs_reset[index]:
+            for i in range_(self.sequence_length):
+                out[..., i * self.item_size:(i + 1) * self.item_size] = inputs
+            self.needs_reset[index] = False
+        # Oldest item first: Shift by one item and write the input last.
+        else:
+            out[..., :-self.item_size] = out[..., self.item_size:]
+            out[..., -self.item_size:] = inputs
+        return out
+
+    def reset(self, index):
+        self.needs_reset[index] = True
+
+
+class _FallbackStage(_Stage):
+    def __init__(self, layers, shape, dtype):
+        self.layers = layers
+        # Probe output shape and dtype. The probe's state changes are undone by the initial reset.
+        probe = np.asarray(layers[0]._graph_fn_apply(np.zeros(shape=(1,) + tuple(shape), dtype=dtype)))
+        super(_FallbackStage, self).__init__(len(layers), probe.shape[1:], probe.dtype)
+
+    def apply(self, inputs, index):
+        out = self.buffer[index]
+        out[...] = np.asarray(self.layers[index]._graph_fn_apply(inputs[None]))[0]
+        return out
+
+    def reset(self, index):
+        self.layers[index]._graph_fn_reset()
+
+
+def _cast_op(inputs, out):
+    np.copyto(out, inputs, casting="unsafe")
+
+
+def _binary_op(ufunc, operand):
+    def op(inputs, out):
+        ufunc(inputs, operand, out=out, casting="unsafe")
+    return op
+
+
+def _write(result, out):
+    # cv2 allocates a new array if it can not write into `dst`.
+    if result is not out and not np.shares_memory(result, out):
+        np.copyto(out, result.reshape(out.shape))
@@ -0,0 +1,205 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from rlgraph.utils.rlgraph_errors import RLGraphError
+
+
+class MemFrameStorage(object):
+    """
+    In-memory storage for frame-stacked states (e.g. Atari observations produced by a `Sequence` preprocessor)
+    that keeps every raw frame only once.
+
+    Each record slot stores the newest frame of its state. If a state continues the state inserted just before it
+    (same episode, stack shifted by exactly one frame), its older frames are read from the preceding slots at sample
+    time. Otherwise (episode starts, fragment boundaries), the older frames are stored with the slot. Next-states
+    are stored as an offset to the record whose state they equal (n-step successor within the same trajectory),
+    falling back to a full copy e.g. for terminal next-states.
+
+    Before a slot is overwritten, the older frames of its successor are materialized, so the oldest record in the
+    storage never depends on an overwritten slot.
+    """
+
+    def __init__(self, capacity, frame_stack, n_step_adjustment=1):
+        """
+        Args:
+            capacity (int): Number of record slots.
+            frame_stack (int): Number of frames stacked (concatenated) in the last rank of each state.
+            n_step_adjustment (int): Max. distance (in records) between a record and the record whose state equals
+                its next-state.
+        """
+        if frame_stack < 1:
+            raise RLGraphError("Frame stack must be at least 1 but is {}.".format(frame_stack))
+        self.capacity = capacity
+        self.frame_stack = frame_stack
+        self.n_step_adjustment = n_step_adjustment
+
+        # Allocated on first insert from the state's shape and dtype.
+        self.state_shape = None
+        self.frame_shape = None
+        self.frames = None
+
+        # Older (frame_stack - 1) frames of a state if they can not be read from the preceding slot.
+        self.history = np.empty(shape=(capacity,), dtype=object)
+        self.has_history = np.zeros(shape=(capacity,), dtype=np.bool_)
+
+        # Offset to the slot holding a record's next-state as state, 0 if stored in `next_states`.
+        self.next_offsets = np.zeros(shape=(capacity,), dtype=np.int64)
+        self.next_states = np.empty(shape=(capacity,), dtype=object)
+        # Slots whose next-state may still be matched by an upcoming state.
+        self.pending_next_slots = []
+
+        self.size = 0
+        self.last_slot = None
+        self.last_frames = None
+        self.last_terminal = True
+
+    def insert(self, slot, state, next_state, terminal):
+        """
+        Inserts one record's state and next-state.
+
+        Args:
+            slot (int): Record slot to write to. Records must be written in ring order.
+            state (ndarray): Frame-stacked state.
+            next_state (ndarray): Frame-stacked next-state.
+            terminal (bool): Whether the record is terminal.
+        """
+        state = np.asarray(state)
+        if self.frames is None:
+            self._allocate(state)
+
+        if self.size == self.capacity:
+            self._release_slot(slot)
+
+        frames = self._split_frames(state)
+        self.frames[slot] = frames[-1]
+
+        continues_last = self.last_slot == (slot - 1) % self.capacity and not self.last_terminal \
+            and np.array_equal(frames[:-1], self.last_frames[1:])
+        if continues_last:
+            self.history[slot] = None
+            self.has_history[slot] = False
+        else:
+            # Previous trajectory was cut off -> its pending next-states stay fully stored.
+            self.pending_next_slots = []
+            self.history[slot] = np.array(frames[:-1])
+            self.has_history[slot] = True
+
+        # Link pending next-states of preceding records to this state.
+        still_pending = []
+        for pending_slot in self.pending_next_slots:
+            offset = (slot - pending_slot) % self.capacity
+            if np.array_equal(self.next_states[pending_slot], state):
+                self.next_offsets[pending_slot] = offset
+                self.next_states[pending_slot] = None
+            elif offset < self.n_step_adjustment:
+                still_pending.append(pending_slot)
+        self.pending_next_slots = still_pending
+
+        self.next_offsets[slot] = 0
+        self.next_states[slot] = np.array(next_state)
+        if not terminal:
+            self.pending_next_slots.append(slot)
+
+        self.last_slot = slot
+        self.last_frames = frames
+        self.last_terminal = terminal
+        self.size = min(self.size + 1, self.capacity)
+
+    def get_states(self, indices):
+        """
+        Reconstructs the frame-stacked states of the given slots.
+
+        Args:
+            indices (ndarray): Slots to read.
+
+        Returns:
+            ndarray: States of shape [len(indices)] + state shape.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        stacked = np.empty(shape=(len(indices), self.frame_stack) + self.frame_shape, dtype=self.frames.dtype)
+        stacked[:, -1] = self.frames[indices]
+
+        current = indices.copy()
+        active = np.ones_like(indices, dtype=np.bool_)
+        # Fill the stack from newest to oldest frame by walking back through preceding slots.
+        for position in reversed(range(self.frame_stack - 1)):
+            from_history = active & self.has_history[current]
+            for i in np.nonzero(from_history)[0]:
+                history = self.history[current[i]]
+                stacked[i, :position + 1] = history[len(history) - position - 1:]
+            active &= ~from_history
+            if not np.any(active):
+                break
+            current[active] = (current[active] - 1) % self.capacity
+            stacked[active, position] = self.frames[current[active]]
+
+        return self._merge_frames(stacked)
+
+    def get_next_states(self, indices):
+        """
+        Reconstructs the next-states of the given slots.
+
+        Args:
+            indices (ndarray): Slots to read.
+
+        Returns:
+            ndarray: Next-states of shape [len(indices)] + state shape.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        offsets = self.next_offsets[indices]
+        linked = offsets > 0
+
+        next_states = np.empty(shape=(len(indices),) + self.state_shape, dtype=self.frames.dtype)
+        if np.any(linked):
+            next_states[linked] = self.get_states((indices[linked] + offsets[linked]) % self.capacity)
+        for i in np.nonzero(~linked)[0]:
+            next_states[i] = self.next_states[indices[i]]
+        return next_states
+
+    def _allocate(self, state):
+        self.state_shape = state.shape
+        if state.shape[-1] % self.frame_stack != 0:
+            raise RLGraphError("Last state rank ({}) is not divisible by frame stack {}.".format(
+                state.shape[-1], self.frame_stack))
+        self.frame_shape = state.shape[:-1] + (state.shape[-1] // self.frame_stack,)
+        self.frames = np.zeros(shape=(self.capacity,) + self.frame_shape, dtype=state.dtype)
+
+    def _split_frames(self, state):
+        # [..., frame_stack * channels] -> [frame_stack, ..., channels]
+        frames = state.reshape(self.state_shape[:-1] + (self.frame_stack, self.frame_shape[-1]))
+        return np.moveaxis(frames, -2, 0)
+
+    def _merge_frames(self, stacked):
+        # [batch, frame_stack, ..., channels] -> [batch, ..., frame_stack * channels]
+        return np.moveaxis(stacked, 1, -2).reshape((len(stacked),) + self.state_shape)
+
+    def _release_slot(self, slot):
+        """
+        Prepares overwriting the oldest slot: Materializes the older frames of its successor and
+        drops unresolved references to it.
+        """
+        successor = (slot + 1) % self.capacity
+        if successor != slot and not self.has_history[successor]:
+            state_frames = self._split_frames(self.get_states([slot])[0])
+            self.history[successor] = np.array(state_frames[1:])
+            self.has_history[successor] = True
+        if slot in self.pending_next_slots:
+            self.pending_next_slots.remove(slot)
@@ -19,6 +19,8 @@ from __future__ import print_function
 
 import operator
 
+import numpy as np
+
 from rlgraph.utils.rlgraph_errors import RLGraphError
 
 
@@ -26,6 +28,11 @@ class MemSegmentTree(object):
     """
     In-memory Segment tree for prioritized replay.
 
+    The tree is stored as a flat NumPy array of size 2 * capacity where the leaves occupy
+    [capacity, 2 * capacity). Next to the single-element methods, batched versions
+    (`insert_many`, array-valued `index_of_prefixsum` and `get`) operate on all requested
+    indices at once, walking the tree level by level instead of element by element.
+
     Note: The pure TensorFlow segment tree is much slower because variable updating is expensive,
     and in scenarios like Ape-X, memory and update are separated processes, so there is little to be gained
     from inserting into the graph.
@@ -41,13 +48,14 @@ class MemSegmentTree(object):
         Helper to represent a segment tree.
 
         Args:
-            values (list): Storage for the segment tree.
-            capacity (int): Capacity of segment tree.
-            operator (callable): Reduce operation of the segment tree.
+            values (Union[list,ndarray]): Storage for the segment tree. Will be converted to a float64 array.
+            capacity (int): Capacity of segment tree. Must be a power of 2.
+            operator (callable): Reduce operation of the segment tree. One of operator.add or min.
         """
-        self.values = values
+        self.values = np.asarray(values, dtype=np.float64)
         self.capacity = capacity
         self.operator = operator
+        self.np_operator = get_np_reduce_op(operator)
 
     def insert(self, index, element):
         """
@@ -72,14 +80,37 @@ class MemSegmentTree(object):
             )
             index = index >> 1
 
+    def insert_many(self, indices, elements):
+        """
+        Inserts a batch of elements and updates all affected inner nodes level by level.
+
+        Args:
+            indices (ndarray): Insertion indices. If an index appears more than once, the last
+                element for that index is kept.
+            elements (Union[ndarray,float]): Elements to insert (one per index or a scalar).
+        """
+        indices = np.asarray(indices, dtype=np.int64) + self.capacity
+        if indices.size == 0:
+            return
+        self.values[indices] = elements
+
+        indices = np.unique(indices >> 1)
+        while indices[0] >= 1:
+            update_indices = 2 * indices
+            self.values[indices] = self.np_operator(
+                self.values[update_indices],
+                self.values[update_indices + 1]
+            )
+            indices = np.unique(indices >> 1)
+
     def get(self, index):
         """
         Reads an item from the segment tree.
 
         Args:
-            index (int):
+            index (Union[int,ndarray]): Single index or array of indices.
 
-        Returns: The element.
+        Returns: The element(s).
 
         """
         return self.values[self.capacity + index]
@@ -90,11 +121,14 @@ class MemSegmentTree(object):
         over all elements from 0 till the index is <= prefix_sum.
 
         Args:
-            prefix_sum .float): Upper bound on prefix we are allowed to select.
+            prefix_sum (Union[float,ndarray]): Upper bound on prefix we are allowed to select. If an array
+                is passed, all prefix sums are resolved together in one pass over the tree levels.
 
         Returns:
-            int: Index/indices satisfying prefix sum condition.
+            Union[int,ndarray]: Index/indices satisfying prefix sum condition.
         """
+        if np.ndim(prefix_sum) > 0:
+            return self._index_of_prefixsums(np.asarray(prefix_sum, dtype=np.float64))
         assert 0 <= prefix_sum <= self.get_sum() + 1e-5
         index = 1
 
@@ -107,6 +141,30 @@ class MemSegmentTree(object):
                 index = update_index + 1
         return index - self.capacity
 
+    def _index_of_prefixsums(self, prefix_sums):
+        """
+        Batched version of `index_of_prefixsum`. As the tree is complete, all searches reach the
+        leaf level after the same number of steps.
+
+        Args:
+            prefix_sums (ndarray): 1D float array of prefix sums.
+
+        Returns:
+            ndarray: Int array of indices satisfying the prefix sum condition.
+        """
+        assert np.all(prefix_sums >= 0) and np.all(prefix_sums <= self.get_sum() + 1e-5)
+        prefix_sums = prefix_sums.copy()
+        indices = np.ones_like(prefix_sums, dtype=np.int64)
+
+        # Capacity is a power of 2 -> all leaves are at depth log2(capacity).
+        for _ in range(self.capacity.bit_length() - 1):
+            update_indices = 2 * indices
+            left_values = self.values[update_indices]
+            go_left = left_values > prefix_sums
+            prefix_sums = np.where(go_left, prefix_sums, prefix_sums - left_values)
+            indices = np.where(go_left, update_indices, update_indices + 1)
+        return indices - self.capacity
+
     def reduce(self, start, limit, reduce_op=operator.add):
         """
         Applies an operation to specified segment.
@@ -198,3 +256,68 @@ class MinSumSegmentTree(object):
             self.min_segment_tree.values[index] = min(self.min_segment_tree.values[update_index],
                                                       self.min_segment_tree.values[update_index + 1])
             index = index >> 1
+
+    def insert_many(self, indices, elements):
+        """
+        Inserts a batch of elements into both segment trees, sharing the computation
+        of the affected inner node indices between the trees.
+
+        Args:
+            indices (ndarray): Insertion indices.
+            elements (Union[ndarray,float]): Elements to insert (one per index or a scalar).
+        """
+        sum_values = self.sum_segment_tree.values
+        min_values = self.min_segment_tree.values
+
+        indices = np.asarray(indices, dtype=np.int64) + self.capacity
+        if indices.size == 0:
+            return
+        sum_values[indices] = elements
+        min_values[indices] = elements
+
+        indices = np.unique(indices >> 1)
+        while indices[0] >= 1:
+            update_indices = 2 * indices
+            sum_values[indices] = sum_values[update_indices] + sum_values[update_indices + 1]
+            min_values[indices] = np.minimum(min_values[update_indices], min_values[update_indices + 1])
+            indices = np.unique(indices >> 1)
+
+    def get_importance_weights(self, indices, size, beta, sum_epsilon=0.0, min_prob_epsilon=0.0):
+        """
+        Computes normalized importance sampling weights for the given sampled indices.
+
+        Args:
+            indices (ndarray): Sampled indices.
+            size (int): Number of records currently stored.
+            beta (float): Importance sampling exponent.
+            sum_epsilon (float): Added to the priority sum (guards against empty trees).
+            min_prob_epsilon (float): Added to the min. probability (guards against zero priorities).
+
+        Returns:
+            ndarray: Weights w_i = (N * P(i)) ** -beta, divided by the max weight.
+        """
+        sum_prob = self.sum_segment_tree.get_sum() + sum_epsilon
+        min_prob = self.min_segment_tree.get_min_value() / sum_prob + min_prob_epsilon
+        max_weight = (min_prob * size) ** (-beta)
+        sample_probs = self.sum_segment_tree.get(indices) / sum_prob
+        return (sample_probs * size) ** (-beta) / max_weight
+
+
+def get_np_reduce_op(reduce_op):
+    """
+    Maps a python reduce op of a segment tree to its element-wise NumPy equivalent.
+
+    Args:
+        reduce_op (Union(operator.add, min, max)): Python reduce op.
+
+    Returns:
+        np.ufunc: The matching NumPy ufunc.
+    """
+    if reduce_op == operator.add:
+        return np.add
+    elif reduce_op == min:
+        return np.minimum
+    elif reduce_op == max:
+        return np.maximum
+    else:
+        raise RLGraphError("Unsupported reduce OP. Support ops are [add, min, max].")
@@ -25,6 +25,7 @@ if get_backend() == "tf":
     import tensorflow as tf
 elif get_backend() == "pytorch":
     import torch
+    from rlgraph.utils.pytorch_util import pytorch_segmented_reverse_decayed_sum
 
 
 class SequenceHelper(Component):
@@ -89,17 +90,7 @@ class SequenceHelper(Component):
             )
             return sequence_lengths.stack()
         elif get_backend() == "pytorch":
-            sequence_lengths = []
-            length = 0
-            for index in sequence_indices:
-                length += 1
-                if index == 1:
-                    sequence_lengths.append(length)
-                    length = 0
-            # Append final sequence.
-            if length > 0:
-                sequence_lengths.append(length)
-            return torch.tensor(sequence_lengths, dtype=torch.int32)
+            return self._pytorch_sequence_lengths(sequence_indices)
 
     @rlgraph_api(returns=2, must_be_complete=False)
     def _graph_fn_calc_sequence_decays(self, sequence_indices, decay=0.9):
@@ -182,22 +173,17 @@ class SequenceHelper(Component):
             )
             return tf.stop_gradient(sequence_lengths.stack()), tf.stop_gradient(decays.stack())
         elif get_backend() == "pytorch":
-            sequence_lengths = []
-            decays = []
-
-            length = 0
-            for index in sequence_indices:
-                # Compute decay based on sequence length.
-                decays.append(pow(decay, length))
-                length += 1
-                if index == 1:
-                    sequence_lengths.append(length)
-                    length = 0
-
-            # Append final sequence.
-            if length > 0:
-                sequence_lengths.append(length)
-            return torch.tensor(sequence_lengths, dtype=torch.int32), torch.tensor(decays, dtype=torch.int32)
+            sequence_indices = torch.as_tensor(sequence_indices).detach().reshape(-1).bool()
+            num_values = sequence_indices.shape[0]
+            # Decay exponents restart at 0 after each sub-sequence end.
+            positions = torch.arange(num_values)
+            starts = torch.zeros(num_values, dtype=torch.long)
+            if num_values > 1:
+                zero = torch.zeros(1, dtype=torch.long)
+                segment_starts = torch.cat([zero, positions[:-1][sequence_indices[:-1]] + 1])
+                starts = segment_starts[torch.cat([zero, torch.cumsum(sequence_indices[:-1].long(), 0)])]
+            decays = torch.pow(float(decay), (positions - starts).double()).float()
+            return self._pytorch_sequence_lengths(sequence_indices), decays
 
     @rlgraph_api
     def _graph_fn_reverse_apply_decays_to_sequence(self, values, sequence_indices, decay=0.9):
@@ -261,28 +247,7 @@ class SequenceHelper(Component):
             decayed_values = decayed_values.stack()
             return tf.stop_gradient(tf.reverse(tensor=decayed_values, axis=[0]))
         elif get_backend() == "pytorch":
-            # Scan all sequences in reverse:
-            discounted = []
-            i = 0
-            length = 0
-            prev_v = 0
-            for v in reversed(values.data):
-                # Accumulate prior value.
-                accum_v = prev_v + v * pow(decay, length)
-                discounted.append(accum_v)
-                prev_v = accum_v
-
-                # Arrived at new sequence, start over.
-                if sequence_indices[i] == 1:
-                    length = 0
-                    prev_v = 0
-
-                # Increase length of current sub-sequence.
-                length += 1
-                i += 1
-
-            # Reverse, convert, and return final.
-            return torch.tensor(list(reversed(discounted)), dtype=torch.float32)
+            return pytorch_segmented_reverse_decayed_sum(values, sequence_indices, decay)
 
     @rlgraph_api
     def _graph_fn_bootstrap_values(self, rewards, values, terminals, sequence_indices, discount=0.99):
@@ -374,30 +339,30 @@ class SequenceHelper(Component):
             # Squeeze because we inserted
             return tf.squeeze(deltas)
         elif get_backend() == "pytorch":
-            deltas = []
-            discount_tensor = torch.tensor(discount)
-            start_index = 0
-            i = 0
-            if len(values) > 1:
-                last_sequence = torch.unsqueeze(sequence_indices[-1], -1)
-                sequence_indices = torch.cat((sequence_indices[:-1], torch.ones_like(last_sequence)), 0)
-
-            for _ in range(len(values)):
-                if sequence_indices[i]:
-                    # Compute deltas for this sub-sequence.
-                    # Cannot do this all at once because we would need the correct offsets for each sub-sequence.
-                    baseline_slice = list(values[start_index:i + 1])
-                    if terminals[i]:
-                        baseline_slice.append(0)
-                    else:
-                        baseline_slice.append(values[-1])
-                    adjusted_v = torch.tensor(baseline_slice)
-
-                    # +1 because we want to include i-th value.
-                    delta = rewards[start_index:i + 1] + discount_tensor * adjusted_v[1:] - adjusted_v[:-1]
-                    deltas.extend(delta)
-                    start_index = i + 1
-                i += 1
-
-            return torch.tensor(deltas)
-
+            rewards = torch.as_tensor(rewards).detach().reshape(-1).float()
+            values = torch.as_tensor(values).detach().reshape(-1).float()
+            terminals = torch.as_tensor(terminals).detach().reshape(-1).bool()
+            # Again ensure last index is 1 for any sub-sample arriving here.
+            sequence_ends = torch.as_tensor(sequence_indices).detach().reshape(-1).bool().clone()
+            sequence_ends[-1] = True
+
+            # Next value within the sub-sequence, at its end the boot-strap value: 0 if terminal, otherwise the
+            # last observed value.
+            next_values = torch.cat([values[1:], torch.zeros(1)])
+            bootstrap_values = torch.where(terminals, torch.zeros_like(values), values)
+            next_values = torch.where(sequence_ends, bootstrap_values, next_values)
+            return rewards + discount * next_values - values
+
+    @staticmethod
+    def _pytorch_sequence_lengths(sequence_indices):
+        """
+        Computes sub-sequence lengths from sub-sequence end flags (the last sub-sequence may be open).
+        """
+        sequence_indices = torch.as_tensor(sequence_indices).detach().reshape(-1).bool()
+        num_values = sequence_indices.shape[0]
+        ends = torch.nonzero(sequence_indices).reshape(-1)
+        # Append final sequence.
+        if num_values > 0 and (len(ends) == 0 or ends[-1] != num_values - 1):
+            ends = torch.cat([ends, torch.tensor([num_values - 1])])
+        bounds = torch.cat([torch.tensor([-1]), ends])
+        return (bounds[1:] - bounds[:-1]).int()
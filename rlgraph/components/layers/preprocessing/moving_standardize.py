@@ -22,6 +22,8 @@ import numpy as np
 from rlgraph import get_backend
 from rlgraph.components.layers.preprocessing import PreprocessLayer
 from rlgraph.utils.decorators import rlgraph_api
+from rlgraph.utils.numpy import merge_moments
+from rlgraph.utils.rlgraph_errors import RLGraphError
 from rlgraph.utils.util import SMALL_NUMBER
 
 if get_backend() == "tf":
@@ -33,11 +35,16 @@ elif get_backend() == "pytorch":
 class MovingStandardize(PreprocessLayer):
     """
     Standardizes inputs using a moving estimate of mean and std.
+
+    Statistics are shared across the batch rank and updated once per call by merging the moments of the
+    whole input batch (Chan et al.'s parallel algorithm). For the python and PyTorch backends, statistics can
+    be exported and merged across processes (e.g. from workers into the learner) via `export_statistics`,
+    `merge_statistics`, `get_statistics` and `set_statistics`.
     """
     def __init__(self, batch_size=1, scope="moving-standardize", **kwargs):
         """
         Args:
-            batch_size (int): Number of samples processed per step.
+            batch_size (int): Deprecated, kept for spec compatibility. Statistics are shared across the batch rank.
         """
         super(MovingStandardize, self).__init__(scope=scope, **kwargs)
         self.batch_size = batch_size
@@ -48,18 +55,25 @@ class MovingStandardize(PreprocessLayer):
 
         # Current estimate of sum of stds.
         self.std_sum_est = None
+
+        # Statistics gathered since the last export (python/PyTorch only).
+        self.update_count = None
+        self.update_mean = None
+        self.update_std_sum = None
+
         self.output_spaces = None
         self.in_shape = None
+        self.has_batch_rank = None
 
     def create_variables(self, input_spaces, action_space=None):
         in_space = input_spaces["preprocessing_inputs"]
         self.output_spaces = in_space
-        self.in_shape = (self.batch_size, ) + in_space.shape
+        # Statistics keep a singleton batch rank to broadcast against batched and single inputs.
+        self.in_shape = (1, ) + in_space.shape
+        self.has_batch_rank = in_space.has_batch_rank
 
         if self.backend == "python" or get_backend() == "python" or get_backend() == "pytorch":
-            self.sample_count = 0.0
-            self.mean_est = np.zeros(self.in_shape, dtype=np.float32)
-            self.std_sum_est = np.zeros(self.in_shape, dtype=np.float32)
+            self._reset_statistics()
         elif get_backend() == "tf":
             self.sample_count = self.get_variable(name="sample-count", dtype="float", initializer=0.0, trainable=False)
             self.mean_est = self.get_variable(
@@ -80,24 +94,24 @@ class MovingStandardize(PreprocessLayer):
     @rlgraph_api
     def _graph_fn_reset(self):
         if self.backend == "python" or get_backend() == "python" or get_backend() == "pytorch":
-            self.sample_count = 0.0
-            self.mean_est = np.zeros(self.in_shape)
-            self.std_sum_est = np.zeros(self.in_shape)
+            self._reset_statistics()
         elif get_backend() == "tf":
             return tf.variables_initializer([self.sample_count, self.mean_est, self.std_sum_est])
 
     @rlgraph_api
     def _graph_fn_apply(self, preprocessing_inputs):
         if self.backend == "python" or get_backend() == "python" or get_backend() == "pytorch":
-            # https://www.johndcook.com/blog/standard_deviation/
             preprocessing_inputs = np.asarray(preprocessing_inputs, dtype=np.float32)
-            self.sample_count += 1.0
-            if self.sample_count == 1.0:
-                self.mean_est[...] = preprocessing_inputs
-            else:
-                update = preprocessing_inputs - self.mean_est
-                self.mean_est[...] += update / self.sample_count
-                self.std_sum_est[...] += update * update * (self.sample_count - 1.0) / self.sample_count
+            # Inputs without batch rank are a single sample.
+            batch = preprocessing_inputs.reshape((-1, ) + self.in_shape[1:])
+            batch_mean = np.mean(batch, axis=0, keepdims=True)
+            batch_std_sum = np.sum(np.square(batch - batch_mean), axis=0, keepdims=True)
+            self.sample_count, self.mean_est, self.std_sum_est = merge_moments(
+                self.sample_count, self.mean_est, self.std_sum_est, len(batch), batch_mean, batch_std_sum
+            )
+            self.update_count, self.update_mean, self.update_std_sum = merge_moments(
+                self.update_count, self.update_mean, self.update_std_sum, len(batch), batch_mean, batch_std_sum
+            )
 
             # Subtract mean.
             result = preprocessing_inputs - self.mean_est
@@ -115,28 +129,107 @@ class MovingStandardize(PreprocessLayer):
             return standardized
 
         elif get_backend() == "tf":
-            assignments = [tf.assign_add(ref=self.sample_count, value=1.0)]
-            with tf.control_dependencies(assignments):
-                # 1. Update vars
-                assignments = []
-                update = preprocessing_inputs - self.mean_est
-                mean_update = tf.cond(
-                    pred=self.sample_count > 1.0,
-                    false_fn=lambda: self.mean_est,
-                    true_fn=lambda: update
+            # 1. Moments of the input batch.
+            if self.has_batch_rank:
+                batch_count = tf.cast(x=tf.shape(input=preprocessing_inputs)[0], dtype=tf.float32)
+                batch_mean = tf.reduce_mean(input_tensor=preprocessing_inputs, axis=0, keepdims=True)
+                batch_std_sum = tf.reduce_sum(
+                    input_tensor=tf.square(x=preprocessing_inputs - batch_mean), axis=0, keepdims=True
                 )
-                var_update = update * update * (self.sample_count - 1) / self.sample_count
-                assignments.append(tf.assign_add(ref=self.mean_est, value=mean_update))
-                assignments.append(tf.assign_add(ref=self.std_sum_est, value=var_update))
+            else:
+                batch_count = 1.0
+                batch_mean = tf.expand_dims(input=preprocessing_inputs, axis=0)
+                batch_std_sum = tf.zeros_like(tensor=batch_mean)
+
+            # 2. Merge into the running estimates. Snapshot the variables as (ref-)variable reads are not ordered
+            # against the assignments below.
+            sample_count = tf.identity(input=self.sample_count)
+            mean_est = tf.identity(input=self.mean_est)
+            std_sum_est = tf.identity(input=self.std_sum_est)
+            count = sample_count + batch_count
+            delta = batch_mean - mean_est
+            mean = mean_est + delta * batch_count / count
+            std_sum = std_sum_est + batch_std_sum + tf.square(x=delta) * sample_count * batch_count / count
+            # Only assign once all new estimates have been computed from the old ones.
+            with tf.control_dependencies([count, mean, std_sum]):
+                assignments = [
+                    tf.assign(ref=self.sample_count, value=count),
+                    tf.assign(ref=self.mean_est, value=mean),
+                    tf.assign(ref=self.std_sum_est, value=std_sum)
+                ]
 
             with tf.control_dependencies(assignments):
-                # 2. Compute var estimate after update.
+                # 3. Compute var estimate after update.
                 var_estimate = tf.cond(
-                    pred=self.sample_count > 1,
-                    false_fn=lambda: tf.square(x=self.mean_est),
-                    true_fn=lambda: self.std_sum_est / (self.sample_count - 1)
+                    pred=count > 1,
+                    false_fn=lambda: tf.square(x=mean),
+                    true_fn=lambda: std_sum / (count - 1)
                 )
-                result = preprocessing_inputs - self.mean_est
+                result = preprocessing_inputs - mean
                 std = tf.sqrt(x=var_estimate) + SMALL_NUMBER
 
                 return result / std
+
+    def get_statistics(self):
+        """
+        Returns the current running statistics (python/PyTorch backends only).
+
+        Returns:
+            dict: Statistics dict with keys "count", "mean" and "std_sum" (sum of squared deviations from the mean).
+        """
+        self._check_python_statistics()
+        return dict(count=self.sample_count, mean=np.copy(self.mean_est), std_sum=np.copy(self.std_sum_est))
+
+    def export_statistics(self):
+        """
+        Returns the statistics gathered from inputs since the last export (or reset) and clears them, so that
+        samples are never exported twice. Statistics merged or set from other processes are not exported.
+
+        Returns:
+            dict: Statistics dict as returned by `get_statistics`.
+        """
+        self._check_python_statistics()
+        ret = dict(count=self.update_count, mean=self.update_mean, std_sum=self.update_std_sum)
+        self.update_count = 0.0
+        self.update_mean = np.zeros(self.in_shape, dtype=np.float32)
+        self.update_std_sum = np.zeros(self.in_shape, dtype=np.float32)
+        return ret
+
+    def merge_statistics(self, statistics):
+        """
+        Merges statistics of another process (e.g. exported by a worker) into the running statistics.
+
+        Args:
+            statistics (dict): Statistics dict as returned by `export_statistics`.
+        """
+        self._check_python_statistics()
+        self.sample_count, self.mean_est, self.std_sum_est = merge_moments(
+            self.sample_count, self.mean_est, self.std_sum_est,
+            statistics["count"], statistics["mean"], statistics["std_sum"]
+        )
+
+    def set_statistics(self, statistics):
+        """
+        Overwrites the running statistics, e.g. with the merged statistics of the learner. Statistics gathered
+        since the last export are kept for the next export.
+
+        Args:
+            statistics (dict): Statistics dict as returned by `get_statistics`.
+        """
+        self._check_python_statistics()
+        self.sample_count = float(statistics["count"])
+        self.mean_est = np.array(statistics["mean"], dtype=np.float32).reshape(self.in_shape)
+        self.std_sum_est = np.array(statistics["std_sum"], dtype=np.float32).reshape(self.in_shape)
+
+    def _reset_statistics(self):
+        self.sample_count = 0.0
+        self.mean_est = np.zeros(self.in_shape, dtype=np.float32)
+        self.std_sum_est = np.zeros(self.in_shape, dtype=np.float32)
+        self.update_count = 0.0
+        self.update_mean = np.zeros(self.in_shape, dtype=np.float32)
+        self.update_std_sum = np.zeros(self.in_shape, dtype=np.float32)
+
+    def _check_python_statistics(self):
+        if not (self.backend == "python" or get_backend() == "python" or get_backend() == "pytorch"):
+            raise RLGraphError("ERROR: Statistics of MovingStandardize can only be accessed for the python and "
+                               "PyTorch backends.")
@@ -17,8 +17,6 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from collections import deque
-
 import numpy as np
 from rlgraph import get_backend
 from rlgraph.components.layers.preprocessing import PreprocessLayer
@@ -41,7 +39,7 @@ class Sequence(PreprocessLayer):
     """
 
     def __init__(self, sequence_length=2, batch_size=1, add_rank=True, in_data_format="channels_last",
-                 out_data_format="channels_last", scope="sequence",  **kwargs):
+                 out_data_format="channels_last", copy_output=True, scope="sequence",  **kwargs):
         """
         Args:
             sequence_length (int): The number of records to always concatenate together within the last rank or
@@ -55,6 +53,9 @@ class Sequence(PreprocessLayer):
             add_rank (bool): Whether to add another rank to the end of the input with dim=length-of-the-sequence.
                 If False, concatenates the sequence within the last rank.
                 Default: True.
+            copy_output (bool): Python/PyTorch only: Whether to return a copy of the sequence. If False, returns a
+                view into the frame buffer, which is only valid until the next call.
+                Default: True.
         """
         # Switch off split (it's switched on for all LayerComponents by default).
         # -> accept any Space -> flatten to OrderedDict -> input & return OrderedDict -> re-nest.
@@ -63,6 +64,7 @@ class Sequence(PreprocessLayer):
         self.sequence_length = sequence_length
         self.batch_size = batch_size
         self.add_rank = add_rank
+        self.copy_output = copy_output
 
         self.in_data_format = in_data_format
         if get_backend() == "pytorch":
@@ -78,7 +80,12 @@ class Sequence(PreprocessLayer):
         # The output spaces after preprocessing (per flat-key).
         self.output_spaces = None
         if self.backend == "python" or get_backend() == "python" or get_backend() == "pytorch":
-            self.deque = deque([], maxlen=self.sequence_length)
+            # Per flat-key frame buffers of shape [batch, ..., 2 x sequence-length x items in last rank].
+            # Each item is written to its ring slot twice (slot and slot + sequence-length), so the current
+            # sequence is always one contiguous slice of the last rank.
+            self.frames = dict()
+            # Batch items (e.g. environments of a vector env) to reset with the next input.
+            self.batch_resets = []
 
     def get_preprocessed_space(self, space):
         ret = {}
@@ -121,6 +128,7 @@ class Sequence(PreprocessLayer):
     def _graph_fn_reset(self):
         if self.backend == "python" or get_backend() == "python" or get_backend() == "pytorch":
             self.index = -1
+            self.batch_resets = []
         elif get_backend() == "tf":
             return tf.variables_initializer([self.index])
 
@@ -138,65 +146,18 @@ class Sequence(PreprocessLayer):
         Returns:
             FlattenedDataOp: The FlattenedDataOp holding the sequenced SingleDataOps as values.
         """
-        # A normal (index != -1) assign op.
-        if self.backend == "python" or get_backend() == "python":
-            if self.index == -1:
-                for _ in range_(self.sequence_length):
-                    self.deque.append(preprocessing_inputs)
-            else:
-                self.deque.append(preprocessing_inputs)
+        if self.backend == "python" or get_backend() == "python" or get_backend() == "pytorch":
+            reset = self.index == -1
             self.index = (self.index + 1) % self.sequence_length
-
-            if self.add_rank:
-                sequence = np.stack(self.deque, axis=-1)
-            # Concat the sequence items in the last rank.
-            else:
-                sequence = np.concatenate(self.deque, axis=-1)
-
-            # TODO move into transpose component.
-            if self.in_data_format == "channels_last" and self.out_data_format == "channels_first":
-                sequence = sequence.transpose((0, 3, 2, 1))
-
-            return sequence
-        elif get_backend() == "pytorch":
-            if self.index == -1:
-                for _ in range_(self.sequence_length):
-                    if isinstance(preprocessing_inputs, dict):
-                        for key, value in preprocessing_inputs.items():
-                            self.deque.append(value)
-                    else:
-                        self.deque.append(preprocessing_inputs)
+            if isinstance(preprocessing_inputs, dict):
+                sequences = {key: self._sequence(key, value, reset) for key, value in preprocessing_inputs.items()}
+                # Flattened single input.
+                if len(sequences) == 1:
+                    sequences = next(iter(sequences.values()))
             else:
-                if isinstance(preprocessing_inputs, dict):
-                    for key, value in preprocessing_inputs.items():
-                        self.deque.append(value)
-                        self.index = (self.index + 1) % self.sequence_length
-                else:
-                    self.deque.append(preprocessing_inputs)
-                    self.index = (self.index + 1) % self.sequence_length
-
-            if self.add_rank:
-                sequence = torch.stack(torch.tensor(self.deque), dim=-1)
-            # Concat the sequence items in the last rank.
-            else:
-                data = []
-                for t in self.deque:
-                    if isinstance(t, torch.Tensor):
-                        data.append(t)
-                    else:
-                        data.append(torch.tensor(t))
-                sequence = torch.cat(data, dim=-1)
-
-            # TODO remove when transpose component implemented.
-            if self.in_data_format == "channels_last" and self.out_data_format == "channels_first":
-                # Problem: PyTorch does not have data format options in conv layers ->
-                # only channels first supported.
-                # -> Confusingly have to transpose.
-                # B W H C -> B C W H
-                # e.g. atari: [4 84 84 4] -> [4 4 84 84]
-                sequence = sequence.permute(0, 3, 2, 1)
-
-            return sequence
+                sequences = self._sequence("", preprocessing_inputs, reset)
+            self.batch_resets = []
+            return sequences
         elif get_backend() == "tf":
             # Assigns the input_ into the buffer at the current time index.
             def normal_assign():
@@ -252,3 +213,66 @@ class Sequence(PreprocessLayer):
             # TODO implement transpose
                 return sequences
 
+    def reset_batch_indices(self, batch_indices):
+        """
+        Python/PyTorch only: Resets the sequences of single batch items (e.g. one environment of a vector env) without
+        affecting the others. Their sequences are filled with their next input.
+
+        Args:
+            batch_indices (Union[int,List[int]]): The batch item(s) to reset.
+        """
+        self.batch_resets.extend(force_list(batch_indices))
+
+    def _sequence(self, key, inputs, reset):
+        """
+        Writes an input into its frame buffer's current ring slot and returns the resulting sequence.
+
+        Args:
+            key (str): The flat-key of the input.
+            inputs (any): The input for all batch items.
+            reset (bool): Whether to fill the entire sequence with the input.
+
+        Returns:
+            any: The sequence (a view into the frame buffer if `copy_output` is False).
+        """
+        use_torch = not (self.backend == "python" or get_backend() == "python")
+        if use_torch and not isinstance(inputs, torch.Tensor):
+            inputs = torch.tensor(inputs)
+        elif not use_torch:
+            inputs = np.asarray(inputs)
+        if self.add_rank:
+            inputs = inputs[..., None]
+        item_size = inputs.shape[-1]
+        num_slots = 2 * self.sequence_length
+
+        frames = self.frames.get(key)
+        shape = tuple(inputs.shape[:-1]) + (num_slots * item_size,)
+        if frames is None or tuple(frames.shape) != shape:
+            frames = torch.zeros(shape, dtype=inputs.dtype) if use_torch else np.zeros(shape, dtype=inputs.dtype)
+            self.frames[key] = frames
+            reset = True
+
+        if reset:
+            frames[...] = self._tile_last_rank(inputs, num_slots, use_torch)
+        else:
+            for slot in [self.index, self.index + self.sequence_length]:
+                frames[..., slot * item_size:(slot + 1) * item_size] = inputs
+            if len(self.batch_resets) > 0:
+                frames[self.batch_resets] = self._tile_last_rank(inputs[self.batch_resets], num_slots, use_torch)
+
+        # Oldest to newest item.
+        start = (self.index + 1) * item_size
+        sequence = frames[..., start:start + self.sequence_length * item_size]
+        # TODO move into transpose component.
+        if self.in_data_format == "channels_last" and self.out_data_format == "channels_first":
+            # PyTorch: No data format options in conv layers -> only channels first supported.
+            # B W H C -> B C W H, e.g. atari: [4 84 84 4] -> [4 4 84 84]
+            sequence = sequence.permute(0, 3, 2, 1) if use_torch else sequence.transpose((0, 3, 2, 1))
+        if self.copy_output:
+            return sequence.clone() if use_torch else np.array(sequence)
+        return sequence
+
+    @staticmethod
+    def _tile_last_rank(inputs, multiples, use_torch):
+        reps = [1] * (len(inputs.shape) - 1) + [multiples]
+        return inputs.repeat(*reps) if use_torch else np.tile(inputs, reps)
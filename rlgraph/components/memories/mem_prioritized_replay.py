@@ -17,9 +17,10 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from collections import OrderedDict
+
 import numpy as np
 import operator
-from six.moves import xrange as range_
 
 from rlgraph import get_backend
 from rlgraph.utils import util, DataOpDict
@@ -40,7 +41,19 @@ class MemPrioritizedReplay(Memory):
     API:
         update_records(indices, update) -> Updates the given indices with the given priority scores.
     """
-    def __init__(self, capacity=1000, next_states=True, alpha=1.0, beta=0.0):
+    def __init__(self, capacity=1000, next_states=True, alpha=1.0, beta=0.0, columnar=False):
+        """
+        Args:
+            capacity (int): Maximum capacity of the memory.
+            next_states (bool): If true include next states in the return values of the API-method "get_records".
+            alpha (float): Degree to which prioritization is applied, 0.0 implies no
+                prioritization (uniform), 1.0 full prioritization.
+            beta (float): Importance weight factor, 0.0 for no importance correction, 1.0
+                for full correction.
+            columnar (bool): If True, preallocate one numpy array of shape [capacity, ...] per flattened
+                record key and insert/sample via fancy indexing instead of storing a list of per-record dicts.
+                Default: False.
+        """
         super(MemPrioritizedReplay, self).__init__()
 
         self.memory_values = []
@@ -52,19 +65,30 @@ class MemPrioritizedReplay(Memory):
         self.alpha = alpha
         self.beta = beta
         self.next_states = next_states
+        self.columnar = columnar
 
         self.default_new_weight = np.power(self.max_priority, self.alpha)
 
     def create_variables(self, input_spaces, action_space=None):
-        super(MemPrioritizedReplay, self).create_variables(input_spaces, action_space)
+        if self.columnar:
+            self.record_space = input_spaces["records"]
+            self.flat_record_space = self.record_space.flatten()
+            # One preallocated column per flattened record key.
+            self.memory = OrderedDict()
+            for key, space in self.flat_record_space.items():
+                self.memory[key] = np.zeros(
+                    shape=(self.capacity,) + space.shape, dtype=util.convert_dtype(space.dtype, to="np")
+                )
+        else:
+            super(MemPrioritizedReplay, self).create_variables(input_spaces, action_space)
         self.priority_capacity = 1
         while self.priority_capacity < self.capacity:
             self.priority_capacity *= 2
 
         # Create segment trees, initialize with neutral elements.
-        sum_values = [0.0 for _ in range_(2 * self.priority_capacity)]
+        sum_values = np.zeros(shape=(2 * self.priority_capacity,), dtype=np.float64)
         sum_segment_tree = MemSegmentTree(sum_values, self.priority_capacity, operator.add)
-        min_values = [float('inf') for _ in range_(2 * self.priority_capacity)]
+        min_values = np.full(shape=(2 * self.priority_capacity,), fill_value=float('inf'), dtype=np.float64)
         min_segment_tree = MemSegmentTree(min_values, self.priority_capacity, min)
 
         self.merged_segment_tree = MinSumSegmentTree(
@@ -79,7 +103,12 @@ class MemPrioritizedReplay(Memory):
             return
         num_records = len(records[self.terminal_key])
 
-        if num_records == 1:
+        if self.columnar:
+            insert_indices = np.arange(start=self.index, stop=self.index + num_records) % self.capacity
+            self.merged_segment_tree.insert_many(insert_indices, self.default_new_weight)
+            for name, record_values in records.items():
+                self.memory[name][insert_indices] = np.asarray(record_values)
+        elif num_records == 1:
             if self.index >= self.size:
                 self.memory_values.append(records)
             else:
@@ -87,9 +116,9 @@ class MemPrioritizedReplay(Memory):
             self.merged_segment_tree.insert(self.index, self.default_new_weight)
         else:
             insert_indices = np.arange(start=self.index, stop=self.index + num_records) % self.capacity
+            self.merged_segment_tree.insert_many(insert_indices, self.default_new_weight)
             i = 0
             for insert_index in insert_indices:
-                self.merged_segment_tree.insert(insert_index, self.default_new_weight)
                 record = {}
                 for name, record_values in records.items():
                     record[name] = record_values[i]
@@ -106,41 +135,41 @@ class MemPrioritizedReplay(Memory):
     @rlgraph_api
     def _graph_fn_get_records(self, num_records=1):
         available_records = min(num_records, self.size)
-        indices = []
         prob_sum = self.merged_segment_tree.sum_segment_tree.get_sum(0, self.size - 1)
         samples = np.random.random(size=(available_records,)) * prob_sum
-        for sample in samples:
-            indices.append(self.merged_segment_tree.sum_segment_tree.index_of_prefixsum(prefix_sum=sample))
-
-        sum_prob = self.merged_segment_tree.sum_segment_tree.get_sum() + SMALL_NUMBER
-        min_prob = self.merged_segment_tree.min_segment_tree.get_min_value() / sum_prob
-        max_weight = (min_prob * self.size) ** (-self.beta)
-        weights = []
-        for index in indices:
-            sample_prob = self.merged_segment_tree.sum_segment_tree.get(index) / sum_prob
-            weight = (sample_prob * self.size) ** (-self.beta)
-            weights.append(weight / max_weight)
-
-        if get_backend() == "pytorch":
-            indices = torch.tensor(indices)
-            weights = torch.tensor(weights)
-        else:
-            indices = np.asarray(indices)
-            weights = np.asarray(weights)
+        indices = self.merged_segment_tree.sum_segment_tree.index_of_prefixsum(prefix_sum=samples)
+        weights = self.merged_segment_tree.get_importance_weights(
+            indices, self.size, self.beta, sum_epsilon=SMALL_NUMBER
+        )
 
         records = DataOpDict()
-        for name, variable in self.memory.items():
-            records[name] = self.read_variable(variable, indices, dtype=
-            util.convert_dtype(self.flat_record_space[name].dtype, to="pytorch"))
+        if self.columnar:
+            # A single gather per column.
+            for name, column in self.memory.items():
+                records[name] = column[indices]
+                if get_backend() == "pytorch":
+                    records[name] = torch.from_numpy(records[name]).to(
+                        util.convert_dtype(self.flat_record_space[name].dtype, to="pytorch")
+                    )
+        else:
+            for name, variable in self.memory.items():
+                records[name] = self.read_variable(variable, indices, dtype=
+                util.convert_dtype(self.flat_record_space[name].dtype, to="pytorch"))
         records = define_by_run_unflatten(records)
+
+        if get_backend() == "pytorch":
+            indices = torch.from_numpy(indices)
+            weights = torch.from_numpy(weights)
         return records, indices, weights
 
     @rlgraph_api(must_be_complete=False)
     def _graph_fn_update_records(self, indices, update):
-        for index, loss in zip(indices, update):
-            priority = np.power(loss, self.alpha)
-            self.merged_segment_tree.insert(index, priority)
-            self.max_priority = max(self.max_priority, priority)
+        update = np.asarray(update)
+        if update.size == 0:
+            return
+        priorities = np.power(update, self.alpha)
+        self.merged_segment_tree.insert_many(indices, priorities)
+        self.max_priority = max(self.max_priority, np.max(priorities))
 
     def get_state(self):
         return {
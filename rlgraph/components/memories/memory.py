@@ -17,10 +17,16 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from rlgraph.utils.ops import FLATTEN_SCOPE_PREFIX
+from rlgraph import get_backend
+from rlgraph.utils.ops import FLATTEN_SCOPE_PREFIX, TraceContext
 
 from rlgraph.components.component import Component, rlgraph_api
-from rlgraph.utils import FlattenedDataOp
+from rlgraph.utils import FlattenedDataOp, DataOpDict
+from rlgraph.utils.define_by_run_ops import define_by_run_unflatten
+from rlgraph.utils.util import convert_dtype
+
+if get_backend() == "pytorch":
+    import torch
 
 
 class Memory(Component):
@@ -125,6 +131,82 @@ class Memory(Component):
             records[name] = self.read_variable(variable, indices)
         return records
 
+    def _create_pytorch_memory(self):
+        """
+        Replaces the memory's python lists with preallocated tensors of shape [capacity, ...] (one per flat record
+        key) so records can be written and read in bulk via `_write_range` and `_read_pytorch_records`.
+        """
+        for name in self.memory:
+            space = self.flat_record_space[name]
+            self.memory[name] = torch.zeros(
+                size=(self.capacity,) + space.shape, dtype=convert_dtype(space.dtype, to="pytorch")
+            )
+
+    def _write_range(self, variable, start, values):
+        """
+        Writes values into a memory tensor starting at `start`, wrapping around at the capacity (as two slice
+        writes). Values must not be longer than the capacity.
+
+        Args:
+            variable (torch.Tensor): Memory tensor of shape [capacity, ...].
+            start (int): Index to write the first value to.
+            values (Union[torch.Tensor,np.ndarray]): Values to write.
+        """
+        values = torch.as_tensor(values)
+        end = start + len(values)
+        if end <= self.capacity:
+            variable[start:end] = values
+        else:
+            split = self.capacity - start
+            variable[start:] = values[:split]
+            variable[:end - self.capacity] = values[split:]
+
+    def _read_range(self, variable, start, num_values):
+        """
+        Reads `num_values` contiguous values from a memory tensor starting at `start`, wrapping around at the
+        capacity.
+
+        Args:
+            variable (torch.Tensor): Memory tensor of shape [capacity, ...].
+            start (int): Index of the first value.
+            num_values (int): Number of values to read (at most the capacity).
+
+        Returns:
+            torch.Tensor: The values (a copy, never a view into the memory tensor).
+        """
+        end = start + num_values
+        if end <= self.capacity:
+            # Slices are views which later inserts would overwrite.
+            return variable[start:end].clone()
+        return torch.cat([variable[start:], variable[:end - self.capacity]])
+
+    def _read_pytorch_records(self, indices=None, start=0, num_records=0):
+        """
+        Reads records from the memory tensors, either at the given indices or as a contiguous (wrapping) range.
+
+        Args:
+            indices (Optional[Union[np.ndarray,torch.Tensor]]): Indices to read. If None, reads the range given
+                by `start` and `num_records`.
+            start (int): Index of the first record to read if no `indices` are given.
+            num_records (int): Number of records to read if no `indices` are given.
+
+        Returns:
+            DataOpDict: Unflattened record batch.
+        """
+        if indices is not None:
+            indices = torch.as_tensor(indices, dtype=torch.long)
+            num_records = len(indices)
+        records = DataOpDict()
+        for name, variable in self.memory.items():
+            # Empty memory during building: Return a single default record for shape inference.
+            if num_records == 0 and TraceContext.DEFINE_BY_RUN_CONTEXT == "building":
+                records[name] = torch.zeros(self.flat_record_space[name].shape, dtype=variable.dtype)
+            elif indices is not None:
+                records[name] = variable[indices]
+            else:
+                records[name] = self._read_range(variable, start, num_records)
+        return define_by_run_unflatten(records)
+
     @rlgraph_api
     def _graph_fn_get_size(self):
         """
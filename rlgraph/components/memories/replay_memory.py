@@ -19,8 +19,6 @@ from __future__ import print_function
 
 from rlgraph import get_backend
 from rlgraph.components.memories.memory import Memory
-from rlgraph.utils import util, DataOpDict
-from rlgraph.utils.define_by_run_ops import define_by_run_unflatten
 from rlgraph.utils.util import get_batch_size
 from rlgraph.utils.decorators import rlgraph_api
 
@@ -59,6 +57,8 @@ class ReplayMemory(Memory):
         assert 'terminals' in self.record_space
         # Main buffer index.
         self.index = self.get_variable(name="index", dtype=int, trainable=False, initializer=0)
+        if get_backend() == "pytorch":
+            self._create_pytorch_memory()
 
     @rlgraph_api(flatten_ops=True)
     def _graph_fn_insert_records(self, records):
@@ -86,10 +86,10 @@ class ReplayMemory(Memory):
             with tf.control_dependencies(control_inputs=index_updates):
                 return tf.no_op()
         elif get_backend() == "pytorch":
-            update_indices = torch.arange(self.index, self.index + num_records) % self.capacity
+            # Only the last `capacity` records remain in the memory.
+            start = (self.index + max(num_records - self.capacity, 0)) % self.capacity
             for key in self.memory:
-                for i, val in zip(update_indices, records[key]):
-                    self.memory[key][i] = val
+                self._write_range(self.memory[key], start, records[key][-self.capacity:])
             self.index = (self.index + num_records) % self.capacity
             self.size = min(self.size + num_records, self.capacity)
             return None
@@ -107,16 +107,11 @@ class ReplayMemory(Memory):
             # Return default importance weight one.
             return self._read_records(indices=indices), indices, tf.ones_like(tensor=indices, dtype=tf.float32)
         elif get_backend() == "pytorch":
-            indices = []
-            if self. size > 0:
-                indices = np.random.choice(np.arange(0, self.size), size=int(num_records))
+            indices = np.zeros(shape=(0,), dtype=np.int64)
+            if self.size > 0:
+                indices = np.random.randint(0, self.size, size=int(num_records))
                 indices = (self.index - 1 - indices) % self.capacity
-            records = DataOpDict()
-            for name, variable in self.memory.items():
-                records[name] = self.read_variable(variable, indices, dtype=
-                                                   util.convert_dtype(self.flat_record_space[name].dtype, to="pytorch"),
-                                                   shape=self.flat_record_space[name].shape)
-            records = define_by_run_unflatten(records)
+            records = self._read_pytorch_records(indices=indices)
             weights = torch.ones(indices.shape, dtype=torch.float32) if len(indices) > 0 \
                 else torch.ones(1, dtype=torch.float32)
             return records, indices, weights
@@ -19,15 +19,12 @@ from __future__ import print_function
 
 from rlgraph import get_backend
 from rlgraph.components.memories.memory import Memory
-from rlgraph.utils import util, DataOpDict
-from rlgraph.utils.define_by_run_ops import define_by_run_unflatten
 from rlgraph.utils.util import get_batch_size
 from rlgraph.utils.decorators import rlgraph_api
 
 if get_backend() == "tf":
     import tensorflow as tf
 elif get_backend() == "pytorch":
-    import numpy as np
     import torch
 
 
@@ -60,6 +57,9 @@ class RingBuffer(Memory):
         # Terminal indices contiguously arranged.
         self.episode_indices = self.get_variable(name="episode-indices", shape=(self.capacity,),
                                                  dtype=int, trainable=False)
+        if get_backend() == "pytorch":
+            self._create_pytorch_memory()
+            self.episode_indices = torch.zeros(self.capacity, dtype=torch.long)
 
     @rlgraph_api(flatten_ops=True)
     def _graph_fn_insert_records(self, records):
@@ -133,42 +133,44 @@ class RingBuffer(Memory):
             with tf.control_dependencies(control_inputs=record_updates):
                 return tf.no_op()
         elif get_backend() == "pytorch":
-            # TODO: Unclear if we should do this in numpy and then convert to torch once we sample.
             num_records = get_batch_size(records[self.terminal_key])
-            update_indices = torch.arange(self.index, self.index + num_records) % self.capacity
+            # Only the last `capacity` records remain in the memory.
+            if num_records > self.capacity:
+                records = {key: value[-self.capacity:] for key, value in records.items()}
+                self.index = (self.index + num_records - self.capacity) % self.capacity
+                num_records = self.capacity
+            terminals = torch.as_tensor(records[self.terminal_key])
 
             # Newly inserted episodes.
-            inserted_episodes = torch.sum(records[self.terminal_key].int(), 0)
+            inserted_episodes = int(torch.sum(terminals.int()))
 
             # Episodes previously existing in the range we inserted to as indicated
             # by count of terminals in the that slice.
-            episodes_in_insert_range = 0
-            # Count terminals in inserted range.
-            for index in update_indices:
-                episodes_in_insert_range += int(self.memory[self.terminal_key][index])
+            episodes_in_insert_range = int(torch.sum(
+                self._read_range(self.memory[self.terminal_key], self.index, num_records).int()
+            ))
             num_episode_update = self.num_episodes - episodes_in_insert_range + inserted_episodes
             self.episode_indices[:self.num_episodes - episodes_in_insert_range] = \
-                self.episode_indices[episodes_in_insert_range:self.num_episodes]
+                self.episode_indices[episodes_in_insert_range:self.num_episodes].clone()
 
             # Insert new episodes starting at previous count minus the ones we removed,
             # ending at previous count minus removed + inserted.
             slice_start = self.num_episodes - episodes_in_insert_range
             slice_end = num_episode_update
 
-            byte_terminals = records[self.terminal_key].byte()
-            mask = torch.masked_select(update_indices, byte_terminals)
+            update_indices = torch.arange(self.index, self.index + num_records) % self.capacity
+            mask = torch.masked_select(update_indices, terminals.byte())
             self.episode_indices[slice_start:slice_end] = mask
 
+            # Updates all the necessary sub-variables in the record.
+            for key in self.memory:
+                self._write_range(self.memory[key], self.index, records[key])
+
             # Update indices.
-            self.num_episodes = int(num_episode_update)
+            self.num_episodes = num_episode_update
             self.index = (self.index + num_records) % self.capacity
             self.size = min(self.size + num_records, self.capacity)
 
-            # Updates all the necessary sub-variables in the record.
-            for key in self.memory:
-                for i, val in zip(update_indices, records[key]):
-                    self.memory[key][i] = val
-
             # The TF version returns no-op, return None so return-val inference system does not throw error.
             return None
 
@@ -182,16 +184,9 @@ class RingBuffer(Memory):
             return self._read_records(indices=indices)
         elif get_backend() == "pytorch":
             available_records = min(num_records, self.size)
-            indices = np.arange(self.index - available_records, self.index) % self.capacity
-            records = DataOpDict()
-
-            for name, variable in self.memory.items():
-                records[name] = self.read_variable(variable, indices, dtype=
-                                                   util.convert_dtype(self.flat_record_space[name].dtype, to="pytorch"),
-                                                   shape=self.flat_record_space[name].shape)
-
-            records = define_by_run_unflatten(records)
-            return records
+            return self._read_pytorch_records(
+                start=(self.index - available_records) % self.capacity, num_records=available_records
+            )
 
     @rlgraph_api(ok_to_overwrite=True)
     def _graph_fn_get_episodes(self, num_episodes=1):
@@ -226,21 +221,13 @@ class RingBuffer(Memory):
             if stored_episodes == available_episodes:
                 start = 0
             else:
-                start = self.episode_indices[stored_episodes - available_episodes - 1] + 1
+                start = int(self.episode_indices[stored_episodes - available_episodes - 1]) + 1
 
             # End index is just the pointer to the most recent episode.
-            limit = self.episode_indices[stored_episodes - 1]
+            limit = int(self.episode_indices[stored_episodes - 1])
             if start >= limit:
                 limit += self.capacity - 1
-            indices = torch.arange(start, limit + 1) % self.capacity
-
-            records = DataOpDict()
-            for name, variable in self.memory.items():
-                records[name] = self.read_variable(variable, indices, dtype=
-                                                   util.convert_dtype(self.flat_record_space[name].dtype, to="pytorch"),
-                                                   shape=self.flat_record_space[name].shape)
-            records = define_by_run_unflatten(records)
-            return records
+            return self._read_pytorch_records(start=start % self.capacity, num_records=limit + 1 - start)
 
     def get_state(self):
         return {
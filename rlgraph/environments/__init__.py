@@ -25,6 +25,8 @@ from rlgraph.environments.openai_gym import OpenAIGymEnv
 from rlgraph.environments.random_env import RandomEnv
 from rlgraph.environments.vector_env import VectorEnv
 from rlgraph.environments.sequential_vector_env import SequentialVectorEnv
+from rlgraph.environments.subprocess_vector_env import SubprocessVectorEnv
+from rlgraph.environments.grid_world_vector_env import GridWorldVectorEnv
 
 Environment.__lookup_classes__ = dict(
     deterministic=DeterministicEnv,
@@ -34,13 +36,17 @@ Environment.__lookup_classes__ = dict(
     gaussiandensityasrewardenv=GaussianDensityAsRewardEnv,
     gridworld=GridWorld,
     gridworldenv=GridWorld,
+    gridworldvector=GridWorldVectorEnv,
+    gridworldvectorenv=GridWorldVectorEnv,
     openai=OpenAIGymEnv,
     openaigym=OpenAIGymEnv,
     openaigymenv=OpenAIGymEnv,
     random=RandomEnv,
     randomenv=RandomEnv,
     sequentialvector=SequentialVectorEnv,
-    sequentialvectorenv=SequentialVectorEnv
+    sequentialvectorenv=SequentialVectorEnv,
+    subprocessvector=SubprocessVectorEnv,
+    subprocessvectorenv=SubprocessVectorEnv
 )
 
 try:
@@ -0,0 +1,272 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import numpy as np
+from six.moves import xrange as range_
+
+from rlgraph.environments import VectorEnv
+from rlgraph.environments.grid_world import GridWorld
+
+
+class GridWorldVectorEnv(VectorEnv):
+    """
+    Simulates `num_environments` GridWorlds of the same map at once as NumPy arrays.
+
+    Transitions are looked up in precomputed [states, actions, outcomes] next-position and probability tables
+    (built from `GridWorld.get_possible_next_positions`), rewards and terminals in per-position tables, and camera
+    images are rendered by broadcasting a static background and writing all actor pixels with one scatter.
+    Stepping thus costs a handful of array operations regardless of the number of environments.
+    """
+    def __init__(self, num_environments, world="4x4", save_mode=False, action_type="udlr",
+                 reward_function="sparse", state_representation="discrete"):
+        """
+        Args:
+            num_environments (int): Number of grid worlds to simulate.
+
+            For all other args, see `GridWorld`.
+        """
+        # Template env defining map, spaces and transition function. Also used for rendering.
+        self.env = GridWorld(
+            world=world, save_mode=save_mode, action_type=action_type, reward_function=reward_function,
+            state_representation=state_representation
+        )
+        super(GridWorldVectorEnv, self).__init__(
+            num_environments=num_environments, state_space=self.env.state_space, action_space=self.env.action_space
+        )
+        self.action_type = action_type
+        self.state_representation = state_representation
+        self.n_row, self.n_col = self.env.n_row, self.env.n_col
+        num_positions = self.n_row * self.n_col
+
+        # Transition tables: [positions, moves (0=up, 1=right, 2=down, 3=left), outcomes].
+        # `in_air` tables are used for the second field of a jump.
+        self.next_positions, self.cumulative_probs = self._build_transition_tables(in_air=False)
+        self.next_positions_in_air, self.cumulative_probs_in_air = self._build_transition_tables(in_air=True)
+
+        # Reward and terminal flag for arriving in a position.
+        self.rewards = np.zeros(shape=(num_positions,), dtype=np.float32)
+        self.terminals = np.zeros(shape=(num_positions,), dtype=np.bool_)
+        self.start_positions = []
+        for pos in range_(num_positions):
+            field_type = self.env.world[pos % self.n_col, pos // self.n_col]
+            if field_type == "H":
+                self.terminals[pos] = True
+                self.rewards[pos] = -5 if reward_function == "sparse" else -10
+            elif field_type == "F":
+                self.rewards[pos] = -3 if reward_function == "sparse" else -10
+            elif field_type in [" ", "S"]:
+                self.rewards[pos] = -1
+            elif field_type == "G":
+                self.terminals[pos] = True
+                self.rewards[pos] = 1 if reward_function == "sparse" else 50
+            # Walls can never be entered, their entries are unused.
+            if field_type in [" ", "S", "F"]:
+                self.start_positions.append(pos)
+        self.start_positions = np.array(self.start_positions, dtype=np.int32)
+
+        # Orientation (index = orientation / 90) to the "xy+orientation" direction vector.
+        self.orientation_vectors = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]], dtype=np.int32)
+
+        # Camera background without the actor (see `GridWorld.update_cam_pixels`).
+        self.camera_background = np.zeros(shape=(self.n_row, self.n_col, 3), dtype=np.int32)
+        self.camera_background[self.env.world == "F", 0] = 127
+        self.camera_background[self.env.world == "H", 0] = 255
+        self.camera_background[self.env.world == "W", 1] = 127
+        self.camera_background[self.env.world == "G", 1] = 255
+
+        self.discrete_pos = np.full(shape=(num_environments,), fill_value=self.env.default_start_pos, dtype=np.int32)
+        self.orientation = np.zeros(shape=(num_environments,), dtype=np.int32)
+        self.env_indices = np.arange(num_environments)
+
+    def _build_transition_tables(self, in_air):
+        """
+        Tabulates `GridWorld.get_possible_next_positions` for all positions and moves.
+
+        Args:
+            in_air (bool): Whether to tabulate the in-air transitions of jumps.
+
+        Returns:
+            Tuple[np.ndarray,np.ndarray]: Next positions and cumulative probabilities, both of shape
+                [positions, moves, outcomes]. Entries beyond a position's number of outcomes repeat the last outcome
+                with a cumulative probability of 1.0.
+        """
+        num_positions = self.n_row * self.n_col
+        outcomes = [[self.env.get_possible_next_positions(pos, move, in_air=in_air) for move in range_(4)]
+                    for pos in range_(num_positions)]
+        num_outcomes = max(len(o) for per_pos in outcomes for o in per_pos)
+
+        next_positions = np.zeros(shape=(num_positions, 4, num_outcomes), dtype=np.int32)
+        cumulative_probs = np.ones(shape=(num_positions, 4, num_outcomes), dtype=np.float32)
+        for pos in range_(num_positions):
+            for move in range_(4):
+                positions, probs = zip(*outcomes[pos][move])
+                n = len(positions)
+                next_positions[pos, move, :n] = positions
+                next_positions[pos, move, n:] = positions[-1]
+                cumulative_probs[pos, move, :n] = np.cumsum(probs)
+        return next_positions, cumulative_probs
+
+    def seed(self, seed=None):
+        if seed is None:
+            seed = time.time()
+        np.random.seed(seed)
+        return seed
+
+    def get_env(self, index=0):
+        # Sync the template env so it reflects the requested sub-environment.
+        self.env.discrete_pos = int(self.discrete_pos[index])
+        self.env.orientation = int(self.orientation[index]) * 90
+        self.env.refresh_state()
+        return self.env
+
+    def reset(self, index=0, randomize=False):
+        """
+        Args:
+            index (int): Index of the sub-environment to reset.
+            randomize (bool): Whether to start the new episode in a random position (instead of "S").
+        """
+        self._reset(np.array([index]), randomize)
+        return self._get_states(np.array([index]))[0]
+
+    def reset_all(self, randomize=False):
+        self._reset(self.env_indices, randomize)
+        return self._get_states()
+
+    def _reset(self, indices, randomize):
+        if randomize is False:
+            self.discrete_pos[indices] = self.env.default_start_pos
+        else:
+            self.discrete_pos[indices] = np.random.choice(self.start_positions, size=len(indices))
+        self.orientation[indices] = 0
+
+    def step(self, actions, **kwargs):
+        """
+        Steps all grid worlds at once.
+
+        Args:
+            actions (Union[np.ndarray,Dict[str,np.ndarray]]): One action per sub-environment.
+                For "udlr": Ints 0-3. For "ftj": Either ints 0-17 (see `GridWorld._translate_action`) or a dict with
+                "turn", "forward" and "jump" arrays.
+
+        Returns:
+            tuple: Batched states, rewards, terminals and a list of infos (all None).
+        """
+        if self.action_type == "ftj":
+            self._step_ftj(actions)
+        else:
+            self.discrete_pos = self._move(self.discrete_pos, np.asarray(actions, dtype=np.int32).reshape(-1))
+
+        return self._get_states(), self.rewards[self.discrete_pos], self.terminals[self.discrete_pos], \
+            [None] * self.num_environments
+
+    def _step_ftj(self, actions):
+        if isinstance(actions, dict):
+            turn = np.asarray(actions.get("turn", 1), dtype=np.int32)
+            forward = np.asarray(actions.get("forward", 1), dtype=np.int32)
+            jump = np.asarray(actions.get("jump", 0), dtype=np.int32)
+        else:
+            # Decode flat actions, same mapping as `GridWorld._translate_action`.
+            actions = np.asarray(actions, dtype=np.int32).reshape(-1)
+            turn = actions // 6
+            forward = (actions % 6) // 2
+            jump = actions % 2
+
+        self.orientation = (self.orientation + turn - 1) % 4
+        # Forward (2) moves in the direction of the orientation, backward (0) in the opposite one.
+        moves = np.where(forward == 0, (self.orientation + 2) % 4, self.orientation)
+        moving = np.broadcast_to(forward != 1, self.discrete_pos.shape)
+        if np.any(moving):
+            self.discrete_pos[moving] = self._move(self.discrete_pos[moving], moves[moving])
+
+        # Jumps move two fields in the direction of the orientation, the second one in the air.
+        jumping = np.broadcast_to(jump == 1, self.discrete_pos.shape)
+        if np.any(jumping):
+            pos, moves = self.discrete_pos[jumping], self.orientation[jumping]
+            pos = self._move(pos, moves)
+            self.discrete_pos[jumping] = self._move(pos, moves, in_air=True)
+
+    def _move(self, positions, moves, in_air=False):
+        """
+        Samples next positions from the transition tables.
+
+        Args:
+            positions (np.ndarray): Current discrete positions.
+            moves (np.ndarray): Moves (0=up, 1=right, 2=down, 3=left), one per position.
+            in_air (bool): Whether to use the in-air transitions.
+
+        Returns:
+            np.ndarray: The next discrete positions.
+        """
+        next_positions = self.next_positions_in_air if in_air else self.next_positions
+        cumulative_probs = self.cumulative_probs_in_air if in_air else self.cumulative_probs
+        # Deterministic worlds: No sampling required.
+        if next_positions.shape[2] == 1:
+            return next_positions[positions, moves, 0]
+        samples = np.random.random(size=positions.shape)
+        outcomes = np.sum(samples[:, None] >= cumulative_probs[positions, moves], axis=1)
+        outcomes = np.minimum(outcomes, next_positions.shape[2] - 1)
+        return next_positions[positions, moves, outcomes]
+
+    def _get_states(self, indices=None):
+        if indices is None:
+            indices = self.env_indices
+        pos = self.discrete_pos[indices]
+        if self.state_representation == "discrete":
+            return pos.copy()
+        x = pos // self.n_col
+        y = pos % self.n_col
+        if self.state_representation == "xy":
+            return np.stack([x, y], axis=-1)
+        elif self.state_representation == "xy+orientation":
+            return np.concatenate(
+                [np.stack([x, y], axis=-1), self.orientation_vectors[self.orientation[indices]]], axis=-1
+            )
+        # Camera.
+        pixels = np.repeat(self.camera_background[None], len(indices), axis=0)
+        pixels[np.arange(len(indices)), y, x, 2] = 255
+        return pixels
+
+    def step_flow(self, actions):
+        """
+        Steps all grid worlds and resets those that terminated.
+
+        Returns:
+            tuple: Batched states, rewards and terminals.
+        """
+        _, rewards, terminals, _ = self.step(actions)
+        if np.any(terminals):
+            self._reset(self.env_indices[terminals], randomize=False)
+        return self._get_states(), rewards, terminals
+
+    def reset_flow(self):
+        return self.reset_all()
+
+    def render(self, index=0):
+        self.get_env(index).render()
+
+    def terminate(self, index=0):
+        pass
+
+    def terminate_all(self):
+        pass
+
+    def __str__(self):
+        return "GridWorldVectorEnv({}, num_environments={})".format(self.env.description, self.num_environments)
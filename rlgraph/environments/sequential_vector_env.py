@@ -20,6 +20,7 @@ from __future__ import print_function
 from queue import Queue
 from threading import Thread
 
+import numpy as np
 from six.moves import xrange as range_
 
 from rlgraph.environments import VectorEnv, Environment
@@ -87,6 +88,32 @@ class SequentialVectorEnv(VectorEnv):
             infos.append(info)
         return states, rewards, terminals, infos
 
+    def step_flow(self, actions):
+        """
+        Steps all sub-environments via their `step_flow` methods (which reset terminated environments) and
+        batches the results.
+
+        Args:
+            actions (any): Actions, one per sub-environment.
+
+        Returns:
+            tuple: Batched (flat) state components, followed by the batched rewards and terminals.
+        """
+        results = [self.environments[i].step_flow(actions[i]) for i in range_(self.num_environments)]
+        return tuple(np.stack(values) for values in zip(*results))
+
+    def reset_flow(self):
+        """
+        Resets all sub-environments via their `reset_flow` methods and batches the states.
+
+        Returns:
+            Union[np.ndarray,tuple]: Batched state or tuple of batched (flat) state components.
+        """
+        states = [env.reset_flow() for env in self.environments]
+        if isinstance(states[0], (list, tuple)):
+            return tuple(np.stack(values) for values in zip(*states))
+        return np.stack(states)
+
     def render(self, index=0):
         self.environments[index].render()
 
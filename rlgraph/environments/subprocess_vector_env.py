@@ -0,0 +1,295 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+
+import numpy as np
+from six.moves import xrange as range_
+
+from rlgraph.environments import VectorEnv, Environment
+from rlgraph.spaces.containers import ContainerSpace
+from rlgraph.utils.rlgraph_errors import RLGraphError
+from rlgraph.utils.util import convert_dtype
+
+
+class SubprocessVectorEnv(VectorEnv):
+    """
+    Multi-environment class which runs shards of environments in worker processes so stepping
+    uses multiple cores.
+
+    States of primitive state spaces are written by the worker processes into one shared memory buffer of shape
+    [num_environments] + state shape, so only actions, rewards, terminals and infos travel through pipes.
+    Container state spaces fall back to sending states through the pipes.
+    """
+    def __init__(self, num_environments, env_spec, num_processes=None, auto_reset=False, context=None):
+        """
+        Args:
+            num_environments (int): Number of environments.
+            env_spec (Union[dict,callable]): Environment spec or callable returning a new environment object.
+            num_processes (Optional[int]): Number of worker processes. Environments are split into contiguous shards,
+                one per process. Default: min(num_environments, number of CPUs).
+            auto_reset (bool): If True, a sub-environment is reset inside its worker process as soon as it returns
+                a terminal. `step` then returns the first state of the new episode for that environment and the
+                terminal state under the "terminal_state" key of its info dict.
+            context (Optional[str]): Multiprocessing start method ("fork", "spawn", "forkserver"). Callable env specs
+                must be picklable for "spawn" and "forkserver". Default: The platform's default method.
+        """
+        if not isinstance(env_spec, dict) and not hasattr(env_spec, '__call__'):
+            raise ValueError("Env_spec must be either a dict containing an environment spec or a callable"
+                             "returning a new environment object.")
+        # Probe spaces from a throwaway instance as shared buffers must exist before the workers start.
+        probe_env = _make_env(env_spec)
+        state_space, action_space = probe_env.state_space, probe_env.action_space
+        probe_env.terminate()
+
+        super(SubprocessVectorEnv, self).__init__(
+            num_environments=num_environments, state_space=state_space, action_space=action_space
+        )
+        self.auto_reset = auto_reset
+
+        if num_processes is None:
+            num_processes = min(num_environments, multiprocessing.cpu_count())
+        self.num_processes = max(1, min(num_processes, num_environments))
+        # Contiguous env index shards, one per process.
+        self.shards = [list(shard) for shard in np.array_split(np.arange(num_environments), self.num_processes)]
+        self.env_to_shard = {}
+        for shard_index, shard in enumerate(self.shards):
+            for local_index, env_index in enumerate(shard):
+                self.env_to_shard[env_index] = (shard_index, local_index)
+
+        ctx = multiprocessing.get_context(context) if context is not None else multiprocessing
+        self.shared_states = not isinstance(state_space, ContainerSpace)
+        self.state_buffer = None
+        self.states = None
+        shared_buffer = None
+        if self.shared_states:
+            dtype = np.dtype(convert_dtype(state_space.dtype, to="np"))
+            shape = (num_environments,) + tuple(state_space.shape)
+            shared_buffer = ctx.RawArray("b", max(1, int(np.prod(shape)) * dtype.itemsize))
+            self.state_buffer = (shared_buffer, dtype, shape)
+            self.states = _buffer_as_array(self.state_buffer)
+
+        self.pipes = []
+        self.processes = []
+        for shard in self.shards:
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker, args=(child_pipe, env_spec, shard, self.state_buffer, auto_reset)
+            )
+            process.daemon = True
+            process.start()
+            child_pipe.close()
+            self.pipes.append(parent_pipe)
+            self.processes.append(process)
+
+        # Wait for all ready signals to surface construction errors.
+        for pipe in self.pipes:
+            self._receive(pipe)
+        self.waiting = False
+        self.closed = False
+
+    def seed(self, seed=None):
+        for pipe in self.pipes:
+            pipe.send(("seed", seed))
+        seeds = []
+        for pipe in self.pipes:
+            seeds.extend(self._receive(pipe))
+        return seeds
+
+    def get_env(self, index=0):
+        raise RLGraphError("Sub-environments of a SubprocessVectorEnv live in worker processes and can not be "
+                           "accessed directly.")
+
+    def reset(self, index=0):
+        shard_index, local_index = self.env_to_shard[index]
+        self.pipes[shard_index].send(("reset", local_index))
+        state = self._receive(self.pipes[shard_index])
+        if self.shared_states:
+            return self.states[index].copy()
+        return state
+
+    def reset_all(self):
+        for pipe in self.pipes:
+            pipe.send(("reset_all", None))
+        states = []
+        for pipe in self.pipes:
+            states.extend(self._receive(pipe))
+        if self.shared_states:
+            return self.states.copy()
+        return states
+
+    def step(self, actions, **kwargs):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def step_async(self, actions):
+        """
+        Sends actions to all worker processes without waiting for the results.
+
+        Args:
+            actions (any): Actions, one per sub-environment.
+        """
+        if self.waiting:
+            raise RLGraphError("Cannot call `step_async` while waiting on a previous step. Call `step_wait` first.")
+        for pipe, shard in zip(self.pipes, self.shards):
+            pipe.send(("step", [actions[env_index] for env_index in shard]))
+        self.waiting = True
+
+    def step_wait(self):
+        """
+        Waits for the steps issued by `step_async` to complete.
+
+        Returns:
+            tuple: States, rewards, terminals and infos of all sub-environments.
+        """
+        if not self.waiting:
+            raise RLGraphError("Cannot call `step_wait` without a preceding call to `step_async`.")
+        states, rewards, terminals, infos = [], [], [], []
+        try:
+            for pipe in self.pipes:
+                shard_states, shard_rewards, shard_terminals, shard_infos = self._receive(pipe)
+                states.extend(shard_states)
+                rewards.extend(shard_rewards)
+                terminals.extend(shard_terminals)
+                infos.extend(shard_infos)
+        finally:
+            self.waiting = False
+        if self.shared_states:
+            # Copy out so the next step does not overwrite returned states.
+            states = self.states.copy()
+        return states, np.asarray(rewards), np.asarray(terminals), infos
+
+    def render(self, index=0):
+        shard_index, local_index = self.env_to_shard[index]
+        self.pipes[shard_index].send(("render", local_index))
+        self._receive(self.pipes[shard_index])
+
+    def terminate(self, index=0):
+        shard_index, local_index = self.env_to_shard[index]
+        self.pipes[shard_index].send(("terminate", local_index))
+        self._receive(self.pipes[shard_index])
+
+    def terminate_all(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for pipe in self.pipes:
+                pipe.recv()
+            self.waiting = False
+        for pipe in self.pipes:
+            try:
+                pipe.send(("close", None))
+                pipe.close()
+            except IOError:
+                pass
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    @staticmethod
+    def _receive(pipe):
+        result = pipe.recv()
+        # Errors inside the worker are passed back through the pipe.
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def __str__(self):
+        return "SubprocessVectorEnv(num_environments={}, num_processes={})".format(
+            self.num_environments, self.num_processes
+        )
+
+
+def _make_env(env_spec):
+    if isinstance(env_spec, dict):
+        return Environment.from_spec(env_spec)
+    return env_spec()
+
+
+def _buffer_as_array(state_buffer):
+    shared_buffer, dtype, shape = state_buffer
+    return np.frombuffer(shared_buffer, dtype=np.int8, count=int(np.prod(shape)) * dtype.itemsize).\
+        view(dtype).reshape(shape)
+
+
+def _worker(pipe, env_spec, env_indices, state_buffer, auto_reset):
+    """
+    Worker process loop stepping a shard of environments.
+
+    Args:
+        pipe (multiprocessing.Connection): Pipe to the main process.
+        env_spec (Union[dict,callable]): Environment spec or callable.
+        env_indices (List[int]): Global indices of the environments in this shard.
+        state_buffer (Optional[tuple]): Shared state buffer, its dtype and shape. If None, states are sent
+            through the pipe.
+        auto_reset (bool): Whether to reset environments on terminals.
+    """
+    environments = []
+    try:
+        environments = [_make_env(env_spec) for _ in env_indices]
+        states = _buffer_as_array(state_buffer) if state_buffer is not None else None
+
+        def write(local_index, state):
+            if states is None:
+                return state
+            states[env_indices[local_index]] = state
+            return None
+
+        pipe.send(None)
+        while True:
+            command, data = pipe.recv()
+            if command == "step":
+                step_states, rewards, terminals, infos = [], [], [], []
+                for i, (env, action) in enumerate(zip(environments, data)):
+                    state, reward, terminal, info = env.step(action)
+                    if auto_reset and terminal:
+                        info = dict(info) if isinstance(info, dict) else {}
+                        info["terminal_state"] = state
+                        state = env.reset()
+                    step_states.append(write(i, state))
+                    rewards.append(reward)
+                    terminals.append(terminal)
+                    infos.append(info)
+                pipe.send((step_states, rewards, terminals, infos))
+            elif command == "reset":
+                pipe.send(write(data, environments[data].reset()))
+            elif command == "reset_all":
+                pipe.send([write(i, env.reset()) for i, env in enumerate(environments)])
+            elif command == "seed":
+                pipe.send([env.seed(data) for env in environments])
+            elif command == "render":
+                pipe.send(environments[data].render())
+            elif command == "terminate":
+                pipe.send(environments[data].terminate())
+            elif command == "close":
+                break
+            else:
+                raise RLGraphError("Unknown SubprocessVectorEnv command '{}'.".format(command))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        # Send the exception back so the main process knows what's going on.
+        try:
+            pipe.send(e)
+        except IOError:
+            pass
+    finally:
+        for env in environments:
+            env.terminate()
+        pipe.close()
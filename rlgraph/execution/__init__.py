@@ -18,10 +18,13 @@ from __future__ import division
 from __future__ import print_function
 
 from rlgraph.execution.environment_sample import EnvironmentSample
+from rlgraph.execution.inference_server import InferenceServer, InferenceClient
+from rlgraph.execution.rollout_buffer import RolloutBuffer
 from rlgraph.execution.worker import Worker
 from rlgraph.execution.single_threaded_worker import SingleThreadedWorker
 
-__all__ = ["Worker", "SingleThreadedWorker", "EnvironmentSample"]
+__all__ = ["Worker", "SingleThreadedWorker", "EnvironmentSample", "InferenceServer", "InferenceClient",
+           "RolloutBuffer"]
 
 Worker.__lookup_classes__ = dict(
    single=SingleThreadedWorker,
@@ -0,0 +1,261 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import logging
+import multiprocessing
+import time
+from threading import Lock, Thread
+
+import numpy as np
+from six.moves import queue
+
+from rlgraph.utils.rlgraph_errors import RLGraphError
+
+
+class InferenceServer(object):
+    """
+    Serves `get_action` calls of many environment-stepping threads or processes from a single agent by
+    dynamically batching their requests (analogous to the in-graph `dynamic_batching` helper, but for the python
+    execution path).
+
+    The server runs in a background thread of the process owning the agent. Clients obtained via `create_client`
+    may be passed to other processes (at process creation) and block on `get_action` until their slice of the
+    batched result is available. Servers with `local_clients` only serve threads of their own process via plain
+    thread-safe queues.
+    """
+    def __init__(self, agent, min_batch_size=1, max_batch_size=256, timeout_ms=10, use_exploration=True,
+                 apply_preprocessing=True, extra_returns=None, context=None, lock=None, local_clients=False):
+        """
+        Args:
+            agent (Agent): Agent to compute actions with.
+            min_batch_size (int): Number of states to wait for before computing a batch, unless `timeout_ms` passes.
+            max_batch_size (int): Max. number of states per batch. Requests are never split, so a single request
+                larger than this is computed alone.
+            timeout_ms (Optional[float]): Milliseconds after the first request of a batch arrived after which the
+                batch is computed even if it holds fewer than `min_batch_size` states. None for no timeout.
+            use_exploration (bool): Passed on to `agent.get_action`.
+            apply_preprocessing (bool): Passed on to `agent.get_action`.
+            extra_returns (Optional[Set[str]]): Passed on to `agent.get_action`.
+            context (Optional[str]): Multiprocessing start method used to create the queues. Default: The
+                platform's default method.
+            lock (Optional[Lock]): Lock held while computing a batch, e.g. to serialize agent access with weight
+                updates from other threads. Default: A new lock.
+            local_clients (bool): If True, all clients run in threads of this process and communicate via
+                `queue.Queue`s instead of multiprocessing queues (which hold a feeder thread and pipes each).
+        """
+        if min_batch_size > max_batch_size:
+            raise RLGraphError("Min. batch size {} must not exceed max. batch size {}.".format(
+                min_batch_size, max_batch_size))
+        self.logger = logging.getLogger(__name__)
+        self.agent = agent
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout_ms / 1000 if timeout_ms is not None else None
+        self.use_exploration = use_exploration
+        self.apply_preprocessing = apply_preprocessing
+        self.extra_returns = extra_returns
+        self.lock = lock if lock is not None else Lock()
+
+        self.local_clients = local_clients
+        self.ctx = multiprocessing.get_context(context) if context is not None else multiprocessing
+        self.request_queue = self._create_queue()
+        self.response_queues = []
+        # Request taken from the queue which did not fit into the last batch.
+        self.carry_over = None
+
+        self.thread = None
+        self.running = False
+        self.num_batches = 0
+        self.num_requests = 0
+        self.num_states = 0
+
+    def create_client(self):
+        """
+        Registers a new client. Clients must be created before they are passed to other processes.
+
+        Returns:
+            InferenceClient: Client to request actions with.
+        """
+        response_queue = self._create_queue()
+        self.response_queues.append(response_queue)
+        return InferenceClient(len(self.response_queues) - 1, self.request_queue, response_queue)
+
+    def start(self):
+        """
+        Starts serving requests in a background thread.
+        """
+        if self.running:
+            return
+        self.running = True
+        self.thread = Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the serving thread after the batch in progress and closes the clients' response queues. Clients
+        can not be used after stopping.
+        """
+        if not self.running:
+            return
+        self.running = False
+        # Wake up the serving thread.
+        self.request_queue.put(None)
+        self.thread.join()
+        if not self.local_clients:
+            for response_queue in self.response_queues:
+                # Do not block on unread responses when exiting.
+                response_queue.cancel_join_thread()
+                response_queue.close()
+        self.response_queues = []
+
+    def get_metrics(self):
+        """
+        Returns:
+            dict: Number of computed batches, number of served requests and mean states per batch.
+        """
+        return dict(
+            num_batches=self.num_batches,
+            num_requests=self.num_requests,
+            mean_batch_size=self.num_states / self.num_batches if self.num_batches > 0 else 0.0
+        )
+
+    def _create_queue(self):
+        return queue.Queue() if self.local_clients else self.ctx.Queue()
+
+    def _run(self):
+        while self.running:
+            requests = self._next_batch()
+            if len(requests) > 0:
+                self._serve(requests)
+
+    def _next_batch(self):
+        """
+        Collects requests until `min_batch_size` states arrived or the timeout passed, then takes all
+        immediately available requests up to `max_batch_size` states.
+
+        Returns:
+            list: Tuples of client id and states.
+        """
+        if self.carry_over is not None:
+            first, self.carry_over = self.carry_over, None
+        else:
+            first = self.request_queue.get()
+        if first is None:
+            return []
+        requests = [first]
+        num_states = _batch_size(first[1])
+        deadline = time.time() + self.timeout if self.timeout is not None else None
+
+        while num_states < self.max_batch_size:
+            try:
+                if num_states >= self.min_batch_size:
+                    request = self.request_queue.get_nowait()
+                elif deadline is None:
+                    request = self.request_queue.get()
+                else:
+                    request = self.request_queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if request is None:
+                self.running = False
+                break
+            request_size = _batch_size(request[1])
+            if num_states + request_size > self.max_batch_size:
+                self.carry_over = request
+                break
+            requests.append(request)
+            num_states += request_size
+        return requests
+
+    def _serve(self, requests):
+        sizes = [_batch_size(states) for _, states in requests]
+        try:
+            states = _concat([states for _, states in requests])
+            with self.lock:
+                result = self.agent.get_action(
+                    states, use_exploration=self.use_exploration, apply_preprocessing=self.apply_preprocessing,
+                    extra_returns=self.extra_returns
+                )
+        except Exception as e:
+            self.logger.error("Inference server batch failed: {}".format(e))
+            for client_id, _ in requests:
+                self.response_queues[client_id].put(e)
+            return
+
+        start = 0
+        for (client_id, _), size in zip(requests, sizes):
+            self.response_queues[client_id].put(_slice(result, start, start + size))
+            start += size
+
+        self.num_batches += 1
+        self.num_requests += len(requests)
+        self.num_states += start
+
+
+class InferenceClient(object):
+    """
+    Handle to an `InferenceServer` for a single environment-stepping thread or process.
+    """
+    def __init__(self, client_id, request_queue, response_queue):
+        self.client_id = client_id
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+
+    def get_action(self, states):
+        """
+        Requests actions for a batch of states and blocks until they are computed.
+
+        Args:
+            states (Union[dict,tuple,np.ndarray]): Batched states.
+
+        Returns:
+            any: Actions for the given states (plus extra returns as configured on the server).
+        """
+        self.request_queue.put((self.client_id, states))
+        result = self.response_queue.get()
+        # Errors of the batch computation are passed back to every client in the batch.
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _batch_size(states):
+    if isinstance(states, dict):
+        return _batch_size(next(iter(states.values())))
+    elif isinstance(states, tuple):
+        return _batch_size(states[0])
+    return len(states)
+
+
+def _concat(batches):
+    first = batches[0]
+    if isinstance(first, dict):
+        return {key: _concat([batch[key] for batch in batches]) for key in first}
+    elif isinstance(first, tuple):
+        return tuple(_concat([batch[i] for batch in batches]) for i in range(len(first)))
+    return np.concatenate([np.asarray(batch) for batch in batches], axis=0)
+
+
+def _slice(result, start, end):
+    if isinstance(result, dict):
+        return {key: _slice(value, start, end) for key, value in result.items()}
+    elif isinstance(result, tuple):
+        return tuple(_slice(value, start, end) for value in result)
+    return np.asarray(result)[start:end]
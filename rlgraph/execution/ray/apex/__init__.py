@@ -19,6 +19,7 @@ from __future__ import print_function
 
 from rlgraph.execution.ray.apex.apex_executor import ApexExecutor
 from rlgraph.execution.ray.apex.apex_memory import ApexMemory
+from rlgraph.execution.ray.apex.local_apex_executor import LocalApexExecutor
 from rlgraph.execution.ray.apex.ray_memory_actor import RayMemoryActor
 
-__all__ = ["ApexExecutor", "ApexMemory", "RayMemoryActor"]
+__all__ = ["ApexExecutor", "ApexMemory", "LocalApexExecutor", "RayMemoryActor"]
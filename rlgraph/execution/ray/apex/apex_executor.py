@@ -17,23 +17,28 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 import random
+import time
 
 from rlgraph.environments import Environment
 from six.moves import queue
 from threading import Thread
 
-from rlgraph import get_distributed_backend
+from rlgraph import get_backend, get_distributed_backend
 from rlgraph.agents import Agent
 from rlgraph.execution.ray import RayValueWorker
 from rlgraph.execution.ray.apex.ray_memory_actor import RayMemoryActor
 from rlgraph.execution.ray.ray_executor import RayExecutor
-from rlgraph.execution.ray.ray_util import create_colocated_ray_actors, RayTaskPool, RayWeight
+from rlgraph.execution.ray.ray_util import create_colocated_ray_actors, RayTaskPool
 from rlgraph.spaces import Dict
 
 if get_distributed_backend() == "ray":
     import ray
 
+if get_backend() == "pytorch":
+    import torch
+
 
 class ApexExecutor(RayExecutor):
     """
@@ -89,7 +94,47 @@ class ApexExecutor(RayExecutor):
         self.setup_execution()
 
     def setup_execution(self):
+        self.setup_specs()
+
         # Create local worker agent according to spec.
+        self.local_agent = Agent.from_spec(self.agent_config)
+
+        # Set up worker thread for performing updates.
+        self.update_worker = UpdateWorker(
+            agent=self.local_agent,
+            in_queue_size=self.executor_spec["learn_queue_size"]
+        )
+        # Threads downloading sampled batches ahead of the learner.
+        prefetch_depth = self.executor_spec.get("learner_prefetch_depth", self.executor_spec["learn_queue_size"])
+        pin_memory = self.executor_spec.get("pin_memory", False)
+        self.batch_prefetchers = [
+            BatchPrefetcher(self.update_worker.input_queue, in_queue_size=prefetch_depth, pin_memory=pin_memory)
+            for _ in range(self.executor_spec.get("num_prefetch_threads", 1))
+        ]
+        # Start Ray cluster and connect to it.
+        self.ray_init()
+
+        self.ray_local_replay_memories = create_colocated_ray_actors(
+            cls=RayMemoryActor.as_remote(num_cpus=self.num_cpus_per_replay_actor),
+            config=self.apex_replay_spec,
+            num_agents=self.num_replay_workers
+        )
+
+        # Create remote workers for data collection.
+        self.logger.info("Initializing {} remote data collection agents, sample size: {}".format(
+            self.num_sample_workers, self.worker_spec["worker_sample_size"]))
+        self.ray_env_sample_workers = self.create_remote_workers(
+            RayValueWorker, self.num_sample_workers, self.agent_config,
+            # *args
+            self.worker_spec, self.environment_spec, self.worker_frame_skip
+        )
+        self.init_tasks()
+
+    def setup_specs(self):
+        """
+        Completes agent, replay and worker specs from the environment spaces and the executor spec, and
+        divides the replay capacity between the replay shards.
+        """
         # Extract states and actions space.
         environment = None
         if isinstance(self.environment_spec, dict):
@@ -99,6 +144,9 @@ class ApexExecutor(RayExecutor):
         self.agent_config["state_space"] = environment.state_space
         self.agent_config["action_space"] = environment.action_space
         self.apex_replay_spec["memory_spec"]["state_space"] = environment.state_space
+        # Frame-deduplicated replays link next-states to states up to n steps ahead.
+        if self.apex_replay_spec["memory_spec"].get("frame_stack", None) is not None:
+            self.apex_replay_spec["memory_spec"]["n_step_adjustment"] = self.worker_spec["n_step_adjustment"]
 
         # Ray cannot serialise Dict, must be dict.
         if isinstance(environment.action_space, Dict):
@@ -106,17 +154,6 @@ class ApexExecutor(RayExecutor):
         else:
             self.apex_replay_spec["memory_spec"]["action_space"] = environment.action_space
 
-        # Start Ray cluster and connect to it.
-        self.local_agent = Agent.from_spec(self.agent_config)
-
-        # Set up worker thread for performing updates.
-        self.update_worker = UpdateWorker(
-            agent=self.local_agent,
-            in_queue_size=self.executor_spec["learn_queue_size"]
-        )
-        self.ray_init()
-
-        # Create remote sample workers based on ray cluster spec.
         self.num_replay_workers = self.executor_spec["num_replay_workers"]
         self.num_sample_workers = self.executor_spec["num_sample_workers"]
 
@@ -133,26 +170,13 @@ class ApexExecutor(RayExecutor):
         self.apex_replay_spec["sample_batch_size"] = self.agent_config["update_spec"]["batch_size"]
         self.logger.info("Sampling batch size {}".format(self.apex_replay_spec["sample_batch_size"]))
 
-        self.ray_local_replay_memories = create_colocated_ray_actors(
-            cls=RayMemoryActor.as_remote(num_cpus=self.num_cpus_per_replay_actor),
-            config=self.apex_replay_spec,
-            num_agents=self.num_replay_workers
-        )
-
-        # Create remote workers for data collection.
         self.worker_spec["worker_sample_size"] = self.worker_sample_size
-        self.logger.info("Initializing {} remote data collection agents, sample size: {}".format(
-            self.num_sample_workers, self.worker_spec["worker_sample_size"]))
-        self.ray_env_sample_workers = self.create_remote_workers(
-            RayValueWorker, self.num_sample_workers, self.agent_config,
-            # *args
-            self.worker_spec, self.environment_spec, self.worker_frame_skip
-        )
-        self.init_tasks()
 
     def init_tasks(self):
-        # Start learner thread.
+        # Start learner and prefetch threads.
         self.update_worker.start()
+        for prefetcher in self.batch_prefetchers:
+            prefetcher.start()
 
         # Prioritized replay sampling tasks via RayAgents.
         for ray_memory in self.ray_local_replay_memories:
@@ -162,9 +186,9 @@ class ApexExecutor(RayExecutor):
 
         # Env interaction tasks via RayWorkers which each
         # have a local agent.
-        weights = RayWeight(self.local_agent.get_weights())
+        self.weight_broadcaster.update(self.local_agent.get_weights())
         for ray_worker in self.ray_env_sample_workers:
-            ray_worker.set_weights.remote(weights)
+            self.sync_worker_weights(ray_worker)
             self.steps_since_weights_synced[ray_worker] = 0
 
             self.logger.info("Synced worker {} weights, initializing sample tasks.".format(
@@ -172,6 +196,23 @@ class ApexExecutor(RayExecutor):
             for _ in range(self.env_interaction_task_depth):
                 self.env_sample_tasks.add_task(ray_worker, ray_worker.execute_and_get_with_count.remote())
 
+    def execute_workload(self, workload):
+        results = super(ApexExecutor, self).execute_workload(workload)
+        results.update(self.get_learner_metrics())
+        return results
+
+    def get_learner_metrics(self):
+        """
+        Returns learner feed statistics.
+
+        Returns:
+            dict: Learner idle time (waiting for batches) vs. update time, and how often the learner found its
+                input queue empty.
+        """
+        metrics = self.update_worker.get_metrics()
+        metrics["prefetch_download_time"] = sum(prefetcher.download_time for prefetcher in self.batch_prefetchers)
+        return metrics
+
     def _execute_step(self):
         """
         Executes a workload on Ray. The main loop performs the following
@@ -188,7 +229,6 @@ class ApexExecutor(RayExecutor):
         discarded = 0
         queue_inserts = 0
         rewards = []
-        weights = None
 
         # 1. Fetch results from RayWorkers.
         completed_sample_tasks = list(self.env_sample_tasks.get_completed())
@@ -203,13 +243,13 @@ class ApexExecutor(RayExecutor):
 
             self.steps_since_weights_synced[ray_worker] += sample_steps
             if self.steps_since_weights_synced[ray_worker] >= self.weight_sync_steps:
-                if weights is None or self.update_worker.update_done:
+                # New weights version only if the learner updated since the last one, workers holding the
+                # current version are skipped.
+                if self.update_worker.update_done:
                     self.update_worker.update_done = False
-                    weights = ray.put(RayWeight(self.local_agent.get_weights()))
-                # self.logger.debug("Syncing weights for worker {}".format(self.worker_ids[ray_worker]))
-                # self.logger.debug("Weights type: {}, weights = {}".format(type(weights), weights))
-                ray_worker.set_weights.remote(weights)
-                self.weight_syncs_executed += 1
+                    self.weight_broadcaster.update(self.local_agent.get_weights())
+                if self.sync_worker_weights(ray_worker):
+                    self.weight_syncs_executed += 1
                 self.steps_since_weights_synced[ray_worker] = 0
 
             # Reschedule environment samples.
@@ -222,15 +262,16 @@ class ApexExecutor(RayExecutor):
 
             # Retrieve results via id.
             # self.logger.info("replay task obj id {}".format(replay_remote_task))
-            if self.discard_queued_samples and self.update_worker.input_queue.full():
+            # The update worker's input queue is drained by the prefetch threads (and the feeder), so a saturated
+            # learner shows in the prefetchers' queues. The least loaded one is only full if all of them are.
+            prefetcher = min(self.batch_prefetchers, key=lambda p: p.input_queue.qsize())
+            if self.discard_queued_samples and prefetcher.input_queue.full():
                 discarded += 1
             else:
-                sampled_batch = ray.get(object_ids=replay_remote_task)
-                # Pass to the agent doing the actual updates.
+                # Hand the pending batch to the prefetch threads which download it ahead of the learner.
                 # The ray worker is passed along because we need to update its priorities later in the subsequent
                 # task (see loop below).
-                # Copy due to memory leaks in Ray, see https://github.com/ray-project/ray/pull/3484/
-                self.update_worker.input_queue.put((ray_memory, sampled_batch and sampled_batch.copy()))
+                prefetcher.input_queue.put((ray_memory, replay_remote_task))
                 queue_inserts += 1
 
         # 3. Update priorities on priority sampling workers using loss values produced by update worker.
@@ -279,17 +320,134 @@ class UpdateWorker(Thread):
         # Flag for main thread.
         self.update_done = False
 
+        # Learner feed metrics.
+        self.num_updates = 0
+        self.num_starved_updates = 0
+        self.idle_time = 0.0
+        self.update_time = 0.0
+
+        # If the agent supports in-graph input prefetching, a feeder thread enqueues batches into the graph as soon
+        # as they arrive and passes their memory actors and indices on in the same (FIFO) order.
+        self.input_prefetching = getattr(agent, "input_prefetching", False)
+        self.prefetched_queue = queue.Queue()
+        self.feeder = None
+        if self.input_prefetching:
+            self.feeder = Thread(target=self.feed)
+            self.feeder.daemon = True
+
     def run(self):
+        if self.feeder is not None:
+            self.feeder.start()
         while True:
             self.step()
 
+    def feed(self):
+        while True:
+            memory_actor, sample_batch = self.input_queue.get()
+            if sample_batch is not None:
+                self.agent.prefetch_batch(sample_batch)
+                self.prefetched_queue.put((memory_actor, sample_batch["indices"]))
+
     def step(self):
+        if self.input_prefetching:
+            return self.step_prefetched()
+
         # Fetch input for update:
         # Replay memory used.
+        if self.input_queue.empty():
+            self.num_starved_updates += 1
+        wait_start = time.perf_counter()
         memory_actor, sample_batch = self.input_queue.get()
+        update_start = time.perf_counter()
+        self.idle_time += update_start - wait_start
 
         if sample_batch is not None:
             losses = self.agent.update(batch=sample_batch)
             # Just pass back indices for updating.
             self.output_queue.put((memory_actor, sample_batch["indices"], losses[1]))
             self.update_done = True
+            self.num_updates += 1
+            self.update_time += time.perf_counter() - update_start
+
+    def step_prefetched(self):
+        # Batches are already enqueued (or being enqueued) into the graph by the feeder.
+        if self.prefetched_queue.empty():
+            self.num_starved_updates += 1
+        wait_start = time.perf_counter()
+        memory_actor, indices = self.prefetched_queue.get()
+        update_start = time.perf_counter()
+        self.idle_time += update_start - wait_start
+
+        losses = self.agent.update_from_prefetched_batch()
+        self.output_queue.put((memory_actor, indices, losses[1]))
+        self.update_done = True
+        self.num_updates += 1
+        self.update_time += time.perf_counter() - update_start
+
+    def get_metrics(self):
+        """
+        Returns:
+            dict: Number of updates, updates for which no batch was ready, and seconds spent waiting for
+                batches vs. updating.
+        """
+        busy_time = self.idle_time + self.update_time
+        return dict(
+            learner_updates=self.num_updates,
+            learner_starved_updates=self.num_starved_updates,
+            learner_idle_time=self.idle_time,
+            learner_update_time=self.update_time,
+            learner_idle_ratio=self.idle_time / busy_time if busy_time > 0 else 0.0
+        )
+
+
+class BatchPrefetcher(Thread):
+    """
+    Downloads sampled replay batches ahead of the `UpdateWorker`, so fetching and deserialising
+    batches overlaps with updates instead of being serialised with them on the driver.
+    """
+
+    def __init__(self, output_queue, in_queue_size, pin_memory=False):
+        """
+        Args:
+            output_queue (queue.Queue): Bounded input queue of the update worker. Its size is the number of batches
+                kept ready ahead of the learner.
+            in_queue_size (int): Max. number of pending batch object ids. The driver blocks when this is reached.
+            pin_memory (bool): If True and using PyTorch with CUDA, record arrays are converted to page-locked
+                tensors for fast host-to-device copies.
+        """
+        super(BatchPrefetcher, self).__init__()
+        self.input_queue = queue.Queue(maxsize=in_queue_size)
+        self.output_queue = output_queue
+        self.pin_memory = pin_memory and get_backend() == "pytorch" and torch.cuda.is_available()
+
+        # Terminate when host process terminates.
+        self.daemon = True
+        self.download_time = 0.0
+
+    def run(self):
+        while True:
+            self.step()
+
+    def step(self):
+        memory_actor, object_id = self.input_queue.get()
+        start = time.perf_counter()
+        sampled_batch = ray.get(object_ids=object_id)
+        # Copy due to memory leaks in Ray, see https://github.com/ray-project/ray/pull/3484/
+        sampled_batch = sampled_batch and sampled_batch.copy()
+        if sampled_batch is not None and self.pin_memory:
+            sampled_batch = self.pin_batch(sampled_batch)
+        self.download_time += time.perf_counter() - start
+        self.output_queue.put((memory_actor, sampled_batch))
+
+    @staticmethod
+    def pin_batch(batch):
+        pinned = {}
+        for key, value in batch.items():
+            # Indices are needed as numpy arrays for priority updates.
+            if key == "indices":
+                pinned[key] = value
+            elif isinstance(value, dict):
+                pinned[key] = BatchPrefetcher.pin_batch(value)
+            else:
+                pinned[key] = torch.from_numpy(np.ascontiguousarray(value)).pin_memory()
+        return pinned
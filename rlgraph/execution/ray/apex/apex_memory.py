@@ -22,16 +22,20 @@ import operator
 from six.moves import xrange as range_
 
 from rlgraph.utils import SMALL_NUMBER
+from rlgraph.utils.rlgraph_errors import RLGraphError
 from rlgraph.utils.specifiable import Specifiable
+from rlgraph.utils.util import convert_dtype
+from rlgraph.components.helpers.mem_frame_storage import MemFrameStorage
 from rlgraph.components.helpers.mem_segment_tree import MemSegmentTree, MinSumSegmentTree
-from rlgraph.execution.ray.ray_util import ray_decompress
+from rlgraph.execution.ray.ray_util import ray_decompress, ray_decompress_batch, ray_decompressed_spec
 
 
 class ApexMemory(Specifiable):
     """
     Apex prioritized replay implementing compression.
     """
-    def __init__(self, state_space=None, action_space=None, capacity=1000, alpha=1.0, beta=1.0):
+    def __init__(self, state_space=None, action_space=None, capacity=1000, alpha=1.0, beta=1.0, columnar=False,
+                 frame_stack=None, n_step_adjustment=1):
         """
         Args:
             state_space (dict): State spec.
@@ -39,6 +43,14 @@ class ApexMemory(Specifiable):
             capacity (int): Max capacity.
             alpha (float): Initial weight.
             beta (float): Prioritisation factor.
+            columnar (bool): If True, preallocate one numpy array per record column (per action key for
+                container actions) instead of storing a list of per-record tuples. Requires `action_space`.
+                States and next-states are kept in object columns as they hold compressed payloads.
+                Default: False.
+            frame_stack (Optional[int]): If set, states are expected to stack this many frames in their last rank
+                and are stored frame-deduplicated (decompressed) via a `MemFrameStorage`. Implies `columnar`.
+            n_step_adjustment (int): N-step horizon of the inserted records. Used to link next-states to later
+                states in frame-deduplicated storage.
         """
         super(ApexMemory, self).__init__()
 
@@ -52,6 +64,13 @@ class ApexMemory(Specifiable):
         self.max_priority = 1.0
         self.alpha = alpha
         self.beta = beta
+        self.columnar = columnar or frame_stack is not None
+        self.frame_storage = None
+        if frame_stack is not None:
+            self.frame_storage = MemFrameStorage(capacity, frame_stack, n_step_adjustment)
+        self.columns = None
+        if self.columnar:
+            self.columns = self._create_columns()
 
         self.default_new_weight = np.power(self.max_priority, self.alpha)
         self.priority_capacity = 1
@@ -59,9 +78,9 @@ class ApexMemory(Specifiable):
             self.priority_capacity *= 2
 
         # Create segment trees, initialize with neutral elements.
-        sum_values = [0.0 for _ in range_(2 * self.priority_capacity)]
+        sum_values = np.zeros(shape=(2 * self.priority_capacity,), dtype=np.float64)
         sum_segment_tree = MemSegmentTree(sum_values, self.priority_capacity, operator.add)
-        min_values = [float('inf') for _ in range_(2 * self.priority_capacity)]
+        min_values = np.full(shape=(2 * self.priority_capacity,), fill_value=float('inf'), dtype=np.float64)
         min_segment_tree = MemSegmentTree(min_values, self.priority_capacity, min)
         self.merged_segment_tree = MinSumSegmentTree(
             sum_tree=sum_segment_tree,
@@ -69,10 +88,55 @@ class ApexMemory(Specifiable):
             capacity=self.priority_capacity
         )
 
+    def _create_columns(self):
+        """
+        Preallocates the columnar record storage.
+
+        Returns:
+            dict: Column name -> ndarray with leading capacity dimension. For container actions, "actions"
+                maps to a dict of arrays keyed by action name.
+        """
+        if self.action_space is None:
+            raise RLGraphError("Columnar ApexMemory requires an action space to preallocate action columns.")
+
+        def column_from_space(space):
+            return np.zeros(shape=(self.capacity,) + tuple(space.shape), dtype=convert_dtype(space.dtype, to="np"))
+
+        if self.container_actions:
+            actions = {name: column_from_space(space) for name, space in self.action_space.items()}
+        else:
+            actions = column_from_space(self.action_space)
+        columns = dict(
+            actions=actions,
+            rewards=np.zeros(shape=(self.capacity,), dtype=np.float32),
+            terminals=np.zeros(shape=(self.capacity,), dtype=np.bool_)
+        )
+        # Frame-deduplicated states live in the frame storage.
+        if self.frame_storage is None:
+            columns["states"] = np.empty(shape=(self.capacity,), dtype=object)
+            columns["next_states"] = np.empty(shape=(self.capacity,), dtype=object)
+        return columns
+
     def insert_records(self, record):
         # TODO: This has the record interface, but actually expects a specific structure anyway, so
         # may as well change API?
-        if self.index >= self.size:
+        if self.columnar:
+            state, action, reward, terminal, next_state, _ = record
+            if self.frame_storage is not None:
+                self.frame_storage.insert(
+                    self.index, ray_decompress(state), ray_decompress(next_state), terminal
+                )
+            else:
+                self.columns["states"][self.index] = state
+                self.columns["next_states"][self.index] = next_state
+            if self.container_actions:
+                for name in self.action_space.keys():
+                    self.columns["actions"][name][self.index] = action[name]
+            else:
+                self.columns["actions"][self.index] = action
+            self.columns["rewards"][self.index] = reward
+            self.columns["terminals"][self.index] = terminal
+        elif self.index >= self.size:
             self.memory_values.append(record)
         else:
             self.memory_values[self.index] = record
@@ -87,6 +151,107 @@ class ApexMemory(Specifiable):
         self.index = (self.index + 1) % self.capacity
         self.size = min(self.size + 1, self.capacity)
 
+    def insert_batch(self, records):
+        """
+        Inserts a batch of records at once. Equivalent to calling `insert_records` for each record in order,
+        but writes each column with (at most two) wrap-around slice assignments and sets all priorities
+        with a single segment tree update.
+
+        Args:
+            records (dict): Batch dict with keys "states", "actions", "rewards", "terminals", "next_states"
+                and (optionally) "importance_weights" (None to insert with max-priority). Container actions
+                are expected as a dict of batched arrays.
+        """
+        num_records = len(records["states"])
+        if num_records == 0:
+            return
+        states = records["states"]
+        actions = records["actions"]
+        rewards = records["rewards"]
+        terminals = records["terminals"]
+        next_states = records["next_states"]
+        weights = records.get("importance_weights")
+
+        # Records overwritten within this batch are skipped.
+        if num_records > self.capacity:
+            skip = num_records - self.capacity
+            self.index = (self.index + skip) % self.capacity
+            states, rewards, terminals, next_states = \
+                states[skip:], rewards[skip:], terminals[skip:], next_states[skip:]
+            if self.container_actions:
+                actions = {name: values[skip:] for name, values in actions.items()}
+            else:
+                actions = actions[skip:]
+            if weights is not None:
+                weights = weights[skip:]
+            num_records = self.capacity
+            # Every slot gets overwritten below.
+            if not self.columnar and len(self.memory_values) < self.capacity:
+                self.memory_values.extend([None] * (self.capacity - len(self.memory_values)))
+
+        if self.columnar:
+            if self.frame_storage is not None:
+                # Frame links depend on the previously inserted record -> sequential.
+                for i in range_(num_records):
+                    self.frame_storage.insert(
+                        (self.index + i) % self.capacity, ray_decompress(states[i]),
+                        ray_decompress(next_states[i]), terminals[i]
+                    )
+            else:
+                self._write_slices(self.columns["states"], self._to_object_array(states))
+                self._write_slices(self.columns["next_states"], self._to_object_array(next_states))
+            if self.container_actions:
+                for name in self.action_space.keys():
+                    self._write_slices(self.columns["actions"][name], actions[name])
+            else:
+                self._write_slices(self.columns["actions"], actions)
+            self._write_slices(self.columns["rewards"], rewards)
+            self._write_slices(self.columns["terminals"], terminals)
+        else:
+            if self.container_actions:
+                actions = [dict(zip(actions.keys(), values)) for values in zip(*actions.values())]
+            weight_values = [None] * num_records if weights is None else weights
+            self._write_slices(self.memory_values, list(zip(
+                states, actions, rewards, terminals, next_states, weight_values
+            )))
+
+        # Priorities.
+        if weights is None:
+            priorities = self.max_priority ** self.alpha
+        else:
+            priorities = np.asarray(weights, dtype=np.float64) ** self.alpha
+        indices = (self.index + np.arange(num_records)) % self.capacity
+        self.merged_segment_tree.insert_many(indices, priorities)
+
+        # Update indices.
+        self.index = (self.index + num_records) % self.capacity
+        self.size = min(self.size + num_records, self.capacity)
+
+    def _write_slices(self, storage, values):
+        """
+        Writes values to a storage (ndarray column or record list) starting at the current index, wrapping
+        around at capacity. A record list is extended when written to at its end.
+
+        Args:
+            storage (Union[ndarray,list]): Column or record list to write to.
+            values (Union[ndarray,list]): Values to write, at most `capacity` many.
+        """
+        num_first = min(len(values), self.capacity - self.index)
+        storage[self.index:self.index + num_first] = values[:num_first]
+        if num_first < len(values):
+            storage[:len(values) - num_first] = values[num_first:]
+
+    @staticmethod
+    def _to_object_array(values):
+        """
+        Converts a sequence of (compressed) states to a 1D object array holding one state object per record.
+        Assigning a stacked state array to an object column directly would try to broadcast it instead.
+        """
+        ret = np.empty(shape=(len(values),), dtype=object)
+        for i, value in enumerate(values):
+            ret[i] = value
+        return ret
+
     def read_records(self, indices):
         """
         Obtains record values for the provided indices.
@@ -97,6 +262,8 @@ class ApexMemory(Specifiable):
         Returns:
              dict: Record value dict.
         """
+        if self.columnar:
+            return self._read_columns(indices)
         states = []
         if self.container_actions:
             actions = {k: [] for k in self.action_space.keys()}
@@ -107,7 +274,7 @@ class ApexMemory(Specifiable):
         next_states = []
         for index in indices:
             state, action, reward, terminal, next_state, weight = self.memory_values[index]
-            states.append(ray_decompress(state))
+            states.append(state)
 
             if self.container_actions:
                 for name in self.action_space.keys():
@@ -116,40 +283,82 @@ class ApexMemory(Specifiable):
                 actions.append(action)
             rewards.append(reward)
             terminals.append(terminal)
-            next_states.append(ray_decompress(next_state))
+            next_states.append(next_state)
 
         if self.container_actions:
             for name in self.action_space.keys():
                 actions[name] = np.squeeze(np.array(actions[name]))
         else:
             actions = np.array(actions)
+        states, next_states = self._decompress_states(states, next_states)
         return dict(
-            states=np.asarray(states),
+            states=states,
             actions=actions,
             rewards=np.asarray(rewards),
             terminals=np.asarray(terminals),
-            next_states=np.asarray(next_states)
+            next_states=next_states
         )
 
+    def _read_columns(self, indices):
+        """
+        Gathers records from the columnar storage with one fancy-indexing read per column.
+
+        Args:
+            indices (ndarray): Indices to read.
+
+        Returns:
+             dict: Record value dict.
+        """
+        if self.container_actions:
+            actions = {name: column[indices] for name, column in self.columns["actions"].items()}
+        else:
+            actions = self.columns["actions"][indices]
+        if self.frame_storage is not None:
+            states = self.frame_storage.get_states(indices)
+            next_states = self.frame_storage.get_next_states(indices)
+        else:
+            states, next_states = self._decompress_states(
+                self.columns["states"][indices], self.columns["next_states"][indices]
+            )
+        return dict(
+            states=states,
+            actions=actions,
+            rewards=self.columns["rewards"][indices],
+            terminals=self.columns["terminals"][indices],
+            next_states=next_states
+        )
+
+    @staticmethod
+    def _decompress_states(states, next_states):
+        """
+        Decompresses states and next-states into one preallocated array.
+
+        Args:
+            states (Sequence[any]): Compressed states.
+            next_states (Sequence[any]): Compressed next-states.
+
+        Returns:
+            tuple: Batches of decompressed states and next-states.
+        """
+        if len(states) == 0:
+            return ray_decompress_batch(states), ray_decompress_batch(next_states)
+        dtype, shape = ray_decompressed_spec(states[0])
+        out = np.empty(shape=(2, len(states)) + tuple(shape), dtype=dtype)
+        return ray_decompress_batch(states, out=out[0]), ray_decompress_batch(next_states, out=out[1])
+
     def get_records(self, num_records):
-        indices = []
         prob_sum = self.merged_segment_tree.sum_segment_tree.get_sum(0, self.size)
         samples = np.random.random(size=(num_records,)) * prob_sum
-        for sample in samples:
-            indices.append(self.merged_segment_tree.sum_segment_tree.index_of_prefixsum(prefix_sum=sample))
-
-        sum_prob = self.merged_segment_tree.sum_segment_tree.get_sum()
-        min_prob = self.merged_segment_tree.min_segment_tree.get_min_value() / sum_prob + SMALL_NUMBER
-        max_weight = (min_prob * self.size) ** (-self.beta)
-        weights = []
-        for index in indices:
-            sample_prob = self.merged_segment_tree.sum_segment_tree.get(index) / sum_prob
-            weight = (sample_prob * self.size) ** (-self.beta)
-            weights.append(weight / max_weight)
+        indices = self.merged_segment_tree.sum_segment_tree.index_of_prefixsum(prefix_sum=samples)
+        weights = self.merged_segment_tree.get_importance_weights(
+            indices, self.size, self.beta, min_prob_epsilon=SMALL_NUMBER
+        )
 
-        return self.read_records(indices=indices), np.asarray(indices), np.asarray(weights)
+        return self.read_records(indices=indices), indices, weights
 
     def update_records(self, indices, update):
-        for index, loss in zip(indices, update):
-            self.merged_segment_tree.insert(index, loss ** self.alpha)
-            self.max_priority = max(self.max_priority, loss)
+        update = np.asarray(update)
+        if update.size == 0:
+            return
+        self.merged_segment_tree.insert_many(indices, update ** self.alpha)
+        self.max_priority = max(self.max_priority, np.max(update))
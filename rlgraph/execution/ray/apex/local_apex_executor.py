@@ -0,0 +1,339 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import random
+import time
+from copy import deepcopy
+
+from six.moves import queue
+from six.moves import xrange as range_
+
+from rlgraph import get_distributed_backend
+from rlgraph.agents import Agent
+from rlgraph.execution.ray.apex.apex_executor import ApexExecutor, UpdateWorker
+from rlgraph.execution.ray.apex.ray_memory_actor import RayMemoryActor
+from rlgraph.execution.ray.ray_util import worker_exploration
+from rlgraph.execution.ray.ray_value_worker import RayValueWorker
+from rlgraph.utils.rlgraph_errors import RLGraphError
+
+
+class LocalApexExecutor(ApexExecutor):
+    """
+    Single-node Ape-X executor which runs without a Ray cluster (no `ray.init`, no Redis): Sample workers are
+    `multiprocessing` processes, replay shards are `ApexMemory` objects in the driver process and the learner is
+    the same `UpdateWorker` thread as in the `ApexExecutor`.
+
+    The worker processes run the `RayValueWorker` sampling loop and compress states with `ray_compress`, so the
+    Ray dependencies must still be installed and the distributed backend must be "ray".
+
+    Uses the same agent config (including "ray_spec") and `execute_workload` interface as the `ApexExecutor`.
+    Samples travel through multiprocessing queues with states already compressed by the workers. Weights are
+    synced through the executor's weight broadcaster, passing payloads through the worker command queues.
+    Replay sampling never blocks the driver, so `discard_queued_samples` has no effect.
+    """
+    def setup_execution(self):
+        self.setup_specs()
+        # Max. seconds the driver waits for samples per step when the learner queue is full.
+        self.sample_wait_timeout = self.executor_spec.get("sample_wait_timeout", 0.002)
+        if get_distributed_backend() != "ray":
+            raise RLGraphError("The LocalApexExecutor runs RayValueWorkers and requires the 'ray' distributed "
+                               "backend (and its dependencies) even though it does not start a Ray cluster.")
+        if self.worker_spec.get("num_env_processes", 0) > 0:
+            raise RLGraphError("Sample workers of the LocalApexExecutor are daemon processes and can not step "
+                               "environments in sub-processes. Use more sample workers instead.")
+        if self.worker_spec.get("use_inference_server", False):
+            raise RLGraphError("Inference servers are Ray actors and not supported by the LocalApexExecutor.")
+        # Worker handles are local, payloads are passed through their command queues.
+        self.weight_broadcaster.use_object_store = False
+
+        # Start sample workers first so forked processes do not inherit the learner's graph and session.
+        self.logger.info("Initializing {} local data collection processes, sample size: {}".format(
+            self.num_sample_workers, self.worker_spec["worker_sample_size"]))
+        self.ray_env_sample_workers = self.create_local_workers(self.num_sample_workers)
+
+        self.local_agent = Agent.from_spec(self.agent_config)
+        self.update_worker = UpdateWorker(
+            agent=self.local_agent,
+            in_queue_size=self.executor_spec["learn_queue_size"]
+        )
+        # Batches are read from in-process memories, nothing to prefetch.
+        self.batch_prefetchers = []
+
+        self.local_replay_memories = [RayMemoryActor(deepcopy(self.apex_replay_spec))
+                                      for _ in range_(self.num_replay_workers)]
+        self.init_tasks()
+
+    def create_local_workers(self, num_workers):
+        """
+        Starts sample worker processes and waits for their agents and environments to be built.
+
+        Args:
+            num_workers (int): Number of worker processes.
+
+        Returns:
+            list: LocalSampleWorker handles.
+        """
+        ctx = multiprocessing.get_context(self.executor_spec["multiprocessing_context"]) \
+            if self.executor_spec.get("multiprocessing_context", None) is not None else multiprocessing
+        self.sample_queue = ctx.Queue()
+
+        workers = []
+        ray_constant_exploration = self.worker_spec.get("ray_constant_exploration", False)
+        for i in range_(num_workers):
+            if ray_constant_exploration is True:
+                self.worker_spec["ray_exploration"] = worker_exploration(i, num_workers)
+            worker = LocalSampleWorker(
+                i, ctx, self.sample_queue, deepcopy(self.agent_config), deepcopy(self.worker_spec),
+                self.environment_spec, self.worker_frame_skip
+            )
+            self.worker_ids[worker] = "worker_{}".format(i)
+            workers.append(worker)
+
+        # Processes build in parallel, wait for all of them.
+        for worker in workers:
+            worker.wait_ready()
+            self.logger.info("Successfully built agent num {}.".format(worker.worker_index))
+        return workers
+
+    def init_tasks(self):
+        # Start learner thread.
+        self.update_worker.start()
+
+        # Workers sample with the learner's weights from the start.
+        self.weight_broadcaster.update(self.local_agent.get_weights())
+        for worker in self.ray_env_sample_workers:
+            self.sync_worker_weights(worker)
+            self.steps_since_weights_synced[worker] = 0
+            for _ in range_(self.env_interaction_task_depth):
+                worker.sample()
+
+    def get_worker_statistics(self, worker):
+        return worker.get_workload_statistics()
+
+    def terminate(self):
+        """
+        Shuts down all sample worker processes.
+        """
+        # Close all workers first so they shut down in parallel.
+        for worker in self.ray_env_sample_workers:
+            worker.close()
+        for worker in self.ray_env_sample_workers:
+            worker.terminate()
+
+    def _execute_step(self):
+        """
+        Executes one iteration of the driver loop:
+
+        - Sample batches from the replay shards into the learner queue while it has free slots.
+        - Insert completed worker samples into random replay shards, sync weights, request new samples.
+        - Update priorities on the replay shards using the loss values produced by the update worker.
+        """
+        env_steps = 0
+        update_steps = 0
+        queue_inserts = 0
+        rewards = []
+
+        # 1. Feed the learner from the replay shards.
+        for memory in self.local_replay_memories:
+            for _ in range_(self.replay_sampling_task_depth):
+                if self.update_worker.input_queue.full():
+                    break
+                sampled_batch = memory.get_batch()
+                if sampled_batch is None:
+                    break
+                self.update_worker.input_queue.put((memory, sampled_batch))
+                queue_inserts += 1
+
+        # 2. Fetch completed samples. Wait briefly for one if the learner could not be fed, so the driver
+        # does not spin.
+        completed_samples = []
+        try:
+            if queue_inserts > 0:
+                completed_samples.append(self.sample_queue.get_nowait())
+            else:
+                completed_samples.append(self.sample_queue.get(timeout=self.sample_wait_timeout))
+            while True:
+                completed_samples.append(self.sample_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        for worker_index, env_sample in completed_samples:
+            if isinstance(env_sample, Exception):
+                raise env_sample
+            worker = self.ray_env_sample_workers[worker_index]
+            random.choice(self.local_replay_memories).observe(env_sample)
+            if len(env_sample.metrics["last_rewards"]) > 0:
+                rewards.extend(env_sample.metrics["last_rewards"])
+            env_steps += env_sample.batch_size
+
+            self.steps_since_weights_synced[worker] += env_sample.batch_size
+            if self.steps_since_weights_synced[worker] >= self.weight_sync_steps:
+                # New weights version only if the learner updated since the last one.
+                if self.update_worker.update_done:
+                    self.update_worker.update_done = False
+                    self.weight_broadcaster.update(self.local_agent.get_weights())
+                if self.sync_worker_weights(worker):
+                    self.weight_syncs_executed += 1
+                self.steps_since_weights_synced[worker] = 0
+
+            # Request the next sample.
+            worker.sample()
+
+        # 3. Update priorities using loss values produced by update worker.
+        while not self.update_worker.output_queue.empty():
+            memory, indices, loss_per_item = self.update_worker.output_queue.get()
+            memory.update_priorities(indices, loss_per_item)
+            update_steps += len(indices)
+
+        return env_steps, update_steps, {
+            "discarded": 0,
+            "queue_inserts": queue_inserts,
+            "rewards": rewards
+        }
+
+
+class LocalSampleWorker(object):
+    """
+    Driver-side handle of a sample worker process running a `RayValueWorker`. Requests are executed in order;
+    samples are returned through the executor's shared sample queue, all other results through the handle's
+    response queue.
+    """
+    def __init__(self, worker_index, ctx, sample_queue, agent_config, worker_spec, env_spec, frameskip):
+        """
+        Args:
+            worker_index (int): Index of this worker, used to tag its samples.
+            ctx (any): Multiprocessing module or context to create the process and queues with.
+            sample_queue (multiprocessing.Queue): Queue shared by all workers to return samples.
+            agent_config (dict): Agent config.
+            worker_spec (dict): Worker spec.
+            env_spec (Union[dict,callable]): Environment spec or callable.
+            frameskip (int): Worker frame skip.
+        """
+        self.worker_index = worker_index
+        self.sample_queue = sample_queue
+        self.command_queue = ctx.Queue()
+        self.response_queue = ctx.Queue()
+        self.process = ctx.Process(
+            target=_sample_worker,
+            args=(worker_index, self.command_queue, sample_queue, self.response_queue,
+                  agent_config, worker_spec, env_spec, frameskip)
+        )
+        self.process.daemon = True
+        self.process.start()
+        self.closed = False
+        self.terminated = False
+
+    def wait_ready(self):
+        self._receive()
+
+    def sample(self):
+        """
+        Requests a sample of `worker_sample_size` steps.
+        """
+        self.command_queue.put(("sample", None))
+
+    def set_weights(self, weights):
+        """
+        Args:
+            weights (RayWeight): Weights payload to set before the next sample.
+        """
+        self.command_queue.put(("set_weights", weights))
+
+    def get_workload_statistics(self):
+        """
+        Returns:
+            dict: Workload statistics of the worker, available once all previous requests are done.
+        """
+        self.command_queue.put(("get_workload_statistics", None))
+        return self._receive()
+
+    def close(self):
+        """
+        Asks the worker process to exit after its pending requests.
+        """
+        if self.closed:
+            return
+        self.command_queue.put(("close", None))
+        self.closed = True
+
+    def terminate(self, timeout=10.0):
+        """
+        Closes the worker process and waits for it to exit, killing it after `timeout` seconds.
+
+        Args:
+            timeout (float): Seconds to wait for the process to exit.
+        """
+        if self.terminated:
+            return
+        self.close()
+        deadline = time.monotonic() + timeout
+        while self.process.is_alive() and time.monotonic() < deadline:
+            # A process only exits once its queued results are flushed to the pipes, so they must be read.
+            _drain(self.sample_queue)
+            _drain(self.response_queue)
+            self.process.join(timeout=0.05)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.terminated = True
+
+    def _receive(self):
+        result = self.response_queue.get()
+        # Errors inside the worker are passed back through the queue.
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _drain(queue_):
+    try:
+        while True:
+            queue_.get_nowait()
+    except queue.Empty:
+        pass
+
+
+def _sample_worker(worker_index, command_queue, sample_queue, response_queue, agent_config, worker_spec,
+                   env_spec, frameskip):
+    """
+    Sample worker process loop.
+    """
+    try:
+        worker = RayValueWorker(agent_config, worker_spec, env_spec, frameskip)
+        response_queue.put(worker.get_constructor_success())
+        while True:
+            command, data = command_queue.get()
+            if command == "sample":
+                sample = worker.execute_and_get_timesteps(num_timesteps=worker.worker_sample_size)
+                sample_queue.put((worker_index, sample))
+            elif command == "set_weights":
+                worker.set_weights(data)
+            elif command == "get_workload_statistics":
+                response_queue.put(worker.get_workload_statistics())
+            elif command == "close":
+                break
+            else:
+                raise RLGraphError("Unknown LocalSampleWorker command '{}'.".format(command))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        # The driver may be waiting on either queue.
+        response_queue.put(e)
+        sample_queue.put((worker_index, e))
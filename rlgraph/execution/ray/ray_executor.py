@@ -26,7 +26,8 @@ import time
 from rlgraph import get_distributed_backend
 from rlgraph.agents import Agent
 from rlgraph.environments import Environment
-from rlgraph.execution.ray.ray_util import worker_exploration
+from rlgraph.execution.ray.ray_inference_server import create_inference_servers
+from rlgraph.execution.ray.ray_util import worker_exploration, RayWeightBroadcaster
 
 if get_distributed_backend() == "ray":
     import ray
@@ -66,6 +67,15 @@ class RayExecutor(object):
 
         # Map worker objects to host ids.
         self.worker_ids = {}
+        # Map workers using an inference server to the server on their node.
+        self.inference_servers = {}
+
+        # Versioned (and optionally float16/delta-encoded) weight syncs to remote workers.
+        self.weight_broadcaster = RayWeightBroadcaster(
+            weight_dtype=executor_spec.get("weight_dtype", None),
+            delta_encoding=executor_spec.get("weight_delta_encoding", False),
+            keyframe_interval=executor_spec.get("weight_keyframe_interval", 100)
+        )
 
     def ray_init(self):
         """
@@ -112,8 +122,34 @@ class RayExecutor(object):
             workers.append(worker)
             self.logger.info("Successfully built agent num {}.".format(i))
 
+        # Workers share one agent per node instead of building their own.
+        if worker_spec.get("use_inference_server", False):
+            servers = create_inference_servers(workers, agent_config, worker_spec.get("inference_server_spec", None))
+            ray.get([worker.set_inference_server.remote(server) for worker, server in zip(workers, servers)])
+            self.inference_servers.update(zip(workers, servers))
+            self.logger.info("Connected workers to {} inference servers.".format(len(set(servers))))
+
         return workers
 
+    def sync_worker_weights(self, worker):
+        """
+        Syncs the current weights version to a worker, or to the inference server on its node if it uses one.
+
+        Args:
+            worker (any): Ray worker handle.
+
+        Returns:
+            bool: Whether weights were sent.
+        """
+        return self.weight_broadcaster.sync(self.inference_servers.get(worker, worker))
+
+    def get_worker_weights_version(self, worker):
+        """
+        Returns:
+            int: The weights version last synced to a worker (or to its inference server).
+        """
+        return self.weight_broadcaster.worker_versions[self.inference_servers.get(worker, worker)]
+
     def test_worker_init(self):
         """
         Tests every worker for successful constructor call (which may otherwise fail silently.
@@ -152,6 +188,7 @@ class RayExecutor(object):
         self.sample_iteration_throughputs = []
         self.update_iteration_throughputs = []
         self.iteration_times = []
+        self.weight_broadcaster.reset_metrics()
 
         # Assume time step based initially.
         num_timesteps = workload["num_timesteps"]
@@ -218,6 +255,11 @@ class RayExecutor(object):
         worker_stats = self.get_aggregate_worker_results()
         self.logger.info("Retrieved worker stats for {} workers:".format(len(self.ray_env_sample_workers)))
         self.logger.info(worker_stats)
+        weight_metrics = self.weight_broadcaster.get_metrics()
+        self.logger.info("Weight syncs: {} ({} skipped), {} bytes/s broadcast.".format(
+            weight_metrics["weight_syncs"], weight_metrics["weight_syncs_skipped"],
+            weight_metrics["weight_broadcast_bytes_per_second"]
+        ))
 
         return dict(
             runtime=total_time,
@@ -242,7 +284,8 @@ class RayExecutor(object):
             max_worker_reward=worker_stats["max_reward"],
             min_worker_reward=worker_stats["min_reward"],
             # This is the mean final episode over all workers.
-            mean_final_reward=worker_stats["mean_final_reward"]
+            mean_final_reward=worker_stats["mean_final_reward"],
+            **weight_metrics
         )
 
     def sample_metrics(self):
@@ -293,8 +336,7 @@ class RayExecutor(object):
             # Otherwise just pick  first.
             ray_worker = self.ray_env_sample_workers[0]
 
-        task = ray_worker.get_workload_statistics.remote()
-        metrics = ray.get(task)
+        metrics = self.get_worker_statistics(ray_worker)
 
         # Return full reward series.
         return dict(
@@ -302,6 +344,19 @@ class RayExecutor(object):
             episode_timesteps=metrics["episode_timesteps"]
         )
 
+    def get_worker_statistics(self, worker):
+        """
+        Fetches the workload statistics of a single sample worker.
+
+        Args:
+            worker (any): Sample worker handle.
+
+        Returns:
+            dict: Worker statistics as returned by the worker's `get_workload_statistics`.
+        """
+        task = worker.get_workload_statistics.remote()
+        return ray.get(task)
+
     def get_all_worker_results(self):
         """
         Retrieves full episode-reward time series for all workers.
@@ -311,8 +366,7 @@ class RayExecutor(object):
         """
         results = list()
         for ray_worker in self.ray_env_sample_workers:
-            task = ray_worker.get_workload_statistics.remote()
-            metrics = ray.get(task)
+            metrics = self.get_worker_statistics(ray_worker)
             results.append(dict(
                 episode_rewards=metrics["episode_rewards"],
                 episode_timesteps=metrics["episode_timesteps"],
@@ -351,8 +405,7 @@ class RayExecutor(object):
             self.logger.info("Retrieving workload statistics for worker: {}".format(
                 self.worker_ids[ray_worker])
             )
-            task = ray_worker.get_workload_statistics.remote()
-            metrics = ray.get(task)
+            metrics = self.get_worker_statistics(ray_worker)
             if metrics["mean_episode_reward"] is not None:
                 min_rewards.append(metrics["min_episode_reward"])
                 max_rewards.append(metrics["max_episode_reward"])
@@ -0,0 +1,206 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from copy import deepcopy
+import threading
+
+from rlgraph import get_distributed_backend
+from rlgraph.execution.inference_server import InferenceServer
+from rlgraph.execution.ray.ray_actor import RayActor
+from rlgraph.execution.ray.ray_util import RayWeightReceiver
+from rlgraph.utils.rlgraph_errors import RLGraphError
+
+if get_distributed_backend() == "ray":
+    import ray
+
+
+class RayInferenceServer(RayActor):
+    """
+    Node-local Ray actor holding a single agent for all sample workers on its node. Concurrent `get_action`
+    requests of the workers are batched via an `InferenceServer`, and weights only need to be synced once per
+    node instead of once per worker.
+
+    The actor must be created with `max_concurrency` > 1 (see `as_remote`) so that requests of different workers
+    can wait for their batch at the same time.
+    """
+    def __init__(self, agent_config, inference_server_spec=None):
+        """
+        Args:
+            agent_config (dict): Agent configuration dict.
+            inference_server_spec (Optional[dict]): Keyword arguments for the `InferenceServer`, e.g.
+                "min_batch_size", "max_batch_size" and "timeout_ms". Worker-side preprocessing is assumed, so
+                "apply_preprocessing" defaults to False. Requests are handled by threads of the actor, so
+                "local_clients" defaults to True.
+        """
+        self.agent_config = agent_config
+        self.inference_server_spec = dict(apply_preprocessing=False, local_clients=True)
+        self.inference_server_spec.update(inference_server_spec or {})
+        self.agent = None
+        self.server = None
+        # Serializes agent access between the batching thread, weight updates and post-processing.
+        self.lock = threading.Lock()
+        # One client per request-handling thread of the actor.
+        self.clients = threading.local()
+        # Decodes versioned weight payloads and skips redundant ones.
+        self.weight_receiver = RayWeightReceiver()
+
+    @classmethod
+    def as_remote(cls, num_cpus=None, num_gpus=None, max_concurrency=64):
+        return ray.remote(num_cpus=num_cpus, num_gpus=num_gpus, max_concurrency=max_concurrency)(cls)
+
+    def start(self):
+        """
+        Builds the agent and starts serving requests. Called once the actor has been placed on its node, so
+        actors created in excess while co-locating servers with workers never build an agent.
+        """
+        if self.server is not None:
+            return
+        # Imported here as the executor creates inference servers.
+        from rlgraph.execution.ray.ray_executor import RayExecutor
+        self.agent = RayExecutor.build_agent_from_config(self.agent_config)
+        self.server = InferenceServer(self.agent, lock=self.lock, **self.inference_server_spec)
+        self.server.start()
+
+    def get_agent_spaces(self):
+        """
+        Returns:
+            dict: The agent's state, preprocessed state, action and flat action spaces.
+        """
+        return dict(
+            state_space=self.agent.state_space,
+            preprocessed_state_space=self.agent.preprocessed_state_space,
+            action_space=self.agent.action_space,
+            flat_action_space=self.agent.flat_action_space
+        )
+
+    def get_action(self, states, use_exploration=True, apply_preprocessing=True, extra_returns=None):
+        """
+        Computes actions for a worker. Requests matching the server's settings are batched with those of other
+        workers, others are computed directly.
+        """
+        if use_exploration == self.server.use_exploration and apply_preprocessing == self.server.apply_preprocessing \
+                and extra_returns == self.server.extra_returns:
+            client = getattr(self.clients, "client", None)
+            if client is None:
+                client = self.clients.client = self.server.create_client()
+            return client.get_action(states)
+        with self.lock:
+            return self.agent.get_action(
+                states, use_exploration=use_exploration, apply_preprocessing=apply_preprocessing,
+                extra_returns=extra_returns
+            )
+
+    def post_process(self, batch):
+        with self.lock:
+            return self.agent.post_process(batch)
+
+    def set_weights(self, weights):
+        weights = self.weight_receiver.receive(weights)
+        if weights is not None:
+            policy_weights, vf_weights = weights
+            with self.lock:
+                self.agent.set_weights(policy_weights, value_function_weights=vf_weights)
+
+    def get_metrics(self):
+        """
+        Returns:
+            dict: Batching metrics of the inference server.
+        """
+        return self.server.get_metrics()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.stop()
+
+
+class RemoteInferenceAgent(object):
+    """
+    Stand-in for the local agent of a sample worker using a `RayInferenceServer`. Exposes the agent attributes
+    and methods used for sampling and forwards calls to the server.
+    """
+    def __init__(self, inference_server):
+        """
+        Args:
+            inference_server (any): Ray actor handle of a started `RayInferenceServer`.
+        """
+        self.inference_server = inference_server
+        spaces = ray.get(inference_server.get_agent_spaces.remote())
+        self.state_space = spaces["state_space"]
+        self.preprocessed_state_space = spaces["preprocessed_state_space"]
+        self.action_space = spaces["action_space"]
+        self.flat_action_space = spaces["flat_action_space"]
+
+    def get_action(self, states, use_exploration=True, apply_preprocessing=True, extra_returns=None):
+        return ray.get(self.inference_server.get_action.remote(
+            states, use_exploration=use_exploration, apply_preprocessing=apply_preprocessing,
+            extra_returns=extra_returns
+        ))
+
+    def post_process(self, batch):
+        return ray.get(self.inference_server.post_process.remote(batch))
+
+    def set_weights(self, policy_weights, value_function_weights=None):
+        raise RLGraphError("ERROR: Workers using an inference server do not hold weights, weights must be synced "
+                           "to the inference server.")
+
+
+def create_inference_servers(workers, agent_config, inference_server_spec=None, max_attempts=10):
+    """
+    Creates one started `RayInferenceServer` on each host running any of the given workers.
+
+    Args:
+        workers (list): Ray worker handles.
+        agent_config (dict): Agent config for the servers' agents.
+        inference_server_spec (Optional[dict]): Server spec. The keys "num_cpus", "num_gpus" and "max_concurrency"
+            set the actor's resources, all other keys are passed on to the `InferenceServer`.
+        max_attempts (Optional[int]): Max number of attempts to place servers on all hosts.
+
+    Returns:
+        list: For each worker, the handle of the server on its host.
+
+    Raises:
+        RLGraphError: If no server could be placed on some host within the specified number of attempts.
+    """
+    inference_server_spec = deepcopy(inference_server_spec or {})
+    cls = RayInferenceServer.as_remote(
+        num_cpus=inference_server_spec.pop("num_cpus", 1),
+        num_gpus=inference_server_spec.pop("num_gpus", 0),
+        max_concurrency=inference_server_spec.pop("max_concurrency", 64)
+    )
+    worker_hosts = ray.get([worker.get_host.remote() for worker in workers])
+    hosts = set(worker_hosts)
+
+    # Placement is up to Ray's scheduler: create candidates until every host holds one, others are dropped.
+    servers = {}
+    attempt = 1
+    while len(servers) < len(hosts) and attempt <= max_attempts:
+        candidates = [cls.remote(agent_config, inference_server_spec)
+                      for _ in range(attempt * (len(hosts) - len(servers)))]
+        candidate_hosts = ray.get([candidate.get_host.remote() for candidate in candidates])
+        for host, candidate in zip(candidate_hosts, candidates):
+            if host in hosts and host not in servers:
+                servers[host] = candidate
+        attempt += 1
+
+    if len(servers) < len(hosts):
+        raise RLGraphError("Could not place inference servers on hosts {}.".format(
+            sorted(hosts - set(servers.keys()))
+        ))
+    ray.get([server.start.remote() for server in servers.values()])
+    return [servers[host] for host in worker_hosts]
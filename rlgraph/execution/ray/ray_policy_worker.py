@@ -24,12 +24,15 @@ from six.moves import xrange as range_
 import time
 
 from rlgraph import get_distributed_backend
+from rlgraph.components.helpers import FusedPreprocessor
 from rlgraph.components.neural_networks.preprocessor_stack import PreprocessorStack
 from rlgraph.environments.sequential_vector_env import SequentialVectorEnv
+from rlgraph.environments.subprocess_vector_env import SubprocessVectorEnv
 from rlgraph.execution.environment_sample import EnvironmentSample
 from rlgraph.execution.ray import RayExecutor
 from rlgraph.execution.ray.ray_actor import RayActor
-from rlgraph.execution.ray.ray_util import ray_compress
+from rlgraph.execution.ray.ray_inference_server import RemoteInferenceAgent
+from rlgraph.execution.ray.ray_util import ray_compress, RayWeightReceiver
 
 if get_distributed_backend() == "ray":
     import ray
@@ -64,8 +67,18 @@ class RayPolicyWorker(RayActor):
         self.compress = worker_spec.pop("compress_states", False)
         self.env_ids = ["env_{}".format(i) for i in range_(self.num_environments)]
         num_background_envs = worker_spec.pop("num_background_envs", 1)
-
-        self.vector_env = SequentialVectorEnv(self.num_environments, env_spec, num_background_envs)
+        # Run preprocessing for all environments as one fused pipeline.
+        fuse_preprocessing = worker_spec.pop("fuse_preprocessing", False)
+        # Compute actions via the executor-created inference server on this node instead of a local agent.
+        self.use_inference_server = worker_spec.pop("use_inference_server", False)
+        worker_spec.pop("inference_server_spec", None)
+
+        # Step environments in worker processes if requested, otherwise sequentially in this process.
+        num_env_processes = worker_spec.pop("num_env_processes", 0)
+        if num_env_processes > 0:
+            self.vector_env = SubprocessVectorEnv(self.num_environments, env_spec, num_env_processes)
+        else:
+            self.vector_env = SequentialVectorEnv(self.num_environments, env_spec, num_background_envs)
 
         # Then update agent config.
         agent_config['state_space'] = self.vector_env.state_space
@@ -80,12 +93,17 @@ class RayPolicyWorker(RayActor):
                 preprocessing_spec, self.vector_env.state_space.with_batch_rank()
             )
             self.is_preprocessed[env_id] = False
-        self.agent = self.setup_agent(agent_config, worker_spec)
+        self.fused_preprocessor = None
+        if fuse_preprocessing:
+            self.fused_preprocessor, self.preprocessors = FusedPreprocessor.fuse(
+                self.preprocessors, self.vector_env.state_space
+            )
+        self.agent = None
+        if not self.use_inference_server:
+            self.agent = self.setup_agent(agent_config, worker_spec)
         self.worker_frameskip = frameskip
-
-        #  Flag for container actions.
-        self.container_actions = self.agent.flat_action_space is not None
-        self.action_space = self.agent.flat_action_space
+        # Decodes versioned weight payloads and skips redundant ones.
+        self.weight_receiver = RayWeightReceiver()
 
         # Save these so they can be fetched after training if desired.
         self.finished_episode_rewards = [[] for _ in range_(self.num_environments)]
@@ -106,12 +124,6 @@ class RayPolicyWorker(RayActor):
         # To continue running through multiple exec calls.
         self.last_states = self.vector_env.reset_all()
 
-        self.zero_batched_state = np.zeros((1,) + self.agent.preprocessed_state_space.shape)
-        self.zero_unbatched_state = np.zeros(self.agent.preprocessed_state_space.shape)
-        self.preprocessed_states_buffer = np.zeros(
-            shape=(self.num_environments,) + self.agent.preprocessed_state_space.shape,
-            dtype=self.agent.preprocessed_state_space.dtype
-        )
         self.last_ep_timesteps = [0 for _ in range_(self.num_environments)]
         self.last_ep_rewards = [0 for _ in range_(self.num_environments)]
         self.last_ep_start_timestamps = [0.0 for _ in range_(self.num_environments)]
@@ -121,6 +133,40 @@ class RayPolicyWorker(RayActor):
         # Was the last state a terminal state so env should be reset in next call?
         self.last_terminals = [False for _ in range_(self.num_environments)]
 
+        self.container_actions = None
+        self.action_space = None
+        self.zero_batched_state = None
+        self.zero_unbatched_state = None
+        self.preprocessed_states_buffer = None
+        if self.agent is not None:
+            self.setup_agent_buffers()
+
+    def set_inference_server(self, inference_server):
+        """
+        Connects this worker to the inference server on its node, which completes its setup when using
+        `use_inference_server`.
+
+        Args:
+            inference_server (any): Ray actor handle of a started `RayInferenceServer`.
+        """
+        self.agent = RemoteInferenceAgent(inference_server)
+        self.setup_agent_buffers()
+
+    def setup_agent_buffers(self):
+        """
+        Creates the state and action buffers depending on the agent's spaces.
+        """
+        #  Flag for container actions.
+        self.container_actions = self.agent.flat_action_space is not None
+        self.action_space = self.agent.flat_action_space
+
+        self.zero_batched_state = np.zeros((1,) + self.agent.preprocessed_state_space.shape)
+        self.zero_unbatched_state = np.zeros(self.agent.preprocessed_state_space.shape)
+        self.preprocessed_states_buffer = np.zeros(
+            shape=(self.num_environments,) + self.agent.preprocessed_state_space.shape,
+            dtype=self.agent.preprocessed_state_space.dtype
+        )
+
     def get_constructor_success(self):
         """
         For debugging: fetch the last attribute. Will fail if constructor failed.
@@ -202,14 +248,21 @@ class RayPolicyWorker(RayActor):
 
         while timesteps_executed < num_timesteps:
             current_iteration_start_timestamp = time.perf_counter()
-            for i, env_id in enumerate(self.env_ids):
-                state = self.agent.state_space.force_batch(env_states[i])
-                if self.preprocessors[env_id] is not None:
-                    if self.is_preprocessed[env_id] is False:
-                        self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
+            # Fused preprocessing handles all environments at once, so they are either all preprocessed or none.
+            if self.fused_preprocessor is not None:
+                if not all(self.is_preprocessed.values()):
+                    self.preprocessed_states_buffer[:] = self.fused_preprocessor.preprocess_batch(env_states)
+                    for env_id in self.env_ids:
                         self.is_preprocessed[env_id] = True
-                else:
-                    self.preprocessed_states_buffer[i] = env_states[i]
+            else:
+                for i, env_id in enumerate(self.env_ids):
+                    state = self.agent.state_space.force_batch(env_states[i])
+                    if self.preprocessors[env_id] is not None:
+                        if self.is_preprocessed[env_id] is False:
+                            self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
+                            self.is_preprocessed[env_id] = True
+                    else:
+                        self.preprocessed_states_buffer[i] = env_states[i]
 
             actions = self.agent.get_action(states=self.preprocessed_states_buffer,
                                             use_exploration=use_exploration, apply_preprocessing=False)
@@ -247,6 +300,9 @@ class RayPolicyWorker(RayActor):
 
             # Do accounting for each environment.
             state_buffer = np.array(self.preprocessed_states_buffer)
+            if self.fused_preprocessor is not None:
+                # Rows of reset environments are overwritten with their preprocessed reset states below.
+                preprocessed_next_states = self.fused_preprocessor.preprocess_batch(next_states)
             for i, env_id in enumerate(self.env_ids):
                 # Set is preprocessed to False because env_states are currently NOT preprocessed.
                 self.is_preprocessed[env_id] = False
@@ -301,13 +357,18 @@ class RayPolicyWorker(RayActor):
                         # This re-fills the sequence with the reset state.
                         state = self.agent.state_space.force_batch(env_states[i])
                         # Pre - process, add to buffer
-                        self.preprocessed_states_buffer[i] = np.array(self.preprocessors[env_id].preprocess(state))
+                        self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
                         self.is_preprocessed[env_id] = True
                     current_episode_rewards[i] = 0
                     current_episode_timesteps[i] = 0
                     current_episode_start_timestamps[i] = time.perf_counter()
                     current_episode_sample_times[i] = 0.0
 
+            if self.fused_preprocessor is not None:
+                self.preprocessed_states_buffer[:] = preprocessed_next_states
+                for env_id in self.env_ids:
+                    self.is_preprocessed[env_id] = True
+
             if 0 < num_timesteps <= timesteps_executed or (break_on_terminal and np.any(terminals)):
                 self.total_worker_steps += timesteps_executed
                 break
@@ -372,11 +433,10 @@ class RayPolicyWorker(RayActor):
         return sample, sample.batch_size
 
     def set_weights(self, weights):
-        policy_weights = {k: v for k,v in zip(weights.policy_vars, weights.policy_values)}
-        vf_weights = None
-        if weights.has_vf:
-            vf_weights = {k: v for k, v in zip(weights.value_function_vars, weights.value_function_values)}
-        self.agent.set_weights(policy_weights, value_function_weights=vf_weights)
+        weights = self.weight_receiver.receive(weights)
+        if weights is not None:
+            policy_weights, vf_weights = weights
+            self.agent.set_weights(policy_weights, value_function_weights=vf_weights)
 
     def get_workload_statistics(self):
         """
@@ -433,9 +493,9 @@ class RayPolicyWorker(RayActor):
             )
 
         if self.compress:
+            # Compress all states as one contiguous block.
             env_dtype = self.vector_env.state_space.dtype
-            states = [ray_compress(np.asarray(state, dtype=util.convert_dtype(dtype=env_dtype, to='np')))
-                      for state in states]
+            states = ray_compress(np.asarray(states, dtype=util.convert_dtype(dtype=env_dtype, to='np')))
         return dict(
             states=states,
             actions=actions,
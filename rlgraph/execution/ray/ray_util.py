@@ -19,8 +19,10 @@ from __future__ import print_function
 
 import os
 import base64
+import struct
+import time
 import numpy as np
-from six import string_types
+from six import text_type
 from rlgraph import get_distributed_backend
 from rlgraph.utils.rlgraph_errors import RLGraphError
 
@@ -35,10 +37,25 @@ class RayWeight(object):
     """
     Wrapper to transport TF weights to deal with serialisation bugs in Ray/Arrow.
 
+    Weights created by a `RayWeightBroadcaster` are versioned and may be encoded: Float values can be cast to a
+    smaller dtype for transport, and delta payloads only contain the changed variables as differences to the
+    weights of a keyframe version (see `RayWeightReceiver` for decoding).
+
     #TODO investigate serialisation bugs in Ray/flatten values.
     """
 
-    def __init__(self, weights):
+    def __init__(self, weights, version=None, keyframe_version=None, is_delta=False):
+        """
+        Args:
+            weights (dict): Dict with "policy_weights" and optionally "value_function_weights" dicts.
+            version (Optional[int]): Version of the weights. Unversioned weights are always applied by workers.
+            keyframe_version (Optional[int]): For delta payloads, the keyframe version the deltas refer to. For
+                keyframes, equal to `version`.
+            is_delta (bool): Whether the values are deltas to the keyframe's weights.
+        """
+        self.version = version
+        self.keyframe_version = keyframe_version
+        self.is_delta = is_delta
         self.policy_vars = []
         self.policy_values = []
 
@@ -47,13 +64,250 @@ class RayWeight(object):
             self.policy_values.append(v)
 
         self.has_vf = False
-        if "value_function_weights" in weights:
+        self.nbytes = sum(np.asarray(v).nbytes for v in self.policy_values)
+        if weights.get("value_function_weights") is not None:
             self.value_function_vars = []
             self.value_function_values = []
             self.has_vf = True
             for k, v in weights["value_function_weights"].items():
                 self.value_function_vars.append(k)
                 self.value_function_values.append(v)
+            self.nbytes += sum(np.asarray(v).nbytes for v in self.value_function_values)
+
+    @property
+    def is_keyframe(self):
+        return self.version is not None and self.version == self.keyframe_version
+
+
+class RayWeightBroadcaster(object):
+    """
+    Broadcasts versioned weights from a learner to remote workers.
+
+    Each call to `update` creates a new version. Workers already holding the current version are skipped, and each
+    payload is only put into the object store once per version. With delta encoding, a full keyframe is sent
+    every `keyframe_interval` versions and workers holding the current keyframe only receive the changed
+    variables as deltas to it. Float values can be cast to e.g. float16 for transport (deltas are taken to the
+    cast keyframe so quantization errors do not accumulate).
+    """
+
+    def __init__(self, weight_dtype=None, delta_encoding=False, keyframe_interval=100, use_object_store=True):
+        """
+        Args:
+            weight_dtype (Optional[str]): Float dtype to transport float values in, e.g. "float16". If None,
+                values are sent as is.
+            delta_encoding (bool): Whether to send deltas to the last keyframe to workers holding it.
+            keyframe_interval (int): Number of versions after which a new keyframe is created when using
+                delta encoding.
+            use_object_store (bool): Whether workers are Ray actors receiving payloads via the object store. If
+                False, payloads are passed to the workers' `set_weights` directly (e.g. local worker handles).
+        """
+        self.weight_dtype = np.dtype(weight_dtype) if weight_dtype is not None else None
+        self.delta_encoding = delta_encoding
+        self.keyframe_interval = keyframe_interval
+        self.use_object_store = use_object_store
+
+        self.version = 0
+        self.keyframe_version = None
+        # Keyframe values as given and as decoded by workers.
+        self.keyframe_weights = None
+        self.keyframe = None
+        self.weights = None
+        # Current payloads by type ("keyframe", "delta") and their object store ids.
+        self.payloads = {}
+        self.payload_ids = {}
+        # Version and keyframe version last sent to each worker.
+        self.worker_versions = {}
+        self.worker_keyframe_versions = {}
+
+        self.bytes_broadcast = 0
+        self.num_syncs = 0
+        self.num_skipped_syncs = 0
+        self.metrics_start = time.monotonic()
+
+    def update(self, weights):
+        """
+        Creates a new version from the given weights.
+
+        Args:
+            weights (dict): Weights as returned by `Agent.get_weights()`.
+        """
+        self.version += 1
+        self.weights = weights
+        self.payloads = {}
+        self.payload_ids = {}
+        if self.keyframe is None or not self.delta_encoding or \
+                self.version - self.keyframe_version >= self.keyframe_interval:
+            self.keyframe_version = self.version
+            # Weights may be views of the live parameters (e.g. PyTorch) which are updated in place -> Copy the
+            # keyframe so later versions can be compared against it.
+            self.keyframe_weights = self._map_weights(self._copy, weights)
+            encoded = self._map_weights(self._encode, self.keyframe_weights)
+            self.payloads["keyframe"] = RayWeight(encoded, version=self.version, keyframe_version=self.version)
+            self.keyframe = self._map_weights(lambda value: self._copy(self._decode(value)), encoded)
+
+    def get_payloads(self, worker):
+        """
+        Returns the payloads a worker needs to reach the current version and marks them as sent.
+
+        Args:
+            worker (any): Worker handle.
+
+        Returns:
+            List[str]: Payload types ("keyframe", "delta") in the order they have to be applied. Empty if the
+                worker already holds the current version.
+        """
+        if self.worker_versions.get(worker) == self.version:
+            return []
+        payload_types = []
+        if self.worker_keyframe_versions.get(worker) != self.keyframe_version:
+            payload_types.append("keyframe")
+        if self.keyframe_version != self.version:
+            if "delta" not in self.payloads:
+                self.payloads["delta"] = RayWeight(
+                    self._get_deltas(), version=self.version, keyframe_version=self.keyframe_version, is_delta=True
+                )
+            payload_types.append("delta")
+
+        self.worker_versions[worker] = self.version
+        self.worker_keyframe_versions[worker] = self.keyframe_version
+        return payload_types
+
+    def sync(self, worker):
+        """
+        Sends the current version to a remote worker via its `set_weights` method, unless it already holds it.
+
+        Args:
+            worker (any): Ray worker handle (or local worker handle if not using the object store).
+
+        Returns:
+            bool: Whether weights were sent.
+        """
+        payload_types = self.get_payloads(worker)
+        if len(payload_types) == 0:
+            self.num_skipped_syncs += 1
+            return False
+        for payload_type in payload_types:
+            if not self.use_object_store:
+                worker.set_weights(self.payloads[payload_type])
+            else:
+                if payload_type not in self.payload_ids:
+                    self.payload_ids[payload_type] = ray.put(self.payloads[payload_type])
+                worker.set_weights.remote(self.payload_ids[payload_type])
+            self.bytes_broadcast += self.payloads[payload_type].nbytes
+        self.num_syncs += 1
+        return True
+
+    def get_metrics(self):
+        """
+        Returns:
+            dict: Current version, number of sent and skipped syncs, bytes broadcast in total and per second.
+        """
+        elapsed = (time.monotonic() - self.metrics_start) or 1e-10
+        return dict(
+            weight_version=self.version,
+            weight_syncs=self.num_syncs,
+            weight_syncs_skipped=self.num_skipped_syncs,
+            weight_broadcast_bytes=self.bytes_broadcast,
+            weight_broadcast_bytes_per_second=self.bytes_broadcast / elapsed
+        )
+
+    def reset_metrics(self):
+        self.bytes_broadcast = 0
+        self.num_syncs = 0
+        self.num_skipped_syncs = 0
+        self.metrics_start = time.monotonic()
+
+    def _get_deltas(self):
+        deltas = {}
+        for key in ["policy_weights", "value_function_weights"]:
+            if self.weights.get(key) is None:
+                continue
+            deltas[key] = {}
+            for name, value in self.weights[key].items():
+                # Only changed variables are sent, deltas are taken to the decoded keyframe.
+                if not np.array_equal(value, self.keyframe_weights[key][name]):
+                    deltas[key][name] = self._encode(np.asarray(value) - self.keyframe[key][name])
+        return deltas
+
+    def _encode(self, value):
+        value = np.asarray(value)
+        if self.weight_dtype is not None and np.issubdtype(value.dtype, np.floating):
+            return value.astype(self.weight_dtype)
+        return value
+
+    @staticmethod
+    def _copy(value):
+        return np.array(value, copy=True)
+
+    @staticmethod
+    def _decode(value):
+        # Reduced precision values are decoded as float32 (as used by all weights).
+        if value.dtype == np.float16:
+            return value.astype(np.float32)
+        return value
+
+    @staticmethod
+    def _map_weights(fn, weights):
+        return {key: {name: fn(value) for name, value in weights[key].items()}
+                for key in ["policy_weights", "value_function_weights"] if weights.get(key) is not None}
+
+
+class RayWeightReceiver(object):
+    """
+    Decodes `RayWeight` payloads on a worker. Skips versioned payloads that are not newer than the last applied
+    weights and keeps the last keyframe to apply delta payloads to.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.keyframe_version = None
+        self.keyframe = None
+
+    def receive(self, weights):
+        """
+        Args:
+            weights (RayWeight): The received payload.
+
+        Returns:
+            Optional[Tuple[dict,Optional[dict]]]: The decoded policy and value function weights (None if not
+                contained) or None if the payload is not newer than the currently applied weights.
+        """
+        is_newer = weights.version is None or self.version is None or weights.version > self.version
+        # Outdated keyframes are still kept to apply subsequent deltas to.
+        if not is_newer and not weights.is_keyframe:
+            return None
+
+        policy_weights = dict(zip(weights.policy_vars, weights.policy_values))
+        vf_weights = dict(zip(weights.value_function_vars, weights.value_function_values)) if weights.has_vf \
+            else None
+
+        if weights.is_delta:
+            if weights.keyframe_version != self.keyframe_version:
+                raise RLGraphError(
+                    "ERROR: Delta weights for keyframe version {} received, but keyframe version is {}!".format(
+                        weights.keyframe_version, self.keyframe_version
+                    )
+                )
+            policy_weights = self._apply_deltas(self.keyframe[0], policy_weights)
+            if vf_weights is not None:
+                vf_weights = self._apply_deltas(self.keyframe[1], vf_weights)
+        else:
+            policy_weights = {k: RayWeightBroadcaster._decode(np.asarray(v)) for k, v in policy_weights.items()}
+            if vf_weights is not None:
+                vf_weights = {k: RayWeightBroadcaster._decode(np.asarray(v)) for k, v in vf_weights.items()}
+            if weights.is_keyframe and (self.keyframe_version is None or weights.version > self.keyframe_version):
+                self.keyframe_version = weights.version
+                self.keyframe = (policy_weights, vf_weights)
+
+        if not is_newer:
+            return None
+        if weights.version is not None:
+            self.version = weights.version
+        return policy_weights, vf_weights
+
+    @staticmethod
+    def _apply_deltas(keyframe, deltas):
+        return {k: v + deltas[k].astype(v.dtype) if k in deltas else v for k, v in keyframe.items()}
 
 
 class RayTaskPool(object):
@@ -153,24 +407,118 @@ def split_local_non_local_agents(ray_agents):
     return local, non_local
 
 
-# Ported Ray compression utils, encoding apparently necessary for Redis.
+# Header of compressed arrays: dtype-string length, number of dims, followed by dtype string and shape.
+_COMPRESSION_HEADER = struct.Struct("<BB")
+
+
 def ray_compress(data):
-    data = pyarrow.serialize(data).to_buffer().to_pybytes()
-    data = lz4.frame.compress(data)
-    # Unclear why ascii decoding.
-    data = base64.b64encode(data).decode("ascii")
-    # data = base64.b64encode(data)
-    return data
+    """
+    Compresses an array (e.g. a single state or a whole batch of states as one contiguous block)
+    into a binary lz4 payload. The payload is raw bytes (no base64) with a small dtype/shape header.
+
+    Args:
+        data (Union[ndarray,any]): Array or array-like to compress.
+
+    Returns:
+        bytes: Compressed payload.
+    """
+    data = np.ascontiguousarray(data)
+    dtype = data.dtype.str.encode("ascii")
+    header = _COMPRESSION_HEADER.pack(len(dtype), data.ndim) + dtype + \
+        struct.pack("<{}q".format(data.ndim), *data.shape)
+    return header + lz4.frame.compress(data.data)
 
 
 def ray_decompress(data):
-    if isinstance(data, bytes) or isinstance(data, string_types):
+    """
+    Decompresses a payload created by `ray_compress`. Legacy base64/pyarrow payloads (ASCII strings) are
+    still decoded, all other inputs are returned unchanged.
+
+    Args:
+        data (any): Compressed payload.
+
+    Returns:
+        any: Decompressed (writable) array or the unchanged input.
+    """
+    if isinstance(data, text_type):
         data = base64.b64decode(data)
         data = lz4.frame.decompress(data)
-        data = pyarrow.deserialize(data)
+        return pyarrow.deserialize(data)
+    elif isinstance(data, bytes):
+        dtype, shape, offset = _parse_compression_header(data)
+        values = lz4.frame.decompress(memoryview(data)[offset:], return_bytearray=True)
+        return np.frombuffer(values, dtype=dtype).reshape(shape)
     return data
 
 
+def ray_decompressed_spec(data):
+    """
+    Returns dtype and shape of a decompressed payload. For payloads created by `ray_compress`, only the header is
+    read.
+
+    Args:
+        data (any): Compressed payload (or raw value).
+
+    Returns:
+        tuple:
+            - np.dtype: The decompressed dtype.
+            - tuple: The decompressed shape.
+    """
+    if isinstance(data, bytes):
+        dtype, shape, _ = _parse_compression_header(data)
+        return dtype, shape
+    value = np.asarray(ray_decompress(data))
+    return value.dtype, value.shape
+
+
+def ray_decompress_batch(data, out=None):
+    """
+    Decompresses a sequence of individually compressed items into one batch array. The lz4 output of payloads
+    created by `ray_compress` is written into the item's row of the batch without intermediate arrays.
+
+    Args:
+        data (Sequence[any]): Compressed payloads (or raw values), one per batch item.
+        out (Optional[ndarray]): Preallocated C-contiguous output array of shape [len(data), ...]. If None,
+            allocated from the header of the first item.
+
+    Returns:
+        ndarray: Batch of decompressed items.
+    """
+    if out is None:
+        if len(data) == 0:
+            return np.empty(shape=(0,))
+        dtype, shape = ray_decompressed_spec(data[0])
+        out = np.empty(shape=(len(data),) + tuple(shape), dtype=dtype)
+    for i, item in enumerate(data):
+        if isinstance(item, bytes):
+            dtype, shape, offset = _parse_compression_header(item)
+            if dtype == out.dtype and tuple(shape) == out.shape[1:] and out.flags.c_contiguous:
+                # Byte view of the item's row (lz4 can not decompress into a given buffer).
+                memoryview(out[i:i + 1]).cast("B")[:] = lz4.frame.decompress(memoryview(item)[offset:])
+                continue
+        out[i] = ray_decompress(item)
+    return out
+
+
+def _parse_compression_header(data):
+    """
+    Parses the header of a `ray_compress` payload.
+
+    Args:
+        data (bytes): Compressed payload.
+
+    Returns:
+        tuple: Dtype, shape and offset of the compressed values.
+    """
+    dtype_len, ndim = _COMPRESSION_HEADER.unpack_from(data)
+    offset = _COMPRESSION_HEADER.size
+    dtype = np.dtype(data[offset:offset + dtype_len].decode("ascii"))
+    offset += dtype_len
+    shape = struct.unpack_from("<{}q".format(ndim), data, offset)
+    offset += 8 * ndim
+    return dtype, shape, offset
+
+
 # Ray's magic constant worker explorations..
 def worker_exploration(worker_index, num_workers):
     """
@@ -197,16 +545,21 @@ def merge_samples(samples, decompress=False):
     """
     batch = {}
     sample_layout = samples[0].sample_batch
+    if decompress:
+        assert "states" in sample_layout
     for key in sample_layout.keys():
+        if decompress and key == "states":
+            # Each sample's states were compressed as one block.
+            if isinstance(sample_layout[key], bytes):
+                batch[key] = np.concatenate([ray_decompress(sample.sample_batch[key]) for sample in samples])
+            # Individually compressed states: Binary payloads must not go through numpy string arrays.
+            else:
+                batch[key] = ray_decompress_batch([state for sample in samples for state in sample.sample_batch[key]])
         # E.g. action dict.
-        if isinstance(sample_layout[key], dict):
+        elif isinstance(sample_layout[key], dict):
             batch[key] = {}
             for name in sample_layout[key].keys():
                 batch[key][name] = np.concatenate([sample.sample_batch[key][name] for sample in samples])
         else:
             batch[key] = np.concatenate([sample.sample_batch[key] for sample in samples])
-
-    if decompress:
-        assert "states" in batch
-        batch["states"] = np.asarray([ray_decompress(state) for state in batch["states"]])
     return batch
@@ -24,13 +24,19 @@ from six.moves import xrange as range_
 import time
 
 from rlgraph import get_distributed_backend
+from rlgraph.utils.numpy import n_step_returns
+from rlgraph.utils.rlgraph_errors import RLGraphError
 from rlgraph.utils.util import SMALL_NUMBER
+from rlgraph.components.helpers import FusedPreprocessor
 from rlgraph.components.neural_networks.preprocessor_stack import PreprocessorStack
 from rlgraph.environments.sequential_vector_env import SequentialVectorEnv
+from rlgraph.environments.subprocess_vector_env import SubprocessVectorEnv
 from rlgraph.execution.environment_sample import EnvironmentSample
+from rlgraph.execution.rollout_buffer import RolloutBuffer
 from rlgraph.execution.ray import RayExecutor
 from rlgraph.execution.ray.ray_actor import RayActor
-from rlgraph.execution.ray.ray_util import ray_compress
+from rlgraph.execution.ray.ray_inference_server import RemoteInferenceAgent
+from rlgraph.execution.ray.ray_util import ray_compress, RayWeightReceiver
 
 if get_distributed_backend() == "ray":
     import ray
@@ -65,9 +71,19 @@ class RayValueWorker(RayActor):
         self.n_step_adjustment = worker_spec.pop("n_step_adjustment", 1)
         self.env_ids = ["env_{}".format(i) for i in range_(self.num_environments)]
         num_background_envs = worker_spec.pop("num_background_envs", 1)
+        # Run preprocessing for all environments as one fused pipeline.
+        fuse_preprocessing = worker_spec.pop("fuse_preprocessing", False)
+        # Compute actions via the executor-created inference server on this node instead of a local agent.
+        self.use_inference_server = worker_spec.pop("use_inference_server", False)
+        worker_spec.pop("inference_server_spec", None)
 
         # TODO from spec once we decided on generic vectorization.
-        self.vector_env = SequentialVectorEnv(self.num_environments, env_spec, num_background_envs)
+        # Step environments in worker processes if requested, otherwise sequentially in this process.
+        num_env_processes = worker_spec.pop("num_env_processes", 0)
+        if num_env_processes > 0:
+            self.vector_env = SubprocessVectorEnv(self.num_environments, env_spec, num_env_processes)
+        else:
+            self.vector_env = SequentialVectorEnv(self.num_environments, env_spec, num_background_envs)
 
         # Then update agent config.
         agent_config['state_space'] = self.vector_env.state_space
@@ -76,6 +92,9 @@ class RayValueWorker(RayActor):
         ray_exploration = worker_spec.pop("ray_exploration", None)
         self.worker_executes_exploration = worker_spec.pop("worker_executes_exploration", False)
         self.ray_exploration_set = False
+        if ray_exploration is not None and self.use_inference_server and not self.worker_executes_exploration:
+            raise RLGraphError("ERROR: Workers sharing an inference server can only use worker specific exploration "
+                               "values if 'worker_executes_exploration' is set.")
         if ray_exploration is not None:
             # Update worker with worker specific constant exploration value.
             # TODO too many levels?
@@ -99,12 +118,17 @@ class RayValueWorker(RayActor):
                 preprocessing_spec, self.vector_env.state_space.with_batch_rank()
             )
             self.is_preprocessed[env_id] = False
-        self.agent = self.setup_agent(agent_config, worker_spec)
+        self.fused_preprocessor = None
+        if fuse_preprocessing:
+            self.fused_preprocessor, self.preprocessors = FusedPreprocessor.fuse(
+                self.preprocessors, self.vector_env.state_space
+            )
+        self.agent = None
+        if not self.use_inference_server:
+            self.agent = self.setup_agent(agent_config, worker_spec)
         self.worker_frameskip = frameskip
-
-        #  Flag for container actions.
-        self.container_actions = self.agent.flat_action_space is not None
-        self.action_space = self.agent.flat_action_space
+        # Decodes versioned weight payloads and skips redundant ones.
+        self.weight_receiver = RayWeightReceiver()
 
         # Save these so they can be fetched after training if desired.
         self.finished_episode_rewards = [[] for _ in range_(self.num_environments)]
@@ -125,12 +149,6 @@ class RayValueWorker(RayActor):
         # To continue running through multiple exec calls.
         self.last_states = self.vector_env.reset_all()
 
-        self.zero_batched_state = np.zeros((1,) + self.agent.preprocessed_state_space.shape)
-        self.zero_unbatched_state = np.zeros(self.agent.preprocessed_state_space.shape)
-        self.preprocessed_states_buffer = np.zeros(
-            shape=(self.num_environments,) + self.agent.preprocessed_state_space.shape,
-            dtype=self.agent.preprocessed_state_space.dtype
-        )
         self.last_ep_timesteps = [0 for _ in range_(self.num_environments)]
         self.last_ep_rewards = [0 for _ in range_(self.num_environments)]
         self.last_ep_start_timestamps = [0.0 for _ in range_(self.num_environments)]
@@ -140,6 +158,46 @@ class RayValueWorker(RayActor):
         # Was the last state a terminal state so env should be reset in next call?
         self.last_terminals = [False for _ in range_(self.num_environments)]
 
+        self.container_actions = None
+        self.action_space = None
+        self.zero_batched_state = None
+        self.zero_unbatched_state = None
+        self.preprocessed_states_buffer = None
+        self.rollout_buffer = None
+        if self.agent is not None:
+            self.setup_agent_buffers()
+
+    def set_inference_server(self, inference_server):
+        """
+        Connects this worker to the inference server on its node, which completes its setup when using
+        `use_inference_server`.
+
+        Args:
+            inference_server (any): Ray actor handle of a started `RayInferenceServer`.
+        """
+        self.agent = RemoteInferenceAgent(inference_server)
+        self.setup_agent_buffers()
+
+    def setup_agent_buffers(self):
+        """
+        Creates the state and action buffers depending on the agent's spaces.
+        """
+        #  Flag for container actions.
+        self.container_actions = self.agent.flat_action_space is not None
+        self.action_space = self.agent.flat_action_space
+
+        self.zero_batched_state = np.zeros((1,) + self.agent.preprocessed_state_space.shape)
+        self.zero_unbatched_state = np.zeros(self.agent.preprocessed_state_space.shape)
+        self.preprocessed_states_buffer = np.zeros(
+            shape=(self.num_environments,) + self.agent.preprocessed_state_space.shape,
+            dtype=self.agent.preprocessed_state_space.dtype
+        )
+        # Per-step records are written in place, fragments are sliced out of it.
+        self.rollout_buffer = RolloutBuffer(
+            self.num_environments, self.agent.preprocessed_state_space,
+            self.agent.flat_action_space if self.container_actions else self.agent.action_space
+        )
+
     def get_constructor_success(self):
         """
         For debugging: fetch the last attribute. Will fail if constructor failed.
@@ -205,7 +263,7 @@ class RayValueWorker(RayActor):
         episodes_executed = [0 for _ in range_(self.num_environments)]
         env_frames = 0
         last_episode_rewards = []
-        # Final result batch.
+        # Final result batch: Post-processed fragments, concatenated once at the end.
         if self.container_actions:
             batch_actions = {k: [] for k in self.action_space.keys()}
         else:
@@ -213,20 +271,9 @@ class RayValueWorker(RayActor):
         batch_states, batch_rewards, batch_next_states, batch_terminals = [], [], [], []
 
         # Running trajectories.
-        sample_states, sample_actions, sample_rewards, sample_terminals = {}, {}, {}, {}
+        self.rollout_buffer.reset(int(np.ceil(num_timesteps / self.num_environments)))
         next_states = [np.zeros_like(self.last_states) for _ in range_(self.num_environments)]
 
-        # Reset envs and Agent either if finished an episode in current loop or if last state
-        # from previous execution was terminal for that environment.
-        for i, env_id in enumerate(self.env_ids):
-            sample_states[env_id] = []
-            if self.container_actions:
-                sample_actions[env_id] = {k: [] for k in self.action_space.keys()}
-            else:
-                sample_actions[env_id] = []
-            sample_rewards[env_id] = []
-            sample_terminals[env_id] = []
-
         env_states = self.last_states
         current_episode_rewards = self.last_ep_rewards
         current_episode_timesteps = self.last_ep_timesteps
@@ -237,14 +284,21 @@ class RayValueWorker(RayActor):
         terminals = [False for _ in range_(self.num_environments)]
         while timesteps_executed < num_timesteps:
             current_iteration_start_timestamp = time.perf_counter()
-            for i, env_id in enumerate(self.env_ids):
-                state = self.agent.state_space.force_batch(env_states[i])
-                if self.preprocessors[env_id] is not None:
-                    if self.is_preprocessed[env_id] is False:
-                        self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
+            # Fused preprocessing handles all environments at once, so they are either all preprocessed or none.
+            if self.fused_preprocessor is not None:
+                if not all(self.is_preprocessed.values()):
+                    self.preprocessed_states_buffer[:] = self.fused_preprocessor.preprocess_batch(env_states)
+                    for env_id in self.env_ids:
                         self.is_preprocessed[env_id] = True
-                else:
-                    self.preprocessed_states_buffer[i] = env_states[i]
+            else:
+                for i, env_id in enumerate(self.env_ids):
+                    state = self.agent.state_space.force_batch(env_states[i])
+                    if self.preprocessors[env_id] is not None:
+                        if self.is_preprocessed[env_id] is False:
+                            self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
+                            self.is_preprocessed[env_id] = True
+                    else:
+                        self.preprocessed_states_buffer[i] = env_states[i]
 
             actions = self.get_action(states=self.preprocessed_states_buffer,
                                       use_exploration=use_exploration, apply_preprocessing=False)
@@ -281,22 +335,16 @@ class RayValueWorker(RayActor):
             current_iteration_time = time.perf_counter() - current_iteration_start_timestamp
 
             # Do accounting for each environment.
-            state_buffer = np.array(self.preprocessed_states_buffer)
+            self.rollout_buffer.insert(self.preprocessed_states_buffer, actions, step_rewards, terminals)
+            if self.fused_preprocessor is not None:
+                # Rows of reset environments are overwritten with their preprocessed reset states below.
+                preprocessed_next_states = self.fused_preprocessor.preprocess_batch(next_states)
             for i, env_id in enumerate(self.env_ids):
                 # Set is preprocessed to False because env_states are currently NOT preprocessed.
                 self.is_preprocessed[env_id] = False
                 current_episode_timesteps[i] += 1
                 # Each position is the running episode reward of that episode. Add step reward.
                 current_episode_rewards[i] += step_rewards[i]
-                sample_states[env_id].append(state_buffer[i])
-
-                if self.container_actions:
-                    for name in self.action_space.keys():
-                        sample_actions[env_id][name].append(env_actions[i][name])
-                else:
-                    sample_actions[env_id].append(env_actions[i])
-                sample_rewards[env_id].append(step_rewards[i])
-                sample_terminals[env_id].append(terminals[i])
                 current_episode_sample_times[i] += current_iteration_time
 
                 # Terminate and reset episode for that environment.
@@ -309,43 +357,29 @@ class RayValueWorker(RayActor):
                     self.episodes_executed += 1
                     last_episode_rewards.append(current_episode_rewards[i])
 
-                    env_sample_states = sample_states[env_id]
-                    # Get next states for this environment's trajectory.
-                    env_sample_next_states = env_sample_states[1:]
-
-                    next_state = self.agent.state_space.force_batch(next_states[i])
-                    if self.preprocessors[env_id] is not None:
-                        next_state = self.preprocessors[env_id].preprocess(next_state)
-
-                    # Extend because next state has a batch dim.
-                    env_sample_next_states.extend(next_state)
+                    if self.fused_preprocessor is not None:
+                        # Copied into the fragment's next-states before the reset overwrites it.
+                        next_state = preprocessed_next_states[i]
+                    else:
+                        next_state = self.agent.state_space.force_batch(next_states[i])
+                        if self.preprocessors[env_id] is not None:
+                            next_state = self.preprocessors[env_id].preprocess(next_state)
 
                     # Post-process this trajectory via n-step discounting.
-                    # print("processing terminal episode of length:", len(env_sample_states))
-                    post_s, post_a, post_r, post_next_s, post_t = self._truncate_n_step(env_sample_states,
-                        sample_actions[env_id], sample_rewards[env_id], env_sample_next_states,
-                        sample_terminals[env_id], was_terminal=True)
+                    post_s, post_a, post_r, post_next_s, post_t = self._truncate_n_step(
+                        *self.rollout_buffer.get_fragment(i, next_state), was_terminal=True
+                    )
 
                     # Append to final result trajectories.
-                    batch_states.extend(post_s)
-                    if self.agent.flat_action_space is not None:
-                        # Use actions here, not env actions.
-                        for name in self.agent.flat_action_space.keys():
-                            batch_actions[name].extend(post_a[name])
-                    else:
-                        batch_actions.extend(post_a)
-                    batch_rewards.extend(post_r)
-                    batch_next_states.extend(post_next_s)
-                    batch_terminals.extend(post_t)
-
-                    # Reset running trajectory for this env.
-                    sample_states[env_id] = []
+                    batch_states.append(post_s)
                     if self.container_actions:
-                        sample_actions[env_id] = {k: [] for k in self.action_space.keys()}
+                        for name in self.action_space.keys():
+                            batch_actions[name].append(post_a[name])
                     else:
-                        sample_actions[env_id] = []
-                    sample_rewards[env_id] = []
-                    sample_terminals[env_id] = []
+                        batch_actions.append(post_a)
+                    batch_rewards.append(post_r)
+                    batch_next_states.append(post_next_s)
+                    batch_terminals.append(post_t)
 
                     # Reset this environment and its pre-processor stack.
                     env_states[i] = self.vector_env.reset(i)
@@ -354,13 +388,18 @@ class RayValueWorker(RayActor):
                         # This re-fills the sequence with the reset state.
                         state = self.agent.state_space.force_batch(env_states[i])
                         # Pre - process, add to buffer
-                        self.preprocessed_states_buffer[i] = np.array(self.preprocessors[env_id].preprocess(state))
+                        self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
                         self.is_preprocessed[env_id] = True
                     current_episode_rewards[i] = 0
                     current_episode_timesteps[i] = 0
                     current_episode_start_timestamps[i] = time.perf_counter()
                     current_episode_sample_times[i] = 0.0
 
+            if self.fused_preprocessor is not None:
+                self.preprocessed_states_buffer[:] = preprocessed_next_states
+                for env_id in self.env_ids:
+                    self.is_preprocessed[env_id] = True
+
             if 0 < num_timesteps <= timesteps_executed or (break_on_terminal and np.any(terminals)):
                 self.total_worker_steps += timesteps_executed
                 break
@@ -377,37 +416,41 @@ class RayValueWorker(RayActor):
         for i, env_id in enumerate(self.env_ids):
             # This env was not terminal -> need to process remaining trajectory
             if not terminals[i]:
-                env_sample_states = sample_states[env_id]
-                # Get next states for this environment's trajectory.
-                env_sample_next_states = env_sample_states[1:]
-                next_state = self.agent.state_space.force_batch(next_states[i])
-                if self.preprocessors[env_id] is not None:
-                    next_state = self.preprocessors[env_id].preprocess(next_state)
-                    # This is the env state in the next call so avoid double preprocessing
-                    # by adding to buffer.
-                    self.preprocessed_states_buffer[i] = np.array(next_state)
-                    self.is_preprocessed[env_id] = True
+                if self.fused_preprocessor is not None:
+                    # Already preprocessed after the last step.
+                    next_state = self.preprocessed_states_buffer[i]
+                else:
+                    next_state = self.agent.state_space.force_batch(next_states[i])
+                    if self.preprocessors[env_id] is not None:
+                        next_state = self.preprocessors[env_id].preprocess(next_state)
+                        # This is the env state in the next call so avoid double preprocessing
+                        # by adding to buffer.
+                        self.preprocessed_states_buffer[i] = next_state
+                        self.is_preprocessed[env_id] = True
+
+                post_s, post_a, post_r, post_next_s, post_t = self._truncate_n_step(
+                    *self.rollout_buffer.get_fragment(i, next_state), was_terminal=False
+                )
 
-                # Extend because next state has a batch dim.
-                env_sample_next_states.extend(next_state)
-                post_s, post_a, post_r, post_next_s, post_t = self._truncate_n_step(env_sample_states,
-                    sample_actions[env_id], sample_rewards[env_id], env_sample_next_states,
-                    sample_terminals[env_id], was_terminal=False)
-
-                batch_states.extend(post_s)
-                if self.agent.flat_action_space is not None:
-                    # Use actions here, not env actions.
-                    for name in self.agent.flat_action_space.keys():
-                        batch_actions[name].extend(post_a[name])
+                batch_states.append(post_s)
+                if self.container_actions:
+                    for name in self.action_space.keys():
+                        batch_actions[name].append(post_a[name])
                 else:
-                    batch_actions.extend(post_a)
-                batch_rewards.extend(post_r)
-                batch_next_states.extend(post_next_s)
-                batch_terminals.extend(post_t)
+                    batch_actions.append(post_a)
+                batch_rewards.append(post_r)
+                batch_next_states.append(post_next_s)
+                batch_terminals.append(post_t)
 
         # Perform final batch-processing once.
-        sample_batch, batch_size = self._batch_process_sample(batch_states, batch_actions,
-                                                              batch_rewards, batch_next_states, batch_terminals)
+        if self.container_actions:
+            batch_actions = {name: np.concatenate(batch_actions[name]) for name in self.action_space.keys()}
+        else:
+            batch_actions = np.concatenate(batch_actions)
+        sample_batch, batch_size = self._batch_process_sample(
+            np.concatenate(batch_states), batch_actions, np.concatenate(batch_rewards),
+            np.concatenate(batch_next_states), np.concatenate(batch_terminals)
+        )
 
         total_time = (time.monotonic() - start) or 1e-10
         self.sample_steps.append(timesteps_executed)
@@ -437,11 +480,10 @@ class RayValueWorker(RayActor):
         return sample, {"batch_size": sample.batch_size, "last_rewards": sample.metrics["last_rewards"]}
 
     def set_weights(self, weights):
-        policy_weights = {k: v for k,v in zip(weights.policy_vars, weights.policy_values)}
-        vf_weights = None
-        if weights.has_vf:
-            vf_weights = {k: v for k, v in zip(weights.value_function_vars, weights.value_function_values)}
-        self.agent.set_weights(policy_weights, value_function_weights=vf_weights)
+        weights = self.weight_receiver.receive(weights)
+        if weights is not None:
+            policy_weights, vf_weights = weights
+            self.agent.set_weights(policy_weights, value_function_weights=vf_weights)
 
     def get_workload_statistics(self):
         """
@@ -491,46 +533,17 @@ class RayValueWorker(RayActor):
              n-step truncated (shortened) version.
         """
         if self.n_step_adjustment > 1:
-            new_len = len(states) - self.n_step_adjustment + 1
-
-            # There are 2 cases. If the trajectory did not end in a terminal,
-            # we just have to move states forward and truncate.
-            if was_terminal:
-                # We know the ONLY last terminal is True.
-                terminal_position = len(rewards) - 1
-                for i in range(len(rewards)):
-                    for j in range(1, self.n_step_adjustment):
-                        # Outside sample data. Stop inner loop and set truncate = True
-                        if i + j >= len(next_states):
-                            break
-                        # Normal case: No terminal ahead (so far) in n-step sequence.
-                        if i + j < terminal_position:
-                            next_states[i] = next_states[i + j]
-                            rewards[i] += self.discount ** j * rewards[i + j]
-                        # Terminal ahead: Don't go beyond it.
-                        # Repeat it for the remaining n-steps and always assume r=0.0.
-                        else:
-                            next_states[i] = next_states[terminal_position]
-                            terminals[i] = True
-                            if i + j <= terminal_position:
-                                rewards[i] += self.discount ** j * rewards[i + j]
+            rewards, next_indices, terminals = n_step_returns(
+                rewards, terminals, self.n_step_adjustment, self.discount, was_terminal=was_terminal
+            )
+            # Records without a full n-step horizon are dropped from the end of non-terminal segments.
+            new_len = len(rewards)
+            states = states[:new_len]
+            next_states = next_states[next_indices]
+            if self.agent.flat_action_space is not None:
+                actions = {name: actions[name][:new_len] for name in self.agent.flat_action_space.keys()}
             else:
-                # We know this segment does not contain any terminals so we simply have to adjust next
-                # states and rewards.
-                for i in range_(len(rewards) - self.n_step_adjustment + 1):
-                    for j in range_(1, self.n_step_adjustment):
-                        next_states[i] = next_states[i + j]
-                        rewards[i] += self.discount ** j * rewards[i + j]
-
-                if self.agent.flat_action_space is not None:
-                    for arr in [states, rewards, next_states, terminals]:
-                        del arr[new_len:]
-                    # Delete container actions separately.
-                    for name in self.agent.flat_action_space.keys():
-                        del actions[name][new_len:]
-                else:
-                    for arr in [states, actions, rewards, next_states, terminals]:
-                        del arr[new_len:]
+                actions = actions[:new_len]
 
         return states, actions, rewards, next_states, terminals
 
@@ -17,12 +17,16 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import time
+
+import numpy as np
+
 from rlgraph.environments import Environment
 from rlgraph.execution.ray.ray_policy_worker import RayPolicyWorker
 
 from rlgraph import get_distributed_backend
 from rlgraph.execution.ray.ray_executor import RayExecutor
-from rlgraph.execution.ray.ray_util import merge_samples, RayWeight
+from rlgraph.execution.ray.ray_util import merge_samples, RayTaskPool
 
 if get_distributed_backend() == "ray":
     import ray
@@ -66,6 +70,15 @@ class SyncBatchExecutor(RayExecutor):
         # These are the tasks actually interacting with the environment.
         self.worker_sample_size = self.executor_spec["num_worker_samples"]
 
+        # Pipelined sampling: Keep sample tasks in flight during updates and build batches from the first
+        # completed fragments, discarding fragments sampled with weights more than `max_policy_lag` versions old.
+        self.pipelined_sampling = self.executor_spec.get("pipelined_sampling", False)
+        self.max_policy_lag = self.executor_spec.get("max_policy_lag", 1)
+        self.sample_tasks = RayTaskPool()
+        # Submission time and weights version per in-flight sample task.
+        self.sample_task_info = {}
+        self.worker_sample_latencies = {}
+
         assert not ray_spec, "ERROR: ray_spec still contains items: {}".format(ray_spec)
         self.logger.info("Setting up execution for Apex executor.")
         self.setup_execution()
@@ -84,6 +97,29 @@ class SyncBatchExecutor(RayExecutor):
             self.worker_spec, self.environment_spec, self.worker_frame_skip
         )
 
+    def execute_workload(self, workload):
+        self.worker_sample_latencies = {}
+        results = super(SyncBatchExecutor, self).execute_workload(workload)
+        results.update(self.get_sample_latency_metrics())
+        return results
+
+    def get_sample_latency_metrics(self):
+        """
+        Returns sample task latencies (submission to completion) of pipelined sampling.
+
+        Returns:
+            dict: Mean and max latency over all workers and the mean latency per worker id.
+        """
+        if len(self.worker_sample_latencies) == 0:
+            return {}
+        all_latencies = [latency for latencies in self.worker_sample_latencies.values() for latency in latencies]
+        return dict(
+            mean_worker_sample_latency=np.mean(all_latencies),
+            max_worker_sample_latency=np.max(all_latencies),
+            worker_sample_latencies={self.worker_ids[worker]: np.mean(latencies)
+                                     for worker, latencies in self.worker_sample_latencies.items()}
+        )
+
     def _execute_step(self):
         """
         Executes a workload on Ray. The main loop performs the following
@@ -95,13 +131,16 @@ class SyncBatchExecutor(RayExecutor):
         - Merge samples
         - Perform local update(s)
         """
+        if self.pipelined_sampling:
+            return self._execute_pipelined_step()
+
         # Env steps done during this rollout.
         env_steps = 0
 
         # 1. Sync local learners weights to remote workers.
-        weights = ray.put(RayWeight(self.local_agent.get_weights()))
+        self.weight_broadcaster.update(self.local_agent.get_weights())
         for ray_worker in self.ray_env_sample_workers:
-            ray_worker.set_weights.remote(weights)
+            self.sync_worker_weights(ray_worker)
 
         # 2. Schedule samples and fetch results from RayWorkers.
         sample_batches = []
@@ -129,4 +168,56 @@ class SyncBatchExecutor(RayExecutor):
             "rewards": rewards
         }
 
+    def _execute_pipelined_step(self):
+        """
+        Executes one update in pipelined mode:
+
+        - Collect completed sample fragments until they form an update batch, immediately rescheduling a sample
+          task on each worker whose fragment arrived (so workers keep sampling during the update).
+        - Discard fragments sampled with weights older than `max_policy_lag` versions.
+        - Merge samples and perform the local update.
+        - Sync the new weights to all workers (applied after their in-flight sample tasks).
+        """
+        if len(self.sample_tasks.ray_tasks) == 0:
+            self.weight_broadcaster.update(self.local_agent.get_weights())
+            for ray_worker in self.ray_env_sample_workers:
+                self._schedule_sample_task(ray_worker)
+
+        sample_batches = []
+        num_samples = 0
+        discarded = 0
+        while num_samples < self.update_batch_size:
+            for ray_worker, sample_obj_id in self.sample_tasks.get_completed():
+                submit_time, weights_version = self.sample_task_info.pop(sample_obj_id)
+                sample = ray.get(sample_obj_id)
+                self.worker_sample_latencies.setdefault(ray_worker, []).append(time.monotonic() - submit_time)
+                if self.weight_broadcaster.version - weights_version > self.max_policy_lag:
+                    discarded += 1
+                else:
+                    sample_batches.append(sample)
+                    num_samples += sample.batch_size
+                self._schedule_sample_task(ray_worker)
+
+        rewards = []
+        for sample in sample_batches:
+            if len(sample.metrics["last_rewards"]) > 0:
+                rewards.extend(sample.metrics["last_rewards"])
+        batch = merge_samples(sample_batches, decompress=self.compress_states)
+        self.local_agent.update(batch, apply_postprocessing=False)
+
+        self.weight_broadcaster.update(self.local_agent.get_weights())
+        for ray_worker in self.ray_env_sample_workers:
+            self.sync_worker_weights(ray_worker)
+
+        return num_samples, 1, {
+            "discarded": discarded,
+            "queue_inserts": 0,
+            "rewards": rewards
+        }
 
+    def _schedule_sample_task(self, ray_worker):
+        # Sync (no-op if up to date) so the task samples with the current weights.
+        self.sync_worker_weights(ray_worker)
+        sample_obj_id = ray_worker.execute_and_get_timesteps.remote(self.worker_sample_size)
+        self.sample_task_info[sample_obj_id] = (time.monotonic(), self.get_worker_weights_version(ray_worker))
+        self.sample_tasks.add_task(ray_worker, sample_obj_id)
@@ -0,0 +1,131 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from rlgraph.utils.rlgraph_errors import RLGraphError
+from rlgraph.utils.util import convert_dtype
+
+
+class RolloutBuffer(object):
+    """
+    Preallocated [num_environments, num_timesteps] record arrays for the sampling loop of a worker stepping
+    a vector of environments in lock-step.
+
+    Each step writes one column in place. Episode fragments of one environment are returned as views into the
+    arrays, which stay valid until the next call to `reset`, as every column is written only once per rollout.
+    """
+    def __init__(self, num_environments, state_space, action_space, num_timesteps=1):
+        """
+        Args:
+            num_environments (int): Number of environments stepped per call to `insert`.
+            state_space (Space): Space of the (preprocessed) states to store.
+            action_space (Union[Space,dict]): Action Space or dict of flat action Spaces for container actions.
+            num_timesteps (int): Initial number of steps per rollout. Grows on `reset` if necessary.
+        """
+        self.num_environments = num_environments
+        self.state_space = state_space
+        self.action_space = action_space
+        self.container_actions = isinstance(action_space, dict)
+
+        self.capacity = 0
+        self.states = None
+        self.actions = None
+        self.rewards = None
+        self.terminals = None
+        self._allocate(num_timesteps)
+
+        # Next column to write and start column of each environment's running fragment.
+        self.timestep = 0
+        self.fragment_starts = np.zeros(shape=(num_environments,), dtype=np.int64)
+
+    def reset(self, num_timesteps):
+        """
+        Starts a new rollout of at most `num_timesteps` steps. Invalidates all previously returned fragments.
+
+        Args:
+            num_timesteps (int): Max. number of steps of the rollout.
+        """
+        if num_timesteps > self.capacity:
+            self._allocate(num_timesteps)
+        self.timestep = 0
+        self.fragment_starts[:] = 0
+
+    def insert(self, states, actions, rewards, terminals):
+        """
+        Writes one step of all environments.
+
+        Args:
+            states (np.ndarray): Batch of states, one per environment.
+            actions (Union[np.ndarray,dict]): Batch of actions or dict of action batches for container actions.
+            rewards (Union[list,np.ndarray]): Rewards, one per environment.
+            terminals (Union[list,np.ndarray]): Terminals, one per environment.
+        """
+        if self.timestep >= self.capacity:
+            raise RLGraphError("Rollout buffer is full ({} steps). Call `reset` with a larger number of "
+                               "timesteps.".format(self.capacity))
+        t = self.timestep
+        self.states[:, t] = states
+        if self.container_actions:
+            for name, column in self.actions.items():
+                column[:, t] = actions[name]
+        else:
+            self.actions[:, t] = actions
+        self.rewards[:, t] = rewards
+        self.terminals[:, t] = terminals
+        self.timestep += 1
+
+    def get_fragment(self, index, next_state):
+        """
+        Returns the running fragment of an environment (all steps since its last fragment) and starts a new one.
+
+        Args:
+            index (int): Environment index.
+            next_state (np.ndarray): The state following the last step of the fragment.
+
+        Returns:
+            tuple: States, actions, rewards, next-states and terminals of the fragment. All but the next-states are
+                views into the buffer.
+        """
+        fragment = slice(self.fragment_starts[index], self.timestep)
+        self.fragment_starts[index] = self.timestep
+
+        states = self.states[index, fragment]
+        if self.container_actions:
+            actions = {name: column[index, fragment] for name, column in self.actions.items()}
+        else:
+            actions = self.actions[index, fragment]
+        next_states = np.concatenate([states[1:], np.reshape(next_state, (1,) + states.shape[1:])])
+        return states, actions, self.rewards[index, fragment], next_states, self.terminals[index, fragment]
+
+    def _allocate(self, num_timesteps):
+        def records(space):
+            return np.zeros(
+                shape=(self.num_environments, num_timesteps) + tuple(space.shape),
+                dtype=convert_dtype(space.dtype, to="np")
+            )
+
+        self.capacity = num_timesteps
+        self.states = records(self.state_space)
+        if self.container_actions:
+            self.actions = {name: records(space) for name, space in self.action_space.items()}
+        else:
+            self.actions = records(self.action_space)
+        self.rewards = np.zeros(shape=(self.num_environments, num_timesteps), dtype=np.float32)
+        self.terminals = np.zeros(shape=(self.num_environments, num_timesteps), dtype=np.bool_)
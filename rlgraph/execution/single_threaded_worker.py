@@ -24,6 +24,7 @@ import numpy as np
 from six.moves import xrange as range_
 
 from rlgraph.components import PreprocessorStack
+from rlgraph.components.helpers import FusedPreprocessor
 from rlgraph.execution.worker import Worker
 from rlgraph.utils.rlgraph_errors import RLGraphError
 from rlgraph.utils.util import default_dict
@@ -31,7 +32,15 @@ from rlgraph.utils.util import default_dict
 
 class SingleThreadedWorker(Worker):
 
-    def __init__(self, preprocessing_spec=None, worker_executes_preprocessing=True, **kwargs):
+    def __init__(self, preprocessing_spec=None, worker_executes_preprocessing=True, fuse_preprocessing=False,
+                 **kwargs):
+        """
+        Args:
+            preprocessing_spec (Optional[list]): Preprocessing spec executed by this worker (python backend).
+            worker_executes_preprocessing (bool): Whether to preprocess states in the worker (instead of the agent).
+            fuse_preprocessing (bool): Whether to run the worker's preprocessing for all environments as one
+                `FusedPreprocessor` with preallocated buffers instead of layer by layer.
+        """
         super(SingleThreadedWorker, self).__init__(**kwargs)
 
         self.logger.info("Initialized single-threaded executor with {} environments '{}' and Agent '{}'".format(
@@ -43,6 +52,7 @@ class SingleThreadedWorker(Worker):
             worker_executes_preprocessing = False
 
         self.worker_executes_preprocessing = worker_executes_preprocessing
+        self.fused_preprocessor = None
         if self.worker_executes_preprocessing:
             self.preprocessors = {}
             self.state_is_preprocessed = {}
@@ -51,6 +61,10 @@ class SingleThreadedWorker(Worker):
                     preprocessing_spec, self.vector_env.state_space.with_batch_rank()
                 )
                 self.state_is_preprocessed[env_id] = False
+            if fuse_preprocessing:
+                self.fused_preprocessor, self.preprocessors = FusedPreprocessor.fuse(
+                    self.preprocessors, self.vector_env.state_space
+                )
 
         self.apply_preprocessing = not self.worker_executes_preprocessing
         self.preprocessed_states_buffer = np.zeros(
@@ -202,14 +216,21 @@ class SingleThreadedWorker(Worker):
                 self.vector_env.render()
 
             if self.worker_executes_preprocessing:
-                for i, env_id in enumerate(self.env_ids):
-                    state = self.agent.state_space.force_batch(env_states[i])
-                    if self.preprocessors[env_id] is not None:
-                        if self.state_is_preprocessed[env_id] is False:
-                            self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
+                # Fused preprocessing handles all environments at once, so they are either all preprocessed or none.
+                if self.fused_preprocessor is not None:
+                    if not all(self.state_is_preprocessed.values()):
+                        self.preprocessed_states_buffer[:] = self.fused_preprocessor.preprocess_batch(env_states)
+                        for env_id in self.env_ids:
                             self.state_is_preprocessed[env_id] = True
-                    else:
-                        self.preprocessed_states_buffer[i] = env_states[i]
+                else:
+                    for i, env_id in enumerate(self.env_ids):
+                        state = self.agent.state_space.force_batch(env_states[i])
+                        if self.preprocessors[env_id] is not None:
+                            if self.state_is_preprocessed[env_id] is False:
+                                self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
+                                self.state_is_preprocessed[env_id] = True
+                        else:
+                            self.preprocessed_states_buffer[i] = env_states[i]
                 # TODO extra returns when worker is not applying preprocessing.
                 actions = self.agent.get_action(
                     states=self.preprocessed_states_buffer, use_exploration=use_exploration,
@@ -288,11 +309,13 @@ class SingleThreadedWorker(Worker):
                     env_states[i] = self.vector_env.reset(i)
                     if self.worker_executes_preprocessing and self.preprocessors[env_id] is not None:
                         self.preprocessors[env_id].reset()
-                        # This re-fills the sequence with the reset state.
-                        state = self.agent.state_space.force_batch(env_states[i])
-                        # Pre - process, add to buffer
-                        self.preprocessed_states_buffer[i] = np.array(self.preprocessors[env_id].preprocess(state))
-                        self.state_is_preprocessed[env_id] = True
+                        # Fused preprocessing handles the reset state together with all other states below.
+                        if self.fused_preprocessor is None:
+                            # This re-fills the sequence with the reset state.
+                            state = self.agent.state_space.force_batch(env_states[i])
+                            # Pre - process, add to buffer
+                            self.preprocessed_states_buffer[i] = self.preprocessors[env_id].preprocess(state)
+                            self.state_is_preprocessed[env_id] = True
 
                     self.episode_returns[i] = 0
                     self.episode_timesteps[i] = 0
@@ -301,6 +324,8 @@ class SingleThreadedWorker(Worker):
                     # Otherwise assign states to next states
                     env_states[i] = next_states[i]
 
+                if self.fused_preprocessor is not None:
+                    continue
                 if self.worker_executes_preprocessing and self.preprocessors[env_id] is not None:
                     #next_state = self.agent.state_space.force_batch(env_states[i])
                     next_states[i] = np.array(self.preprocessors[env_id].preprocess(env_states[i]))  # next_state
@@ -308,6 +333,18 @@ class SingleThreadedWorker(Worker):
                     self.env_ids[i], preprocessed_states[i], env_actions[i], env_rewards[i], next_states[i],
                     episode_terminals[i]
                 )
+
+            if self.fused_preprocessor is not None:
+                # Preprocess the states of all environments once: They are this step's next states and the next
+                # step's states. Copied once as the observed next states are kept.
+                self.preprocessed_states_buffer[:] = self.fused_preprocessor.preprocess_batch(env_states)
+                next_states = np.array(self.preprocessed_states_buffer)
+                for i, env_id in enumerate(self.env_ids):
+                    self.state_is_preprocessed[env_id] = True
+                    self._observe(
+                        self.env_ids[i], preprocessed_states[i], env_actions[i], env_rewards[i], next_states[i],
+                        episode_terminals[i]
+                    )
             self.update_if_necessary()
             timesteps_executed += self.num_environments
             num_timesteps_reached = (0 < num_timesteps <= timesteps_executed)
@@ -32,7 +32,7 @@ from rlgraph.utils.define_by_run_ops import define_by_run_flatten, define_by_run
 from rlgraph.utils.input_parsing import parse_summary_spec
 from rlgraph.utils.op_records import FlattenedDataOp, DataOpRecord, DataOpRecordColumnIntoGraphFn, \
     DataOpRecordColumnIntoAPIMethod, DataOpRecordColumnFromGraphFn, DataOpRecordColumnFromAPIMethod, get_call_param_name
-from rlgraph.utils.ops import is_constant, ContainerDataOp, DataOpDict, flatten_op, TraceContext
+from rlgraph.utils.ops import is_constant, ContainerDataOp, DataOpDict, flatten_op, unflatten_op, TraceContext
 from rlgraph.utils.rlgraph_errors import RLGraphError, RLGraphBuildError
 from rlgraph.utils.specifiable import Specifiable
 from rlgraph.utils.util import force_list, force_tuple, get_shape
@@ -100,6 +100,13 @@ class GraphBuilder(Specifiable):
         # Maps API method names to in- (placeholders) and out op columns (ops to pull).
         self.api = {}
 
+        # API method names mapped to the capacity of an in-graph queue their inputs can be prefetched into
+        # (see `build_input_queue`).
+        self.prefetch_api_methods = {}
+        # API method names mapped to dicts with the enqueue op, the queue's size and close ops and a map from
+        # (flat) input ops to the respective enqueue placeholders.
+        self.input_queues = {}
+
         self.op_records_to_process = set()
         self.op_recs_depending_on_variables = set()
 
@@ -287,6 +294,56 @@ class GraphBuilder(Specifiable):
                 )
                 self.op_records_to_process.add(in_op_records[i])
 
+            if api_method_name in self.prefetch_api_methods and get_backend() == "tf":
+                self.build_input_queue(api_method_name, in_op_records, self.prefetch_api_methods[api_method_name])
+
+    def build_input_queue(self, api_method_name, in_op_records, capacity):
+        """
+        Builds an in-graph FIFO queue for the inputs of an API-method and replaces the method's placeholders by
+        placeholders defaulting to the queue's next element. Calls with params feed the placeholders as before,
+        calls without params read the next prefetched element without any feed.
+
+        Args:
+            api_method_name (str): The name of the API-method.
+            in_op_records (List[DataOpRecord]): The API-method's input op-records holding the placeholders.
+            capacity (int): Maximum number of enqueued elements.
+        """
+        if len(in_op_records) == 0 or any(op_rec.op is None for op_rec in in_op_records):
+            raise RLGraphError(
+                "Cannot prefetch inputs of API-method '{}': Inputs must exist and must not depend on "
+                "variables!".format(api_method_name)
+            )
+        flat_placeholders = [flatten_op(op_rec.op) for op_rec in in_op_records]
+        placeholders = [placeholder for flat in flat_placeholders for placeholder in flat.values()]
+
+        device = self.get_device(next(iter(in_op_records[0].next)).column.component)
+        with tf.device(device), tf.name_scope("api-" + api_method_name + "/input-queue"):
+            queue = tf.FIFOQueue(capacity=capacity, dtypes=[placeholder.dtype for placeholder in placeholders])
+            enqueue_placeholders = [
+                tf.placeholder(dtype=placeholder.dtype, shape=placeholder.shape) for placeholder in placeholders
+            ]
+            dequeued = iter(force_list(queue.dequeue()))
+            self.input_queues[api_method_name] = dict(
+                enqueue_op=queue.enqueue(enqueue_placeholders),
+                size_op=queue.size(),
+                close_op=queue.close(cancel_pending_enqueues=True),
+                enqueue_placeholders={}
+            )
+
+        for op_rec, flat in zip(in_op_records, flat_placeholders):
+            new_flat = FlattenedDataOp()
+            for key, placeholder in flat.items():
+                with tf.device(placeholder.device):
+                    op = tf.placeholder_with_default(
+                        next(dequeued), shape=placeholder.shape, name=placeholder.op.name + "-or-dequeued"
+                    )
+                op._batch_rank = getattr(placeholder, "_batch_rank", None)
+                op._time_rank = getattr(placeholder, "_time_rank", None)
+                new_flat[key] = op
+                self.input_queues[api_method_name]["enqueue_placeholders"][op] = \
+                    enqueue_placeholders[len(self.input_queues[api_method_name]["enqueue_placeholders"])]
+            op_rec.op = unflatten_op(new_flat)
+
     def get_placeholder(self, name, space, component):
         """
         Generates one or more placeholders given a name, space and a component (for device inference).
@@ -884,6 +941,30 @@ class GraphBuilder(Specifiable):
 
         return fetch_dict, feed_dict
 
+    def get_enqueue_inputs(self, api_method_call):
+        """
+        Creates the feed-dict for enqueueing the params of an API-method call into the API-method's input queue.
+
+        Args:
+            api_method_call (tuple): Tuple of API-method name and input params (see `get_execution_inputs`).
+
+        Returns:
+            Tuple[Op,dict]: Enqueue op and feed-dict.
+        """
+        api_method_name = api_method_call[0] if not callable(api_method_call[0]) else api_method_call[0].__name__
+        if api_method_name not in self.input_queues:
+            raise RLGraphError("API-method '{}' has no input queue!".format(api_method_name))
+        input_queue = self.input_queues[api_method_name]
+        _, feed_dict = self.get_execution_inputs((api_method_name, api_method_call[1]))
+        if len(feed_dict) != len(input_queue["enqueue_placeholders"]):
+            raise RLGraphError(
+                "All inputs of API-method '{}' must be given to enqueue them ({} given, {} "
+                "needed).".format(api_method_name, len(feed_dict), len(input_queue["enqueue_placeholders"]))
+            )
+        return input_queue["enqueue_op"], {
+            input_queue["enqueue_placeholders"][op]: value for op, value in feed_dict.items()
+        }
+
     def execute_define_by_run_op(self, api_method, params=None):
         """
         Executes an API method by simply calling the respective function
@@ -58,6 +58,14 @@ class PyTorchExecutor(GraphExecutor):
         # Squeeze result dims, often necessary in tests.
         self.remove_batch_dims = True
 
+        # Pass numpy inputs as torch tensors sharing their memory where possible.
+        self.zero_copy_inputs = self.execution_spec.get("zero_copy_inputs", True)
+        # API method name -> cached input dtype decisions (see `force_torch_tensors`).
+        self.input_dtype_cache = {}
+
+        if self.execution_spec.get("enable_profiler", False):
+            Component.profiler.enable(trace=self.execution_spec.get("enable_timeline", False))
+
     def build(self, root_components, input_spaces, **kwargs):
         start = time.perf_counter()
         self.init_execution()
@@ -91,7 +99,10 @@ class PyTorchExecutor(GraphExecutor):
                 op_or_indices_to_return = api_method[2] if len(api_method) > 2 else None
                 params = util.force_list(api_method[1])
                 api_method = api_method[0]
-                tensor_params = force_torch_tensors(params=params)
+                tensor_params = force_torch_tensors(
+                    params=params, dtype_cache=self.input_dtype_cache.setdefault(api_method, {}),
+                    zero_copy=self.zero_copy_inputs
+                )
 
                 api_ret = self.graph_builder.execute_define_by_run_op(api_method, tensor_params)
                 is_dict_result = isinstance(api_ret, dict)
@@ -152,6 +163,8 @@ class PyTorchExecutor(GraphExecutor):
                 cleaned_dict = {k: v for k, v in result.items() if v is not None}
                 cleaned_dict = self.clean_dict(cleaned_dict)
                 ret.append(cleaned_dict)
+            # Squeezing and `numpy()` return views which may point at persistent state (e.g. memory buffers or
+            # parameters) and would be overwritten by later calls -> Copy.
             elif self.remove_batch_dims and isinstance(result, np.ndarray):
                 ret.append(np.array(np.squeeze(result)))
             elif hasattr(result, "numpy"):
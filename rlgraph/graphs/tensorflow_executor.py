@@ -18,6 +18,8 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import queue
+from threading import Thread
 import time
 
 from rlgraph import get_backend, get_distributed_backend
@@ -114,6 +116,10 @@ class TensorFlowExecutor(GraphExecutor):
             if not self.disable_monitoring:
                 self.tf_session_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
 
+        # In-graph input queues for API-methods (see `prefetch`).
+        self.input_prefetching = self.execution_spec.get("input_prefetching")
+        self.input_prefetcher = None
+
         self.init_device_strategy()
 
         # # Initialize distributed backend.
@@ -184,6 +190,12 @@ class TensorFlowExecutor(GraphExecutor):
         meta_build_times = []
         build_times = []
 
+        if self.input_prefetching is not None:
+            capacity = self.input_prefetching.get("capacity", 2)
+            self.graph_builder.prefetch_api_methods = {
+                api_method_name: capacity for api_method_name in force_list(self.input_prefetching["api_methods"])
+            }
+
         for component in root_components:
             # Sanity-check the component tree (from root all the way down).
             self.sanity_check_component_tree(root_component=component)
@@ -239,6 +251,34 @@ class TensorFlowExecutor(GraphExecutor):
 
         return ret
 
+    def prefetch(self, api_method_call):
+        """
+        Enqueues the input params of an API-method call into the API-method's in-graph input queue. The
+        Python-to-TF copy happens in a background thread. Subsequent calls to the API-method without params read
+        the enqueued params in FIFO order without a feed.
+
+        Args:
+            api_method_call (tuple): Tuple of API-method name and input params (as in `execute`).
+        """
+        if self.input_prefetcher is None:
+            self.input_prefetcher = InputPrefetcher(self.session, self.input_prefetching.get("capacity", 2))
+            self.input_prefetcher.start()
+        self.input_prefetcher.put(*self.graph_builder.get_enqueue_inputs(api_method_call))
+
+    def has_input_queue(self, api_method_name):
+        """
+        Returns:
+            bool: Whether the given API-method can read its inputs from an in-graph input queue.
+        """
+        return api_method_name in self.graph_builder.input_queues
+
+    def get_input_queue_size(self, api_method_name):
+        """
+        Returns:
+            int: Number of enqueued elements waiting to be read by the given API-method.
+        """
+        return self.session.run(self.graph_builder.input_queues[api_method_name]["size_op"])
+
     def update_profiler_if_necessary(self):
         """
         Updates profiler according to specification.
@@ -653,6 +693,11 @@ class TensorFlowExecutor(GraphExecutor):
         Things that need to be cleaned up should be placed into this function, e.g. closing sessions
         and other open connections.
         """
+        # Unblock and stop input prefetching.
+        if self.graph_builder.input_queues:
+            self.session.run([input_queue["close_op"] for input_queue in self.graph_builder.input_queues.values()])
+        if self.input_prefetcher is not None:
+            self.input_prefetcher.stop()
         # Close the tf.Session.
         if self.tf_session_auto_start is True:
             self.monitored_session.close()
@@ -800,3 +845,45 @@ class TensorFlowExecutor(GraphExecutor):
             # Do not allow any GPUs to be used.
             self.gpus_enabled = False
             self.logger.info("gpu_spec is None, disabling GPUs.")
+
+
+class InputPrefetcher(Thread):
+    """
+    Runs enqueue ops of in-graph input queues in the background, so the host-to-graph copy of the inputs overlaps
+    with the computations consuming earlier inputs.
+    """
+    def __init__(self, session, max_pending):
+        """
+        Args:
+            session (tf.Session): The session to run the enqueue ops with.
+            max_pending (int): Maximum number of enqueue calls waiting to be run before `put` blocks.
+        """
+        super(InputPrefetcher, self).__init__()
+        self.daemon = True
+        self.session = session
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.error = None
+
+    def put(self, enqueue_op, feed_dict):
+        if self.error is not None:
+            raise self.error
+        self.pending.put((enqueue_op, feed_dict))
+
+    def stop(self):
+        try:
+            self.pending.put_nowait((None, None))
+        except queue.Full:
+            pass
+
+    def run(self):
+        while True:
+            enqueue_op, feed_dict = self.pending.get()
+            if enqueue_op is None:
+                break
+            try:
+                self.session.run(enqueue_op, feed_dict=feed_dict)
+            except tf.errors.CancelledError:
+                break
+            except Exception as e:
+                self.error = e
+                break
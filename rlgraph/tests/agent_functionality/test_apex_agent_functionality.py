@@ -76,3 +76,42 @@ class TestApexAgentFunctionality(unittest.TestCase):
         }
 
         agent.update(batch)
+
+    def test_update_from_prefetched_batch(self):
+        agent_config = config_from_path("configs/ray_apex_for_pong.json")
+        agent_config["execution_spec"].pop("ray_spec")
+        agent_config["execution_spec"]["input_prefetching"] = dict(
+            api_methods=["update_from_external_batch"], capacity=2
+        )
+        environment = OpenAIGymEnv("Pong-v0", frameskip=4)
+
+        agent = Agent.from_spec(
+            agent_config,
+            state_space=environment.state_space,
+            action_space=environment.action_space
+        )
+        self.assertTrue(agent.input_prefetching)
+
+        batches = [{
+            "states": agent.preprocessed_state_space.sample(50),
+            "actions": environment.action_space.sample(50),
+            "rewards": np.random.random(50).astype(np.float32),
+            "terminals": [False] * 50,
+            "next_states": agent.preprocessed_state_space.sample(50),
+            "importance_weights":  np.ones(50, dtype=np.float32)
+        } for _ in range(2)]
+
+        for batch in batches:
+            agent.prefetch_batch(batch)
+        # Batches are consumed in order and without feeds.
+        for batch in batches:
+            batch_input = agent._get_external_batch_input(batch)[:-1]
+            expected_loss, _ = agent.graph_executor.execute(("get_td_loss", batch_input))
+            loss, loss_per_item = agent.update_from_prefetched_batch()
+            self.assertEqual(len(loss_per_item), 50)
+            recursive_assert_almost_equal(loss, expected_loss, decimals=4)
+        self.assertEqual(agent.graph_executor.get_input_queue_size("update_from_external_batch"), 0)
+
+        # Feeding the API-method still works.
+        agent.update(batches[0])
+        agent.terminate()
@@ -80,6 +80,41 @@ class TestBaseAgentFunctionality(unittest.TestCase):
         recursive_assert_almost_equal(new_actual_weights["value_function_weights"],
                                       value_function_weights)
 
+    def test_buffered_n_step_observe(self):
+        """
+        Tests n-step post-processing of buffered observations for running and terminated episodes.
+        """
+        env = GridWorld(world="2x2")
+        agent_config = config_from_path("configs/dqn_agent_for_functionality_test.json")
+        agent_config["observe_spec"] = dict(buffer_size=6, n_step=2)
+        agent = Agent.from_spec(
+            agent_config,
+            state_space=env.state_space,
+            action_space=env.action_space
+        )
+        observed = []
+        agent._observe_graph = lambda **kwargs: observed.append(kwargs)
+
+        # Full buffer in a running episode: The last record waits for its next reward.
+        for i in range(6):
+            agent.observe(preprocessed_states=i, actions=0, internals=[], rewards=1.0, next_states=i + 1,
+                          terminals=False)
+        self.assertEqual(len(observed), 1)
+        recursive_assert_almost_equal(observed[0]["preprocessed_states"], [0, 1, 2, 3, 4])
+        recursive_assert_almost_equal(observed[0]["rewards"], [1.95] * 5, decimals=5)
+        recursive_assert_almost_equal(observed[0]["next_states"], [2, 3, 4, 5, 6])
+        recursive_assert_almost_equal(observed[0]["terminals"], [False] * 5)
+
+        # Episode end: All buffered records are inserted.
+        for i in range(6, 8):
+            agent.observe(preprocessed_states=i, actions=0, internals=[], rewards=1.0, next_states=i + 1,
+                          terminals=i == 7)
+        self.assertEqual(len(observed), 2)
+        recursive_assert_almost_equal(observed[1]["preprocessed_states"], [5, 6, 7])
+        recursive_assert_almost_equal(observed[1]["rewards"], [1.95, 1.95, 1.0], decimals=5)
+        recursive_assert_almost_equal(observed[1]["next_states"], [7, 8, 8])
+        recursive_assert_almost_equal(observed[1]["terminals"], [False, True, True])
+
     def test_build_overhead(self):
         """
         Tests build timing on agents with nested graph function calls.
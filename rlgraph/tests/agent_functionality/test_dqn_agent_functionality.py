@@ -244,6 +244,40 @@ class TestDQNAgentFunctionality(unittest.TestCase):
         test.check_var("dueling-policy/dueling-action-adapter/action-layer/dense/kernel", mat_updated[1], decimals=2)
         test.check_var("target-policy/dueling-action-adapter/action-layer/dense/kernel", matrix2_qnet, decimals=2)
 
+    def test_dqn_multi_step_update(self):
+        """
+        Runs several updates from memory in one graph call and checks the in-graph target net syncing.
+        """
+        env = GridWorld(world="2x2", save_mode=True)
+        agent = Agent.from_spec(  # type: DQNAgent
+            config_from_path("configs/dqn_agent_for_functionality_test.json"),
+            dueling_q=False,
+            state_space=env.state_space,
+            action_space=env.action_space
+        )
+        states = np.array([one_hot(s, depth=4) for s in [0, 0, 1, 0]])
+        next_states = np.array([one_hot(s, depth=4) for s in [0, 1, 0, 2]])
+        agent._observe_graph(
+            states, np.array([0, 1, 3, 2]), None, np.array([-1.0, -1.0, -1.0, 1.0]), next_states,
+            np.array([False, False, False, True])
+        )
+
+        def get_kernel(scope):
+            var = agent.root_component.variable_registry["{}/neural-network/hidden/dense/kernel".format(scope)]
+            return agent.graph_executor.read_variable_values(var)
+
+        # update_interval=4, sync_interval=8 -> Sync after the 2nd step.
+        losses, losses_per_item = agent.update(num_steps=2)
+        self.assertEqual(losses.shape, (2,))
+        self.assertEqual(losses_per_item.shape, (2, agent.update_spec["batch_size"]))
+        self.assertEqual(agent.steps_since_target_net_sync, 0)
+        np.testing.assert_almost_equal(get_kernel("target-policy"), get_kernel("policy"))
+
+        # Sync after the 2nd step, then one more (unsynced) update.
+        agent.update(num_steps=3)
+        self.assertEqual(agent.steps_since_target_net_sync, 4)
+        self.assertFalse(np.allclose(get_kernel("target-policy"), get_kernel("policy")))
+
     def _calculate_action(self, state, matrix1, matrix2):
         s = np.asarray([state])
         s_flat = one_hot(s, depth=4)
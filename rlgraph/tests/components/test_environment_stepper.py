@@ -90,6 +90,48 @@ class TestEnvironmentStepper(unittest.TestCase):
         # Make sure we close the session (to shut down the Env on the server).
         test.terminate()
 
+    def test_environment_stepper_on_multiple_deterministic_envs(self):
+        preprocessor_spec = None
+        network_spec = config_from_path("configs/test_simple_nn.json")
+        exploration_spec = None
+        actor_component = ActorComponent(
+            preprocessor_spec,
+            dict(network_spec=network_spec, action_space=self.deterministic_env_action_space),
+            exploration_spec
+        )
+        environment_stepper = EnvironmentStepper(
+            environment_spec=dict(type="deterministic_env", steps_to_terminal=5),
+            actor_component_spec=actor_component,
+            state_space=self.deterministic_env_state_space,
+            reward_space="float32",
+            add_reward=True,
+            num_steps=3,
+            num_environments=2
+        )
+
+        test = ComponentTest(
+            component=environment_stepper,
+            action_space=self.deterministic_env_action_space,
+        )
+
+        # Both envs are stepped as one batch: [time, env, ...].
+        expected = (
+            np.array([[False, False], [False, False], [False, False]]),  # t_
+            np.array([[[0.0], [0.0]], [[1.0], [1.0]], [[2.0], [2.0]], [[3.0], [3.0]]]),  # s' (raw)
+            np.array([[-100.0, -100.0], [-99.0, -99.0], [-98.0, -98.0]])  # r
+        )
+        test.test("step", expected_outputs=expected)
+
+        # Step again, check whether stitching of states/etc.. works.
+        expected = (
+            np.array([[False, False], [True, True], [False, False]]),  # t_
+            np.array([[[3.0], [3.0]], [[4.0], [4.0]], [[0.0], [0.0]], [[1.0], [1.0]]]),  # s' (raw)
+            np.array([[-97.0, -97.0], [-96.0, -96.0], [-100.0, -100.0]])  # r
+        )
+        test.test("step", expected_outputs=expected)
+
+        test.terminate()
+
     def test_environment_stepper_on_2x2_grid_world(self):
         preprocessor_spec = [dict(
             type="reshape", flatten=True, flatten_categories=self.grid_world_2x2_action_space.num_categories
@@ -265,3 +265,48 @@ class TestPreprocessLayers(unittest.TestCase):
         # Final output.
         expected_out = (samples[-1] - moving_standardize.mean_est) / std
         self.assertTrue(np.allclose(out, expected_out))
+
+    def test_moving_standardize_python_batched_and_merged(self):
+        space = FloatBox(shape=(3, 2), add_batch_rank=True)
+
+        def build():
+            layer = MovingStandardize(backend="python")
+            layer.create_variables(input_spaces=dict(preprocessing_inputs=space), action_space=None)
+            return layer
+
+        # Batches of different sizes (vector-env steps) equal sample-by-sample updates.
+        batches = [space.sample(size=size) for size in [1, 4, 7, 2]]
+        batched = build()
+        sequential = build()
+        for batch in batches:
+            out = batched._graph_fn_apply(batch)
+            for sample in batch:
+                sequential._graph_fn_apply(sample)
+        samples = np.concatenate(batches)
+        self.assertEqual(len(samples), batched.sample_count)
+        self.assertEqual((1, ) + space.shape, batched.mean_est.shape)
+        self.assertTrue(np.allclose(batched.mean_est, np.mean(samples, axis=0), atol=1e-5))
+        self.assertTrue(np.allclose(batched.mean_est, sequential.mean_est, atol=1e-5))
+        self.assertTrue(np.allclose(batched.std_sum_est, sequential.std_sum_est, atol=1e-4))
+        std = np.sqrt(np.var(samples, ddof=1, axis=0)) + SMALL_NUMBER
+        self.assertTrue(np.allclose(out, (batches[-1] - np.mean(samples, axis=0)) / std, atol=1e-4))
+
+        # Workers export their updates into the learner, which broadcasts the merged statistics.
+        learner = build()
+        workers = [build(), build()]
+        workers[0]._graph_fn_apply(batches[0])
+        workers[1]._graph_fn_apply(batches[1])
+        for worker in workers:
+            learner.merge_statistics(worker.export_statistics())
+        for worker in workers:
+            worker.set_statistics(learner.get_statistics())
+        workers[0]._graph_fn_apply(batches[2])
+        workers[1]._graph_fn_apply(batches[3])
+        for worker in workers:
+            learner.merge_statistics(worker.export_statistics())
+            # Nothing new to export.
+            self.assertEqual(0.0, worker.export_statistics()["count"])
+
+        self.assertEqual(len(samples), learner.sample_count)
+        self.assertTrue(np.allclose(learner.mean_est, batched.mean_est, atol=1e-5))
+        self.assertTrue(np.allclose(learner.std_sum_est, batched.std_sum_est, atol=1e-4))
@@ -24,9 +24,11 @@ import numpy as np
 from six.moves import xrange as range_
 
 from rlgraph.agents import ApexAgent
+from rlgraph.components.helpers import FusedPreprocessor
 from rlgraph.components.layers import GrayScale, Multiply
 from rlgraph.components.neural_networks import PreprocessorStack
 from rlgraph.environments import SequentialVectorEnv
+from rlgraph.execution.single_threaded_worker import SingleThreadedWorker
 from rlgraph.spaces import *
 from rlgraph.tests import ComponentTest, recursive_assert_almost_equal
 from rlgraph.tests.test_util import config_from_path
@@ -312,3 +314,72 @@ class TestPreprocessorStacks(unittest.TestCase):
         )
         test.test("reset")
         test.test(("preprocess", input_), expected_outputs=expected)
+
+    def test_fused_python_preprocessor(self):
+        """
+        Tests the fused python preprocessing pipeline against layer-by-layer python stacks.
+        """
+        in_space = IntBox(256, shape=(210, 160, 3), dtype="uint8", add_batch_rank=True)
+        preprocessing_spec = [
+            dict(type="image_crop", x=0, y=25, width=160, height=160, scope="image_crop"),
+            dict(type="grayscale", keep_rank=True, scope="grayscale"),
+            dict(type="image_resize", width=84, height=84, scope="image_resize"),
+            dict(type="convert_type", to_dtype="float", scope="convert_type"),
+            dict(type="divide", divisor=255.0, scope="divide"),
+            # No fused implementation -> layer-by-layer fallback.
+            dict(type="clip", min=0.1, max=0.9, scope="clip"),
+            dict(type="sequence", sequence_length=4, batch_size=1, add_rank=False, scope="sequence")
+        ]
+        num_environments = 3
+        stacks = [SingleThreadedWorker.setup_preprocessor(preprocessing_spec, in_space)
+                  for _ in range_(num_environments)]
+        fused = FusedPreprocessor(
+            [SingleThreadedWorker.setup_preprocessor(preprocessing_spec, in_space) for _ in range_(num_environments)],
+            in_space
+        )
+        self.assertEqual(fused.output_buffer.shape, (num_environments, 84, 84, 4))
+
+        for step in range_(6):
+            states = in_space.sample(size=num_environments)
+            # Reset one environment mid-sequence.
+            if step == 3:
+                stacks[1].reset()
+                fused.reset(1)
+            for i in range_(num_environments):
+                expected = stacks[i].preprocess(states[i:i + 1])
+                recursive_assert_almost_equal(fused.preprocess(states[i:i + 1], i), expected, decimals=5)
+        # All environments at once.
+        states = in_space.sample(size=num_environments)
+        expected = [stacks[i].preprocess(states[i:i + 1])[0] for i in range_(num_environments)]
+        recursive_assert_almost_equal(fused.preprocess_batch(states), np.stack(expected), decimals=5)
+
+    def test_fuse_python_preprocessors(self):
+        """
+        Tests that fused per-environment preprocessors share the fused output buffer.
+        """
+        in_space = IntBox(256, shape=(210, 160, 3), dtype="uint8", add_batch_rank=True)
+        preprocessing_spec = [
+            dict(type="grayscale", keep_rank=True, scope="grayscale"),
+            dict(type="image_resize", width=84, height=84, scope="image_resize"),
+            dict(type="sequence", sequence_length=4, batch_size=1, add_rank=False, scope="sequence")
+        ]
+        env_ids = ["env_0", "env_1"]
+        preprocessors = {env_id: SingleThreadedWorker.setup_preprocessor(preprocessing_spec, in_space)
+                         for env_id in env_ids}
+        fused, env_preprocessors = FusedPreprocessor.fuse(preprocessors, in_space)
+        self.assertIsInstance(fused, FusedPreprocessor)
+        self.assertEqual(list(env_preprocessors.keys()), env_ids)
+
+        states = in_space.sample(size=len(env_ids))
+        batch = np.array(fused.preprocess_batch(states))
+        # Per-environment results are rows of the output buffer.
+        fused.reset(1)
+        result = env_preprocessors["env_1"].preprocess(states[1:2])
+        self.assertTrue(np.shares_memory(result, fused.output_buffer))
+        recursive_assert_almost_equal(result[0], batch[1])
+
+        # Nothing to fuse.
+        preprocessors = dict(env_0=None)
+        fused, env_preprocessors = FusedPreprocessor.fuse(preprocessors, in_space)
+        self.assertIsNone(fused)
+        self.assertIs(env_preprocessors, preprocessors)
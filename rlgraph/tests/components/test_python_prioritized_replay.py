@@ -22,8 +22,10 @@ import numpy as np
 from six.moves import xrange as range_
 from rlgraph.components.memories.mem_prioritized_replay import MemPrioritizedReplay
 from rlgraph.execution.ray.apex.apex_memory import ApexMemory
-from rlgraph.execution.ray.ray_util import ray_compress
+from rlgraph.execution.ray.ray_util import ray_compress, ray_decompress, ray_decompress_batch, \
+    ray_decompressed_spec
 from rlgraph.spaces import Dict, IntBox, BoolBox, FloatBox
+from rlgraph.tests import ComponentTest
 
 
 # TODO (Michael): Clean up memory semantics and tests re:
@@ -125,6 +127,8 @@ class TestPythonPrioritizedReplay(unittest.TestCase):
 
         # Does not return anything.
         memory.update_records(indices, np.asarray([0.1, 0.2]))
+        # Empty updates are ignored.
+        memory.update_records(np.asarray([], dtype=np.int64), np.asarray([]))
 
         # Test apex memory.
         memory = ApexMemory(
@@ -150,6 +154,7 @@ class TestPythonPrioritizedReplay(unittest.TestCase):
 
         # Does not return anything
         memory.update_records(indices, np.random.uniform(size=10))
+        memory.update_records(np.asarray([], dtype=np.int64), np.asarray([]))
 
     def test_segment_tree_insert_values(self):
         """
@@ -255,3 +260,181 @@ class TestPythonPrioritizedReplay(unittest.TestCase):
         self.assertEqual(tree.index_of_prefixsum(1.51), 2)
         self.assertEqual(tree.index_of_prefixsum(3.0), 3)
         self.assertEqual(tree.index_of_prefixsum(5.50), 3)
+
+    def test_batched_tree_ops(self):
+        """
+        Tests batched inserts and prefix sum lookups against their single-element versions.
+        """
+        memory = ApexMemory(
+            capacity=16
+        )
+        reference = ApexMemory(
+            capacity=16
+        )
+        tree = memory.merged_segment_tree
+        reference_tree = reference.merged_segment_tree
+
+        for _ in range_(20):
+            indices = np.random.randint(0, 16, size=5)
+            priorities = np.random.uniform(size=5)
+            tree.insert_many(indices, priorities)
+            for index, priority in zip(indices, priorities):
+                reference_tree.insert(index, priority)
+            self.assertTrue(np.allclose(tree.sum_segment_tree.values, reference_tree.sum_segment_tree.values))
+            self.assertTrue(np.allclose(tree.min_segment_tree.values, reference_tree.min_segment_tree.values))
+
+            prefix_sums = np.random.random(size=10) * reference_tree.sum_segment_tree.get_sum()
+            expected = [reference_tree.sum_segment_tree.index_of_prefixsum(s) for s in prefix_sums]
+            self.assertEqual(list(tree.sum_segment_tree.index_of_prefixsum(prefix_sums)), expected)
+
+    def test_columnar_storage(self):
+        """
+        Tests inserting and sampling with preallocated column storage.
+        """
+        memory = MemPrioritizedReplay(
+            capacity=self.capacity,
+            next_states=True,
+            alpha=self.alpha,
+            beta=self.beta,
+            columnar=True
+        )
+        test = ComponentTest(component=memory, input_spaces=self.input_spaces)
+
+        observation = self.record_space.sample(size=6)
+        test.test(("insert_records", observation), expected_outputs=None)
+        test.test(("insert_records", observation), expected_outputs=None)
+        self.assertEqual(memory.size, self.capacity)
+        self.assertEqual(memory.index, 2)
+
+        records, indices, weights = test.test(("get_records", 4), expected_outputs=None)
+        self.assertEqual(records["states"]["state1"].shape, (4,))
+        self.assertEqual(records["terminals"].shape, (4,))
+        self.assertEqual(len(indices), 4)
+
+        # Apex memory with compressed states.
+        memory = ApexMemory(
+            action_space=self.apex_space["actions"],
+            capacity=self.capacity,
+            alpha=self.alpha,
+            beta=self.beta,
+            columnar=True
+        )
+        observation = self.apex_space.sample(size=5)
+        for i in range_(5):
+            memory.insert_records((
+                ray_compress(observation["states"][i]),
+                observation["actions"][i],
+                observation["reward"][i],
+                observation["terminals"][i],
+                ray_compress(observation["states"][i]),
+                observation["weights"][i]
+            ))
+        self.assertEqual(memory.size, 5)
+
+        records = memory.read_records(np.arange(5))
+        self.assertTrue(np.allclose(records["states"], observation["states"]))
+        self.assertTrue(np.allclose(records["actions"], observation["actions"]))
+        self.assertTrue(np.allclose(records["next_states"], observation["states"]))
+
+    def test_frame_deduplicated_storage(self):
+        """
+        Tests that frame-stacked states and n-step next-states are reconstructed exactly from
+        deduplicated frames, including across episode boundaries and after wrapping around.
+        """
+        frame_stack = 4
+        n_step = 2
+        memory = ApexMemory(
+            action_space=IntBox(2),
+            capacity=self.capacity,
+            alpha=self.alpha,
+            beta=self.beta,
+            frame_stack=frame_stack,
+            n_step_adjustment=n_step
+        )
+        expected_states = np.zeros(shape=(self.capacity, 3, 3, frame_stack), dtype=np.uint8)
+        expected_next_states = np.zeros_like(expected_states)
+        for _ in range_(3):
+            episode_length = 6
+            frames = [np.random.randint(0, 255, size=(3, 3, 1), dtype=np.uint8) for _ in range_(episode_length + 1)]
+            # Stacked like the `Sequence` preprocessor: Repeat the first frame after a reset.
+            states = [np.concatenate([frames[max(0, t - j)] for j in reversed(range_(frame_stack))], axis=-1)
+                      for t in range_(episode_length + 1)]
+            for t in range_(episode_length):
+                next_state = states[min(t + n_step, episode_length)]
+                expected_states[memory.index] = states[t]
+                expected_next_states[memory.index] = next_state
+                memory.insert_records((states[t], 1, 1.0, t == episode_length - 1, next_state, None))
+
+        # Most states are stored as a single frame.
+        self.assertLess(np.sum(memory.frame_storage.has_history), self.capacity)
+        records = memory.read_records(np.arange(self.capacity))
+        self.assertTrue(np.array_equal(records["states"], expected_states))
+        self.assertTrue(np.array_equal(records["next_states"], expected_next_states))
+
+    def test_insert_batch(self):
+        """
+        Tests that batch insertion (with wrap-around) matches inserting the same records one by one.
+        """
+        for columnar in [False, True]:
+            batch_memory = ApexMemory(
+                action_space=self.apex_space["actions"], capacity=self.capacity, alpha=0.5, columnar=columnar
+            )
+            record_memory = ApexMemory(
+                action_space=self.apex_space["actions"], capacity=self.capacity, alpha=0.5, columnar=columnar
+            )
+            # Last batch is larger than capacity.
+            for batch_size in [4, 7, 3, 13]:
+                observation = self.apex_space.sample(size=batch_size)
+                batch_memory.insert_batch(dict(
+                    states=[ray_compress(state) for state in observation["states"]],
+                    actions=observation["actions"],
+                    rewards=observation["reward"],
+                    terminals=observation["terminals"],
+                    next_states=[ray_compress(state) for state in observation["states"]],
+                    importance_weights=observation["weights"]
+                ))
+                for i in range_(batch_size):
+                    record_memory.insert_records((
+                        ray_compress(observation["states"][i]),
+                        observation["actions"][i],
+                        observation["reward"][i],
+                        observation["terminals"][i],
+                        ray_compress(observation["states"][i]),
+                        observation["weights"][i]
+                    ))
+                self.assertEqual(batch_memory.index, record_memory.index)
+                self.assertEqual(batch_memory.size, record_memory.size)
+                self.assertTrue(np.allclose(
+                    batch_memory.merged_segment_tree.sum_segment_tree.values,
+                    record_memory.merged_segment_tree.sum_segment_tree.values
+                ))
+
+            indices = np.arange(self.capacity)
+            batch_records = batch_memory.read_records(indices)
+            records = record_memory.read_records(indices)
+            for key in ["states", "actions", "rewards", "terminals", "next_states"]:
+                self.assertTrue(np.allclose(batch_records[key], records[key]))
+
+    def test_state_compression(self):
+        """
+        Tests binary compression of single states and batched decompression.
+        """
+        states = np.random.randint(0, 255, size=(5, 8, 8, 4)).astype(np.uint8)
+        compressed = [ray_compress(state) for state in states]
+        self.assertTrue(all(isinstance(state, bytes) for state in compressed))
+        self.assertTrue(np.array_equal(ray_decompress(compressed[0]), states[0]))
+
+        out = np.zeros_like(states)
+        decompressed = ray_decompress_batch(compressed, out=out)
+        self.assertIs(decompressed, out)
+        self.assertTrue(np.array_equal(decompressed, states))
+
+        # Output allocated from the first header.
+        self.assertEqual(ray_decompressed_spec(compressed[0]), (np.dtype(np.uint8), (8, 8, 4)))
+        self.assertTrue(np.array_equal(ray_decompress_batch(compressed), states))
+        # Outputs of a different dtype are cast.
+        out = np.zeros(shape=states.shape, dtype=np.float32)
+        self.assertTrue(np.array_equal(ray_decompress_batch(compressed, out=out), states.astype(np.float32)))
+
+        # Whole batch as one block.
+        self.assertTrue(np.array_equal(ray_decompress(ray_compress(states)), states))
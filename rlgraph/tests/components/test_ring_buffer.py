@@ -249,3 +249,40 @@ class TestRingBufferMemory(unittest.TestCase):
         retrieved_action = batch['actions']['action1']
         for action_value in observation['actions']['action1']:
             self.assertTrue(action_value in retrieved_action)
+
+    def test_wrap_around_insert(self):
+        """
+        Tests if a batch insert wrapping around the end of the buffer keeps the insertion order.
+        """
+        ring_buffer = RingBuffer(capacity=self.capacity)
+        test = ComponentTest(component=ring_buffer, input_spaces=self.input_spaces)
+
+        first = non_terminal_records(self.record_space, 7)
+        test.test(("insert_records", first), expected_outputs=None)
+        second = terminal_records(self.record_space, 6)
+        test.test(("insert_records", second), expected_outputs=None)
+
+        ring_buffer_variables = test.get_variable_values(ring_buffer, self.ring_buffer_variables)
+        self.assertEqual(ring_buffer_variables["index"], 3)
+        self.assertEqual(ring_buffer_variables["num-episodes"], 6)
+
+        batch = test.test(("get_records", self.capacity), expected_outputs=None)
+        expected_actions = np.concatenate([first["actions"]["action1"][3:], second["actions"]["action1"]])
+        recursive_assert_almost_equal(batch["actions"]["action1"], expected_actions, decimals=5)
+        recursive_assert_almost_equal(batch["terminals"], [False] * 4 + [True] * 6)
+
+    def test_returned_records_not_overwritten_by_inserts(self):
+        """
+        Tests if records returned by a range read that does not wrap around are copies, not views into the
+        memory that later inserts would overwrite.
+        """
+        ring_buffer = RingBuffer(capacity=self.capacity)
+        test = ComponentTest(component=ring_buffer, input_spaces=self.input_spaces)
+
+        observation = non_terminal_records(self.record_space, self.capacity)
+        test.test(("insert_records", observation), expected_outputs=None)
+        batch = test.test(("get_records", 4), expected_outputs=None)
+        expected_actions = np.array(observation["actions"]["action1"][-4:])
+
+        test.test(("insert_records", non_terminal_records(self.record_space, self.capacity)), expected_outputs=None)
+        recursive_assert_almost_equal(batch["actions"]["action1"], expected_actions, decimals=5)
@@ -23,6 +23,7 @@ import unittest
 from rlgraph.components.helpers.sequence_helper import SequenceHelper
 from rlgraph.spaces import IntBox, FloatBox, BoolBox
 from rlgraph.tests import ComponentTest, recursive_assert_almost_equal
+from rlgraph.utils.numpy import segmented_reverse_decayed_sum
 
 
 class TestSequenceHelper(unittest.TestCase):
@@ -158,3 +159,34 @@ class TestSequenceHelper(unittest.TestCase):
 
         recursive_assert_almost_equal(x=lengths, y=[1, 1, 1, 1])
         recursive_assert_almost_equal(x=decays, y=expected_decays)
+
+    def test_reverse_apply_decays_to_sequence(self):
+        """
+        Tests the graph scan against the vectorized segmented kernel and a plain loop.
+        """
+        sequence_helper = SequenceHelper()
+        decay_value = 0.9
+        test = ComponentTest(component=sequence_helper, input_spaces=self.input_spaces)
+
+        for sequence_indices in [[0, 0, 0, 0, 0, 1], [0, 1, 0, 0, 1, 1], [1, 0, 0, 1, 0, 0]]:
+            values = np.random.random(size=(6,)).astype(np.float32)
+            sequence_indices = np.asarray(sequence_indices, dtype=np.bool_)
+
+            # Reverse scan reading sequence indices in forward order.
+            expected = []
+            length = 0
+            prev_v = 0.0
+            for i, v in enumerate(reversed(values)):
+                prev_v += v * pow(decay_value, length)
+                expected.append(prev_v)
+                if sequence_indices[i]:
+                    length = 0
+                    prev_v = 0.0
+                length += 1
+            expected = np.asarray(list(reversed(expected)))
+
+            recursive_assert_almost_equal(
+                segmented_reverse_decayed_sum(values, sequence_indices, decay_value), expected, decimals=5
+            )
+            decayed = test.test(("reverse_apply_decays_to_sequence", [values, sequence_indices, decay_value]))
+            recursive_assert_almost_equal(decayed, expected, decimals=5)
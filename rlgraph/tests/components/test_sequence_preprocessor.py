@@ -17,6 +17,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from collections import deque
+
 import numpy as np
 from six.moves import xrange as range_
 import unittest
@@ -180,3 +182,26 @@ class TestSequencePreprocessor(unittest.TestCase):
                                                                                    1.1, 1.1, 2.2, 2.3]])))
 
         test.terminate()
+
+    def test_python_sequence_preprocessor_batch_item_reset(self):
+        seq_len = 3
+        space = FloatBox(shape=(2,), add_batch_rank=True)
+        sequencer = Sequence(sequence_length=seq_len, add_rank=False, copy_output=False, backend="python")
+        sequencer.create_variables(input_spaces=dict(preprocessing_inputs=space))
+        sequencer._graph_fn_reset()
+
+        # Compare against separately tracked sequences per batch item (e.g. per environment).
+        expected = [deque(maxlen=seq_len) for _ in range_(2)]
+        for step in range_(8):
+            input_ = np.random.random(size=(2, 2))
+            if step == 4:
+                sequencer.reset_batch_indices(1)
+                expected[1].clear()
+            for i in range_(2):
+                if len(expected[i]) == 0:
+                    expected[i].extend([input_[i]] * seq_len)
+                else:
+                    expected[i].append(input_[i])
+            out = sequencer._graph_fn_apply(input_)
+            self.assertEqual(out.shape, (2, 2 * seq_len))
+            recursive_assert_almost_equal(out, np.stack([np.concatenate(e) for e in expected]))
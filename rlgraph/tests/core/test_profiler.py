@@ -0,0 +1,68 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from rlgraph.utils import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    """
+    Tests aggregation, nesting and trace export of the define-by-run profiler.
+    """
+    def test_nested_calls(self):
+        profiler = Profiler(num_samples=4, max_trace_events=3)
+        profiler.enable(trace=True)
+
+        for _ in range(5):
+            outer = profiler.start("policy", "get_action")
+            inner = profiler.start("network", "call")
+            time.sleep(0.002)
+            profiler.stop(inner)
+            profiler.stop(outer)
+
+        stats = dict(profiler.get_stats())
+        self.assertEqual(stats["policy.get_action"]["count"], 5)
+        self.assertEqual(stats["network.call"]["count"], 5)
+        # Outer total time includes the inner call, its self time does not.
+        self.assertGreaterEqual(stats["policy.get_action"]["total_time"], stats["network.call"]["total_time"])
+        self.assertLess(stats["policy.get_action"]["self_time"], stats["network.call"]["total_time"])
+        self.assertGreater(stats["network.call"]["p50"], 0.001)
+
+        # Only the most recent events are kept. Inner calls complete first.
+        chain = profiler.get_call_chain()
+        self.assertEqual([(c, m) for c, m, _ in chain], [
+            ("policy", "get_action"), ("network", "call"), ("policy", "get_action")
+        ])
+
+        path = os.path.join(tempfile.mkdtemp(), "trace.json")
+        profiler.export_chrome_trace(path)
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[1]["name"], "network.call")
+        self.assertEqual(events[1]["ph"], "X")
+
+        profiler.reset()
+        self.assertEqual(len(profiler.get_stats()), 0)
+        self.assertEqual(len(profiler.get_call_chain()), 0)
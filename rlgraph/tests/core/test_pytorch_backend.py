@@ -243,9 +243,11 @@ class TestPytorchBackend(unittest.TestCase):
             # Try with "reduced" action space (actually only 3 actions, up, down, no-op)
             action_space=env.action_space
         )
+        Component.profiler.reset()
+        Component.profiler.enable(trace=True)
         state = env.reset()
         action = agent.get_action(state)
-        print("Component call count = {}".format(Component.call_count))
+        print("Component call count = {}".format(sum(s["count"] for _, s in Component.profiler.get_stats())))
 
         state_space = env.state_space
         count = 200
@@ -264,8 +266,9 @@ class TestPytorchBackend(unittest.TestCase):
         action = agent.get_action(samples)
         end = time.perf_counter() - start
         print("Took {} s for {} batched actions.".format(end, count))
-        profile = Component.call_times
+        profile = Component.profiler.get_call_chain()
         print_call_chain(profile, False, 0.03)
+        Component.profiler.disable()
 
     def test_post_processing(self):
         env = OpenAIGymEnv("Pong-v0", frameskip=4, max_num_noops=30, episodic_life=True)
@@ -294,6 +297,8 @@ class TestPytorchBackend(unittest.TestCase):
         states = np.asarray(states)
         weights = np.ones_like(rewards)
 
+        Component.profiler.reset()
+        Component.profiler.enable(trace=True)
         for _ in range(1):
             start = time.perf_counter()
             _, loss_per_item = agent.post_process(
@@ -307,5 +312,6 @@ class TestPytorchBackend(unittest.TestCase):
                 )
             )
             print("post process time = {}".format(time.perf_counter() - start))
-        profile = Component.call_times
+        profile = Component.profiler.get_call_chain()
         print_call_chain(profile, False, 0.003)
+        Component.profiler.disable()
@@ -20,9 +20,12 @@ from __future__ import print_function
 import logging
 import unittest
 
+import numpy as np
+
 from rlgraph import get_backend
 from rlgraph.tests import recursive_assert_almost_equal
 from rlgraph.utils import root_logger, pytorch_one_hot
+from rlgraph.utils.util import force_torch_tensors
 
 if get_backend() == "pytorch":
     import torch
@@ -53,3 +56,31 @@ class TestPyTorchUtil(unittest.TestCase):
             expected = torch.tensor([[[1, 0, 0, 0],[0, 0, 0, 1],[0, 0, 1, 0]],[[0, 1, 0, 0],[0, 0, 1, 0],[1, 0, 0, 0,]]],
                                     dtype=torch.int32)
             recursive_assert_almost_equal(one_hot, expected)
+
+    def test_zero_copy_input_conversion(self):
+        """
+        Tests that numpy inputs are converted into tensors sharing their memory where possible.
+        """
+        if get_backend() == "pytorch":
+            states = np.random.random(size=(4, 3)).astype(np.float32)
+            terminals = np.array([True, False, False, True])
+            read_only = np.arange(4, dtype=np.int64)
+            read_only.flags.writeable = False
+            dtype_cache = {}
+
+            for _ in range(2):
+                tensors = force_torch_tensors(
+                    params=[states, dict(terminals=terminals), read_only], dtype_cache=dtype_cache
+                )
+                # Float and bool inputs are views.
+                self.assertEqual(tensors[0].data_ptr(), states.ctypes.data)
+                self.assertEqual(tensors[1]["terminals"].dtype, torch.uint8)
+                self.assertEqual(tensors[1]["terminals"].data_ptr(), terminals.ctypes.data)
+                # Read-only arrays are copied.
+                self.assertNotEqual(tensors[2].data_ptr(), read_only.ctypes.data)
+                recursive_assert_almost_equal(tensors[2].numpy(), read_only)
+            self.assertEqual(len(dtype_cache), 3)
+
+            # Non-contiguous inputs are copied.
+            tensors = force_torch_tensors(params=[states.T], dtype_cache=dtype_cache)
+            recursive_assert_almost_equal(tensors[0].numpy(), states.T)
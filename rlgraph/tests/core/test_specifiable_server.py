@@ -23,6 +23,7 @@ import unittest
 
 from rlgraph.environments.environment import Environment
 from rlgraph.utils.specifiable_server import SpecifiableServer, SpecifiableServerHook
+from rlgraph.utils.rlgraph_errors import RLGraphError
 from rlgraph.utils.util import convert_dtype
 from rlgraph.spaces import IntBox, FloatBox
 
@@ -73,3 +74,32 @@ class TestSpecifiableServer(unittest.TestCase):
         self.assertTrue(out1[2] is np.bool_(False))
         self.assertTrue(out2[2] is np.bool_(False))
 
+
+    def test_specifiable_server_with_shared_memory(self):
+        action_space = IntBox(2)
+        state_space = FloatBox(shape=(3, 2))
+        env_spec = dict(type="random_env", state_space=state_space, action_space=action_space, deterministic=True)
+        specifiable_server = SpecifiableServer(Environment, env_spec, dict(
+            step_flow=[state_space, float, bool]
+        ), "terminate", shared_memory=True)
+
+        ret1 = specifiable_server.step_flow(action_space.sample())
+        ret2 = specifiable_server.step_flow(action_space.sample())
+        self.assertEqual(ret1[0].shape, (3, 2))
+        self.assertEqual(ret1[0].dtype, convert_dtype("float32"))
+
+        with tf.train.SingularMonitoredSession(hooks=[SpecifiableServerHook()]) as sess:
+            out1 = sess.run(ret1)
+            out2 = sess.run(ret2)
+
+        # Results were written to shared buffers and copied out, so the first result is not overwritten.
+        self.assertIn("step_flow", specifiable_server.shared_arrays)
+        self.assertEqual(out1[0].shape, (3, 2))
+        self.assertFalse(np.array_equal(out1[0], out2[0]))
+        self.assertTrue(out1[2] is np.bool_(False))
+        self.assertTrue(out2[2] is np.bool_(False))
+
+    def test_shared_memory_requires_output_spaces_dict(self):
+        env_spec = dict(type="random_env", state_space=FloatBox(), action_space=IntBox(2), deterministic=True)
+        with self.assertRaises(RLGraphError):
+            SpecifiableServer(Environment, env_spec, lambda method_name: FloatBox(), shared_memory=True)
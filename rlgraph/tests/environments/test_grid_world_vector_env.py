@@ -0,0 +1,70 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from rlgraph.environments import GridWorld, GridWorldVectorEnv, Environment
+
+
+class TestGridWorldVectorEnv(unittest.TestCase):
+    """
+    Tests the natively vectorized GridWorld against individual GridWorld instances.
+    """
+    def _compare_with_grid_worlds(self, num_steps=50, **kwargs):
+        num_envs = 8
+        vector_env = GridWorldVectorEnv(num_environments=num_envs, **kwargs)
+        envs = [GridWorld(**kwargs) for _ in range(num_envs)]
+
+        states = vector_env.reset_all()
+        for i, env in enumerate(envs):
+            self.assertTrue(np.array_equal(states[i], env.reset()))
+
+        num_actions = 4 if kwargs.get("action_type", "udlr") == "udlr" else 18
+        for _ in range(num_steps):
+            actions = np.random.randint(num_actions, size=num_envs)
+            s, r, t, _ = vector_env.step(actions)
+            for i, env in enumerate(envs):
+                s_, r_, t_, _ = env.step(actions[i])
+                self.assertTrue(np.array_equal(s[i], s_))
+                self.assertEqual(r[i], r_)
+                self.assertEqual(t[i], t_)
+                if t_:
+                    env.reset()
+                    vector_env.reset(index=i)
+
+    def test_udlr_discrete(self):
+        self._compare_with_grid_worlds(world="4x4")
+
+    def test_ftj_xy_orientation(self):
+        self._compare_with_grid_worlds(world="16x16", action_type="ftj", state_representation="xy+orientation")
+
+    def test_camera(self):
+        self._compare_with_grid_worlds(world="8x8", state_representation="camera", reward_function="rich")
+
+    def test_step_flow(self):
+        env = Environment.from_spec(dict(type="gridworldvector", num_environments=3, world="2x2"))
+        s = env.reset_flow()  # ["XH", " G"]
+        self.assertTrue(np.all(s == 0))
+        # right: hole -> reset, down: [" H", "XG"]
+        s, r, t = env.step_flow([1, 2, 1])
+        self.assertTrue(np.array_equal(s, [0, 1, 0]))
+        self.assertTrue(np.array_equal(r, [-5.0, -1.0, -5.0]))
+        self.assertTrue(np.array_equal(t, [True, False, True]))
@@ -0,0 +1,78 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from rlgraph.environments import SubprocessVectorEnv
+
+
+class TestSubprocessVectorEnv(unittest.TestCase):
+    """
+    Tests resetting and stepping through a process-parallel vectorized Env with GridWorld entities.
+    """
+    def test_subprocess_vector_env(self):
+        num_envs = 4
+        env = SubprocessVectorEnv(
+            num_environments=num_envs, env_spec={"type": "gridworld", "world": "2x2"}, num_processes=2
+        )
+        try:
+            s = env.reset(index=0)  # ["XH", " G"]  X=player's position
+            self.assertTrue(s == 0)
+
+            s = env.reset_all()
+            self.assertEqual(s.shape, (num_envs,))
+            self.assertTrue(np.all(s == 0))
+
+            s, r, t, _ = env.step([2 for _ in range(num_envs)])  # down: [" H", "XG"]
+            self.assertTrue(np.all(s == 1))
+            self.assertTrue(np.all(r == -1.0))
+            self.assertTrue(not np.any(t))
+
+            # Async stepping with different actions per env.
+            env.step_async([1, 0, 1, 0])  # right: [" H", " X"], up: ["XH", " G"]
+            s, r, t, _ = env.step_wait()
+            self.assertTrue(np.array_equal(s, [3, 0, 3, 0]))
+            self.assertTrue(np.array_equal(r, [1.0, -1.0, 1.0, -1.0]))
+            self.assertTrue(np.array_equal(t, [True, False, True, False]))
+
+            # Individual resets only touch the given env.
+            env.reset(index=0)
+            s, r, t, _ = env.step([3, 3, 3, 3])  # left: Wall or already terminal.
+            self.assertEqual(s[0], 0)
+            self.assertEqual(s[1], 0)
+        finally:
+            env.terminate_all()
+
+    def test_auto_reset(self):
+        num_envs = 3
+        env = SubprocessVectorEnv(
+            num_environments=num_envs, env_spec={"type": "gridworld", "world": "2x2"}, auto_reset=True
+        )
+        try:
+            env.reset_all()
+            s, r, t, infos = env.step([1 for _ in range(num_envs)])  # right: [" X", " G"] -> in the hole
+            self.assertTrue(np.all(t))
+            self.assertTrue(np.all(r == -5.0))
+            # States are the first states of the new episodes, terminal states are passed in infos.
+            self.assertTrue(np.all(s == 0))
+            self.assertTrue(all(info["terminal_state"] == 2 for info in infos))
+        finally:
+            env.terminate_all()
@@ -100,6 +100,34 @@ class TestApexExecutor(unittest.TestCase):
         )
         print(result)
 
+    def test_learner_prefetch_metrics(self):
+        """
+        Tests that batches reach the learner via the prefetch threads and learner feed metrics are reported.
+        """
+        env_spec = dict(
+            type="grid-world",
+            world="2x2",
+            save_mode=False
+        )
+        agent_config = config_from_path("configs/apex_agent_for_2x2_gridworld.json")
+        agent_config["execution_spec"]["ray_spec"]["executor_spec"]["num_prefetch_threads"] = 2
+        executor = ApexExecutor(
+            environment_spec=env_spec,
+            agent_config=agent_config,
+        )
+        result = executor.execute_workload(workload=dict(
+            num_timesteps=2000, report_interval=100, report_interval_min_seconds=1)
+        )
+        print(result)
+
+        self.assertEqual(len(executor.batch_prefetchers), 2)
+        for key in ["learner_updates", "learner_starved_updates", "learner_idle_time", "learner_update_time",
+                    "learner_idle_ratio", "prefetch_download_time"]:
+            self.assertIn(key, result)
+        self.assertGreater(result["learner_updates"], 0)
+        self.assertLessEqual(result["learner_starved_updates"], result["learner_updates"] + 1)
+        self.assertTrue(0.0 <= result["learner_idle_ratio"] <= 1.0)
+
     def test_learning_cartpole(self):
         """
         Tests if apex can learn a simple environment using a single worker, thus replicating
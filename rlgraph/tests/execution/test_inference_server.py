@@ -0,0 +1,101 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import unittest
+from threading import Thread
+
+import numpy as np
+from six.moves import queue
+
+from rlgraph.execution.inference_server import InferenceServer
+
+
+class SumAgent(object):
+    """
+    Deterministic stand-in agent returning the sum over each state as its action.
+    """
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_action(self, states, use_exploration=True, apply_preprocessing=True, extra_returns=None):
+        self.batch_sizes.append(len(states))
+        return np.sum(states, axis=1)
+
+
+def request_in_process(client, states, out_queue):
+    out_queue.put(client.get_action(states))
+
+
+class TestInferenceServer(unittest.TestCase):
+    """
+    Tests batching of action requests from several threads and processes.
+    """
+    def test_batched_requests(self):
+        # Multiprocessing queues and in-process queues for thread clients.
+        for local_clients in [False, True]:
+            agent = SumAgent()
+            server = InferenceServer(agent, min_batch_size=4, max_batch_size=8, timeout_ms=1000,
+                                     local_clients=local_clients)
+            clients = [server.create_client() for _ in range(4)]
+            self.assertEqual(isinstance(clients[0].response_queue, queue.Queue), local_clients)
+            server.start()
+
+            results = [None] * len(clients)
+
+            def request(i):
+                results[i] = clients[i].get_action(np.full(shape=(2, 3), fill_value=i, dtype=np.float32))
+
+            threads = [Thread(target=request, args=(i,)) for i in range(len(clients))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            server.stop()
+            # Response queues are closed and released on stop.
+            self.assertEqual(server.response_queues, [])
+
+            # Every client gets exactly its own slice of the batched result.
+            for i, result in enumerate(results):
+                self.assertTrue(np.array_equal(result, [3 * i, 3 * i]))
+            # Batches respect the max. batch size and fewer calls than requests are made.
+            self.assertTrue(all(size <= 8 for size in agent.batch_sizes))
+            self.assertEqual(sum(agent.batch_sizes), 8)
+            self.assertLess(len(agent.batch_sizes), 4)
+            self.assertEqual(server.get_metrics()["num_requests"], 4)
+
+    def test_process_clients(self):
+        server = InferenceServer(SumAgent(), min_batch_size=3, max_batch_size=16, timeout_ms=50)
+        out_queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=request_in_process,
+                args=(server.create_client(), np.ones(shape=(i + 1, 2)) * (i + 1), out_queue)
+            ) for i in range(3)
+        ]
+        server.start()
+        for process in processes:
+            process.start()
+        actions = sorted([out_queue.get(timeout=30) for _ in processes], key=len)
+        for process in processes:
+            process.join()
+        server.stop()
+
+        for i, action in enumerate(actions):
+            self.assertTrue(np.array_equal(action, np.full(shape=(i + 1,), fill_value=2 * (i + 1))))
@@ -0,0 +1,75 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+from rlgraph.execution.ray.apex import LocalApexExecutor
+from rlgraph.tests.test_util import config_from_path
+from rlgraph.utils.rlgraph_errors import RLGraphError
+
+
+class TestLocalApexExecutor(unittest.TestCase):
+    """
+    Tests the LocalApexExecutor which runs Apex-style workloads with local worker processes instead of Ray.
+    """
+    env_spec = dict(
+        type="grid-world",
+        world="2x2",
+        save_mode=False,
+        state_representation="xy"
+    )
+
+    def test_2x2_grid_world_with_multiple_workers(self):
+        agent_config = config_from_path("configs/apex_agent_for_2x2_gridworld.json")
+        # Float xy-states do not need flattening.
+        agent_config["preprocessing_spec"] = None
+        agent_config["execution_spec"]["ray_spec"]["executor_spec"]["num_sample_workers"] = 2
+        agent_config["execution_spec"]["ray_spec"]["executor_spec"]["num_replay_workers"] = 2
+        executor = LocalApexExecutor(
+            environment_spec=self.env_spec,
+            agent_config=agent_config,
+        )
+        try:
+            result = executor.execute_workload(workload=dict(
+                num_timesteps=2000, report_interval=100, report_interval_min_seconds=1)
+            )
+            print(result)
+            self.assertGreaterEqual(result["timesteps_executed"], 2000)
+            self.assertGreater(result["learner_updates"], 0)
+
+            # Both workers sampled and finished episodes.
+            all_results = executor.get_all_worker_results()
+            self.assertEqual(len(all_results), 2)
+            for worker_result in all_results:
+                self.assertGreater(sum(len(rewards) for rewards in worker_result["episode_rewards"]), 0)
+            self.assertGreater(executor.weight_syncs_executed, 0)
+            # Syncs go through the weight broadcaster.
+            self.assertGreater(result["weight_syncs"], 0)
+            self.assertGreater(result["weight_broadcast_bytes"], 0)
+        finally:
+            executor.terminate()
+        for worker in executor.ray_env_sample_workers:
+            self.assertFalse(worker.process.is_alive())
+
+    def test_env_sub_processes_not_supported(self):
+        agent_config = config_from_path("configs/apex_agent_for_2x2_gridworld.json")
+        agent_config["preprocessing_spec"] = None
+        agent_config["execution_spec"]["ray_spec"]["worker_spec"]["num_env_processes"] = 2
+        with self.assertRaises(RLGraphError):
+            LocalApexExecutor(environment_spec=self.env_spec, agent_config=agent_config)
@@ -0,0 +1,66 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from rlgraph.utils.numpy import n_step_returns
+
+
+class TestNStepReturns(unittest.TestCase):
+    """
+    Tests vectorized n-step post-processing of trajectory segments.
+    """
+    def test_non_terminal_segment(self):
+        rewards = [1.0, 2.0, 3.0, 4.0, 5.0]
+        terminals = [False] * 5
+        n_step_rewards, next_indices, n_step_terminals = n_step_returns(rewards, terminals, 3, 0.5)
+
+        # Last two records do not see a full horizon and are dropped.
+        self.assertTrue(np.allclose(n_step_rewards, [1.0 + 1.0 + 0.75, 2.0 + 1.5 + 1.0, 3.0 + 2.0 + 1.25]))
+        self.assertTrue(np.array_equal(next_indices, [2, 3, 4]))
+        self.assertFalse(np.any(n_step_terminals))
+
+    def test_terminal_segment(self):
+        rewards = [1.0, 1.0, 1.0, 1.0]
+        terminals = [False, False, False, True]
+        n_step_rewards, next_indices, n_step_terminals = n_step_returns(rewards, terminals, 3, 0.5)
+
+        # Rewards are not accumulated beyond the terminal, all records are kept.
+        self.assertTrue(np.allclose(n_step_rewards, [1.75, 1.75, 1.5, 1.0]))
+        self.assertTrue(np.array_equal(next_indices, [2, 3, 3, 3]))
+        self.assertTrue(np.array_equal(n_step_terminals, [False, True, True, True]))
+
+        # Episode cut off by a time limit: Segment end acts as terminal.
+        n_step_rewards, next_indices, n_step_terminals = n_step_returns(
+            rewards, [False] * 4, 3, 0.5, was_terminal=True
+        )
+        self.assertTrue(np.allclose(n_step_rewards, [1.75, 1.75, 1.5, 1.0]))
+        self.assertTrue(np.array_equal(n_step_terminals, [False, True, True, True]))
+
+    def test_multiple_episodes(self):
+        rewards = [1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+        terminals = [False, True, False, False, True, False]
+        n_step_rewards, next_indices, n_step_terminals = n_step_returns(rewards, terminals, 3, 0.5)
+
+        # The last record starts a new episode without a full horizon.
+        self.assertTrue(np.allclose(n_step_rewards, [1.5, 1.0, 1.75, 1.5, 1.0]))
+        self.assertTrue(np.array_equal(next_indices, [1, 1, 4, 4, 4]))
+        self.assertTrue(np.all(n_step_terminals))
@@ -20,6 +20,7 @@ from __future__ import print_function
 import unittest
 from time import sleep
 
+from rlgraph.execution.ray.ray_inference_server import create_inference_servers
 from rlgraph.execution.ray.ray_value_worker import RayValueWorker
 from rlgraph.execution.ray.ray_util import RayWeight
 from rlgraph.tests.test_util import recursive_assert_almost_equal, config_from_path
@@ -201,3 +202,32 @@ class TestRayWorker(unittest.TestCase):
         ray.wait([ret])
         print('Object store weight sync successful.')
 
+    def test_inference_server(self):
+        """
+        Tests workers sharing the agent of a node-local inference server.
+        """
+        env = Environment.from_spec(self.env_spec)
+        agent_config = config_from_path("configs/apex_agent_cartpole.json")
+        ray_spec = agent_config["execution_spec"].pop("ray_spec")
+        worker_spec = ray_spec["worker_spec"]
+        worker_spec["worker_sample_size"] = 50
+        worker_spec["use_inference_server"] = True
+
+        workers = [RayValueWorker.as_remote().remote(agent_config, worker_spec, self.env_spec) for _ in range(2)]
+        server_agent_config = dict(agent_config, state_space=env.state_space, action_space=env.action_space)
+        servers = create_inference_servers(workers, server_agent_config, dict(min_batch_size=1, timeout_ms=5))
+        # All workers run on this node and share one server.
+        self.assertEqual(len(set(servers)), 1)
+        ray.get([worker.set_inference_server.remote(server) for worker, server in zip(workers, servers)])
+
+        # Weights are synced once to the server.
+        local_agent = Agent.from_spec(agent_config, state_space=env.state_space, action_space=env.action_space)
+        ray.get(servers[0].set_weights.remote(RayWeight(local_agent.get_weights())))
+
+        results = ray.get([worker.execute_and_get_timesteps.remote(100, break_on_terminal=False)
+                           for worker in workers])
+        for result in results:
+            self.assertEqual(len(result.get_batch()["terminals"]), 100)
+        metrics = ray.get(servers[0].get_metrics.remote())
+        self.assertGreater(metrics["num_requests"], 0)
+        self.assertGreaterEqual(metrics["mean_batch_size"], 1.0)
@@ -0,0 +1,107 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from rlgraph.execution.ray.ray_util import RayWeightBroadcaster, RayWeightReceiver
+
+
+class TestRayWeightSync(unittest.TestCase):
+    """
+    Tests versioned and encoded weight payloads between broadcaster and workers (without Ray).
+    """
+    @staticmethod
+    def _get_weights(kernel, bias):
+        return dict(policy_weights=dict(kernel=np.array(kernel, dtype=np.float32),
+                                        bias=np.array(bias, dtype=np.float32)))
+
+    def _sync(self, broadcaster, worker, receiver):
+        ret = None
+        for payload_type in broadcaster.get_payloads(worker):
+            ret = receiver.receive(broadcaster.payloads[payload_type])
+        return ret
+
+    def test_versioning(self):
+        broadcaster = RayWeightBroadcaster()
+        receiver = RayWeightReceiver()
+        broadcaster.update(self._get_weights([1.0, 2.0], [0.5]))
+        policy_weights, vf_weights = self._sync(broadcaster, "worker", receiver)
+        self.assertIsNone(vf_weights)
+        self.assertTrue(np.array_equal(policy_weights["kernel"], [1.0, 2.0]))
+
+        # Worker already holds the current version.
+        self.assertEqual(broadcaster.get_payloads("worker"), [])
+        # Outdated payloads are not applied.
+        payload = broadcaster.payloads["keyframe"]
+        broadcaster.update(self._get_weights([1.5, 2.0], [0.5]))
+        self._sync(broadcaster, "worker", receiver)
+        self.assertIsNone(receiver.receive(payload))
+
+    def test_float16_delta_encoding(self):
+        broadcaster = RayWeightBroadcaster(weight_dtype="float16", delta_encoding=True, keyframe_interval=3)
+        receiver = RayWeightReceiver()
+        kernel = np.random.random(size=(64,)).astype(np.float32)
+        bias = np.random.random(size=(4,)).astype(np.float32)
+
+        broadcaster.update(self._get_weights(kernel, bias))
+        self.assertEqual(broadcaster.get_payloads("worker"), ["keyframe"])
+        receiver.receive(broadcaster.payloads["keyframe"])
+        self.assertEqual(broadcaster.payloads["keyframe"].nbytes, 68 * 2)
+
+        # Only the kernel changes -> Delta only contains the kernel.
+        for version in range(2, 4):
+            kernel = kernel + np.random.normal(scale=0.001, size=(64,)).astype(np.float32)
+            broadcaster.update(self._get_weights(kernel, bias))
+            self.assertEqual(broadcaster.get_payloads("worker"), ["delta"])
+            delta = broadcaster.payloads["delta"]
+            self.assertEqual(delta.policy_vars, ["kernel"])
+            policy_weights, _ = receiver.receive(delta)
+            self.assertEqual(receiver.version, version)
+            self.assertEqual(policy_weights["kernel"].dtype, np.float32)
+            # Deltas to the float16 keyframe keep the reconstruction error small.
+            np.testing.assert_allclose(policy_weights["kernel"], kernel, atol=1e-3)
+            np.testing.assert_allclose(policy_weights["bias"], bias, atol=1e-3)
+
+        # A worker without the keyframe first receives the keyframe, then the delta.
+        self.assertEqual(broadcaster.get_payloads("new-worker"), ["keyframe", "delta"])
+
+        # Keyframe interval reached -> New keyframe.
+        broadcaster.update(self._get_weights(kernel + 1.0, bias))
+        self.assertEqual(broadcaster.get_payloads("worker"), ["keyframe"])
+        policy_weights, _ = receiver.receive(broadcaster.payloads["keyframe"])
+        np.testing.assert_allclose(policy_weights["kernel"], kernel + 1.0, atol=1e-2)
+
+    def test_delta_encoding_with_weights_updated_in_place(self):
+        broadcaster = RayWeightBroadcaster(delta_encoding=True, keyframe_interval=10)
+        receiver = RayWeightReceiver()
+        # Weights returned as views of parameters which are updated in place (e.g. PyTorch).
+        weights = self._get_weights([1.0, 2.0], [0.5])
+        broadcaster.update(weights)
+        self._sync(broadcaster, "worker", receiver)
+
+        weights["policy_weights"]["kernel"] += 1.0
+        broadcaster.update(weights)
+        self.assertEqual(broadcaster.get_payloads("worker"), ["delta"])
+        delta = broadcaster.payloads["delta"]
+        self.assertEqual(delta.policy_vars, ["kernel"])
+        policy_weights, _ = receiver.receive(delta)
+        self.assertTrue(np.array_equal(policy_weights["kernel"], [2.0, 3.0]))
+        self.assertTrue(np.array_equal(policy_weights["bias"], [0.5]))
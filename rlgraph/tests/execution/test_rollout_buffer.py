@@ -0,0 +1,71 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from rlgraph.execution.rollout_buffer import RolloutBuffer
+from rlgraph.spaces import Dict, FloatBox, IntBox
+
+
+class TestRolloutBuffer(unittest.TestCase):
+    """
+    Tests in-place step writes and fragment slicing of the worker rollout buffer.
+    """
+    def test_fragments(self):
+        buffer = RolloutBuffer(num_environments=2, state_space=FloatBox(shape=(3,)), action_space=IntBox(4))
+        buffer.reset(num_timesteps=4)
+        for t in range(4):
+            buffer.insert(
+                states=np.full(shape=(2, 3), fill_value=t), actions=np.array([t, t + 1]),
+                rewards=[1.0, 2.0], terminals=[t == 1, False]
+            )
+            # Env 0 terminates at t=1.
+            if t == 1:
+                states, actions, rewards, next_states, terminals = buffer.get_fragment(0, np.full((1, 3), 10.0))
+                self.assertTrue(np.array_equal(states[:, 0], [0, 1]))
+                self.assertTrue(np.array_equal(next_states[:, 0], [1, 10]))
+                self.assertTrue(np.array_equal(actions, [0, 1]))
+                self.assertTrue(np.array_equal(terminals, [False, True]))
+
+        states, actions, rewards, next_states, terminals = buffer.get_fragment(0, np.full((3,), 20.0))
+        self.assertTrue(np.array_equal(states[:, 0], [2, 3]))
+        self.assertTrue(np.array_equal(next_states[:, 0], [3, 20]))
+        states, actions, rewards, next_states, terminals = buffer.get_fragment(1, np.full((3,), 30.0))
+        self.assertEqual(len(states), 4)
+        self.assertTrue(np.array_equal(actions, [1, 2, 3, 4]))
+        self.assertTrue(np.allclose(rewards, 2.0))
+
+        # Buffer grows for longer rollouts.
+        buffer.reset(num_timesteps=6)
+        self.assertEqual(buffer.states.shape, (2, 6, 3))
+
+    def test_container_actions(self):
+        action_space = Dict(a=IntBox(2), b=FloatBox(shape=(2,)), add_batch_rank=True)
+        buffer = RolloutBuffer(
+            num_environments=2, state_space=IntBox(5), action_space=action_space.flatten(scope_separator_at_start=False)
+        )
+        buffer.reset(num_timesteps=2)
+        actions = action_space.sample(size=2)
+        buffer.insert(states=np.array([1, 2]), actions=actions, rewards=[0.0, 0.0], terminals=[False, False])
+        _, fragment_actions, _, next_states, _ = buffer.get_fragment(1, 3)
+        for name, value in fragment_actions.items():
+            self.assertTrue(np.allclose(value[0], actions[name][1]))
+        self.assertTrue(np.array_equal(next_states, [3]))
@@ -50,6 +50,28 @@ class TestSyncBatchExecutor(unittest.TestCase):
         print("Finished executing workload:")
         print(result)
 
+    def test_ppo_learning_cartpole_pipelined_sampling(self):
+        """
+        Tests sync-batch ppo on cartpole with sample tasks kept in flight during updates.
+        """
+        env_spec = dict(
+            type="openai",
+            gym_env="CartPole-v0"
+        )
+        agent_config = config_from_path("configs/sync_batch_ppo_cartpole.json")
+        agent_config["execution_spec"]["ray_spec"]["executor_spec"]["pipelined_sampling"] = True
+        agent_config["execution_spec"]["ray_spec"]["executor_spec"]["max_policy_lag"] = 1
+
+        executor = SyncBatchExecutor(
+            environment_spec=env_spec,
+            agent_config=agent_config,
+        )
+        result = executor.execute_workload(workload=dict(num_timesteps=20000, report_interval=1000,
+                                                         report_interval_min_seconds=1))
+        print("Finished executing workload:")
+        print(result)
+        self.assertEqual(len(result["worker_sample_latencies"]), 2)
+
     def test_learning_2x2_grid_world_container_actions(self):
         """
         Tests sync batch container action functionality.
@@ -20,7 +20,6 @@ from __future__ import print_function
 import copy
 import inspect
 import re
-import time
 
 # from rlgraph.components.common.container_merger import ContainerMerger
 from rlgraph.spaces.space_utils import get_space_from_op
@@ -97,20 +96,17 @@ def rlgraph_api(api_method=None, *, component=None, name=None, returns=None,
             api_fn_name = name or re.sub(r'^_graph_fn_', "", wrapped_func.__name__)
             # Direct evaluation of function.
             if self.execution_mode == "define_by_run":
-                type(self).call_count += 1
-
-                start = time.perf_counter()
-                # Check with owner if extra args needed.
-                if api_fn_name in self.api_methods and self.api_methods[api_fn_name].add_auto_key_as_first_param:
-                    output = wrapped_func(self, "", *args, **kwargs)
-                else:
-                    output = wrapped_func(self, *args, **kwargs)
-
-                # Store runtime for this method.
-                type(self).call_times.append(  # Component.call_times
-                    (self.name, wrapped_func.__name__, time.perf_counter() - start)
-                )
-                return output
+                profiler = type(self).profiler  # Component.profiler
+                frame = profiler.start(self.name, wrapped_func.__name__) if profiler.enabled else None
+                try:
+                    # Check with owner if extra args needed.
+                    if api_fn_name in self.api_methods and self.api_methods[api_fn_name].add_auto_key_as_first_param:
+                        return wrapped_func(self, "", *args, **kwargs)
+                    else:
+                        return wrapped_func(self, *args, **kwargs)
+                finally:
+                    if frame is not None:
+                        profiler.stop(frame)
 
             api_method_rec = self.api_methods[api_fn_name]
 
@@ -375,11 +371,17 @@ def graph_fn(graph_fn=None, *, component=None, returns=None,
     def decorator_func(wrapped_func):
         def _graph_fn_wrapper(self, *args, **kwargs):
             if self.execution_mode == "define_by_run":
-                # Direct execution.
-                return self.graph_builder.execute_define_by_run_graph_fn(self, wrapped_func,  dict(
-                        flatten_ops=flatten_ops, split_ops=split_ops,
-                        add_auto_key_as_first_param=add_auto_key_as_first_param
-                        ), *args, **kwargs)
+                profiler = type(self).profiler  # Component.profiler
+                frame = profiler.start(self.name, wrapped_func.__name__) if profiler.enabled else None
+                try:
+                    # Direct execution.
+                    return self.graph_builder.execute_define_by_run_graph_fn(self, wrapped_func,  dict(
+                            flatten_ops=flatten_ops, split_ops=split_ops,
+                            add_auto_key_as_first_param=add_auto_key_as_first_param
+                            ), *args, **kwargs)
+                finally:
+                    if frame is not None:
+                        profiler.stop(frame)
             else:
                 # Wrap construction of graph functions with op records.
                 return graph_fn_wrapper(
@@ -33,7 +33,7 @@ def print_call_chain(profile_data, sort=True, filter_threshold=None):
     Prints a component call chain stdout. Useful to analyze define by run performance.
 
     Args:
-        profile_data (list): Component file data.
+        profile_data (list): Tuples of (component, method, duration), e.g. from `Profiler.get_call_chain()`.
         sort (bool): If true, sorts call sorted by call duration.
         filter_threshold (Optional[float]): Optionally specify an execution threshold in seconds (e.g. 0.01).
             All call entries below the threshold be dropped from the printout.
@@ -163,6 +163,9 @@ def parse_execution_spec(execution_spec):
             enable_timeline=False,
             # With which frequency do we write out a timeline file?
             timeline_frequency=1,
+            # In-graph input queues for API-methods, e.g. dict(api_methods=["update_from_external_batch"],
+            # capacity=2). Inputs enqueued via `prefetch` are then read by the API-method without a feed.
+            input_prefetching=None
         )
         execution_spec = default_dict(execution_spec, default_spec)
 
@@ -211,7 +214,13 @@ def parse_execution_spec(execution_spec):
             device_map={},
             # TODO potentially set to nproc?
             torch_num_threads=1,
-            OMP_NUM_THREADS=1
+            OMP_NUM_THREADS=1,
+            # Whether numpy inputs may be passed into the graph as torch views sharing their memory.
+            zero_copy_inputs=True,
+            # Enabling the define-by-run profiler (see `Component.profiler`)?
+            enable_profiler=False,
+            # Record individual calls for Chrome trace export?
+            enable_timeline=False
         )
         execution_spec = default_dict(execution_spec, default_spec)
 
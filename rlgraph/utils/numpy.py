@@ -186,3 +186,122 @@ def lstm_layer(x, weights, biases=None, initial_internal_states=None, time_major
             unrolled_outputs[:, t, :] = h_states
 
     return unrolled_outputs, (c_states, h_states)
+
+
+def n_step_returns(rewards, terminals, n_step, discount, was_terminal=False):
+    """
+    Computes n-step discounted rewards for a trajectory segment of one environment as a masked discounted
+    convolution: R_i = SUMj=0..h_i(discount^j * r_i+j), where the horizon h_i is (n_step - 1) or less if an
+    episode end lies closer.
+
+    Records at the end of the segment which neither see a full horizon nor an episode end are dropped. These are
+    always a suffix, so states/actions of the remaining records are the first `len(returned rewards)` ones.
+
+    Args:
+        rewards (Union[list,np.ndarray]): Rewards of the segment.
+        terminals (Union[list,np.ndarray]): Terminal flags of the segment.
+        n_step (int): Number of steps to accumulate rewards over.
+        discount (float): Discount factor.
+        was_terminal (bool): Whether the end of the segment is an episode end (e.g. a time limit) even if its last
+            terminal flag is not set.
+
+    Returns:
+        tuple:
+            - np.ndarray: The n-step discounted rewards.
+            - np.ndarray: For each record, the index of the record whose next-state is its n-step next-state.
+            - np.ndarray: The n-step terminal flags.
+    """
+    rewards = np.asarray(rewards, dtype=np.float32)
+    terminals = np.asarray(terminals, dtype=np.bool_)
+    length = len(rewards)
+    positions = np.arange(length)
+
+    # Index of the first episode end at or after each record.
+    no_end = length - 1 if was_terminal else length + n_step
+    ends = np.where(terminals, positions, no_end)
+    if length > 0:
+        ends = np.minimum.accumulate(ends[::-1])[::-1]
+    horizons = np.minimum(np.minimum(ends, length - 1) - positions, n_step - 1)
+    next_indices = positions + horizons
+
+    # Keep records which see their full horizon or reach an episode end.
+    num_records = np.count_nonzero((horizons == n_step - 1) | (next_indices == ends))
+
+    offsets = np.arange(n_step)
+    windows = positions[:num_records, None] + offsets
+    padded_rewards = np.concatenate([rewards, np.zeros(shape=(n_step - 1,), dtype=np.float32)])
+    weights = np.where(offsets <= horizons[:num_records, None], np.power(discount, offsets), 0.0)
+    n_step_rewards = np.sum(padded_rewards[windows] * weights, axis=1).astype(np.float32)
+
+    next_indices = next_indices[:num_records]
+    return n_step_rewards, next_indices, next_indices == ends[:num_records]
+
+
+def segmented_reverse_decayed_sum(values, sequence_indices, decay):
+    """
+    Vectorized form of the reverse scan of `SequenceHelper.reverse_apply_decays_to_sequence`, with identical
+    results: Values are scanned from last to first, the k-th scanned value is weighted by decay^length and added to
+    a running sum. After the k-th step, the running sum is reset if `sequence_indices[k]` is set (read in forward
+    order, as in the graph versions), after which lengths restart at 1.
+
+    The per sub-sequence running sums are computed as one cumulative sum minus the sum before the sub-sequence's
+    start (in float64).
+
+    Args:
+        values (Union[list,np.ndarray]): Values of shape [N, ...].
+        sequence_indices (Union[list,np.ndarray]): Flags of shape [N] denoting sub-sequence ends.
+        decay (float): The decay factor.
+
+    Returns:
+        np.ndarray: The decayed sums (float32) of shape [N, ...].
+    """
+    values = np.asarray(values)
+    num_values = len(values)
+    if num_values == 0:
+        return np.zeros(shape=values.shape, dtype=np.float32)
+    resets = np.asarray(sequence_indices).reshape((num_values,)).astype(np.bool_)
+    positions = np.arange(num_values)
+
+    # Scan step at which the running sum was last reset.
+    segment_starts = np.concatenate([[0], positions[:-1][resets[:-1]] + 1])
+    starts = segment_starts[np.concatenate([[0], np.cumsum(resets[:-1])])]
+    lengths = positions - starts + (starts > 0)
+
+    weights = np.power(float(decay), lengths.astype(np.float64))
+    weighted = values[::-1].astype(np.float64) * weights.reshape((num_values,) + (1,) * (values.ndim - 1))
+    sums = np.cumsum(weighted, axis=0)
+    # Subtract everything accumulated before the current sub-sequence.
+    previous = np.concatenate([np.zeros_like(sums[:1]), sums[:-1]], axis=0)
+    sums -= previous[starts]
+    return sums[::-1].astype(np.float32)
+
+
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """
+    Merges two sets of running moments, each given as sample count, mean and sum of squared deviations from the
+    mean (M2), via Chan et al.'s parallel algorithm:
+    https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
+
+    Merging a single sample (count 1, M2 0) is Welford's online update.
+
+    Args:
+        count_a (float): Number of samples of the first set.
+        mean_a (np.ndarray): Mean of the first set.
+        m2_a (np.ndarray): M2 of the first set.
+        count_b (float): Number of samples of the second set.
+        mean_b (np.ndarray): Mean of the second set.
+        m2_b (np.ndarray): M2 of the second set.
+
+    Returns:
+        tuple:
+            - float: The merged count.
+            - np.ndarray: The merged mean.
+            - np.ndarray: The merged M2.
+    """
+    count = count_a + count_b
+    if count == 0:
+        return count, mean_a, m2_a
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (count_b / count)
+    m2 = m2_a + m2_b + np.square(delta) * (count_a * count_b / count)
+    return count, mean, m2
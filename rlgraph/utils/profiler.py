@@ -0,0 +1,202 @@
+# Copyright 2018/2019 The RLgraph authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import deque
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class ProfileStats(object):
+    """
+    Aggregated timings of one (component, method) pair. Durations for percentiles are kept in a fixed-size
+    ring of the most recent calls.
+    """
+    def __init__(self, num_samples):
+        self.count = 0
+        self.total_time = 0.0
+        self.self_time = 0.0
+        self.max_time = 0.0
+        self.samples = np.zeros(shape=(num_samples,), dtype=np.float64)
+
+    def add(self, duration, self_duration):
+        self.samples[self.count % len(self.samples)] = duration
+        self.count += 1
+        self.total_time += duration
+        self.self_time += self_duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+    def percentile(self, q):
+        return float(np.percentile(self.samples[:min(self.count, len(self.samples))], q))
+
+    def to_dict(self):
+        return dict(
+            count=self.count,
+            total_time=self.total_time,
+            self_time=self.self_time,
+            mean_time=self.total_time / self.count,
+            max_time=self.max_time,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99)
+        )
+
+
+class Profiler(object):
+    """
+    Hierarchical profiler for define-by-run API-method and graph_fn calls.
+
+    Disabled by default, in which case each call only costs a flag check. When enabled, calls are aggregated into
+    per (component, method) count, total time (including nested calls), self time (excluding nested calls) and
+    duration percentiles. With `trace=True`, the most recent calls are additionally recorded as events that can be
+    exported to the Chrome trace format (chrome://tracing) or printed via `print_call_chain`.
+    """
+    def __init__(self, num_samples=1024, max_trace_events=100000):
+        """
+        Args:
+            num_samples (int): Number of most recent durations kept per (component, method) for percentiles.
+            max_trace_events (int): Maximum number of most recent trace events kept.
+        """
+        self.num_samples = num_samples
+        self.max_trace_events = max_trace_events
+        self.enabled = False
+        self.trace = False
+        self.stats = {}
+        self.trace_events = deque(maxlen=max_trace_events)
+        # Per-thread stacks of open frames [key, start time, time spent in nested calls].
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+
+    def enable(self, trace=False):
+        """
+        Args:
+            trace (bool): Whether to also record individual calls as trace events.
+        """
+        self.enabled = True
+        self.trace = trace
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """
+        Drops all collected statistics and trace events.
+        """
+        self.stats = {}
+        self.trace_events.clear()
+        self.origin = time.perf_counter()
+
+    def start(self, component_name, method_name):
+        """
+        Opens a frame for a call. Must be matched by a call to `stop` with the returned frame.
+
+        Args:
+            component_name (str): Name of the called Component.
+            method_name (str): Name of the called method.
+
+        Returns:
+            list: The opened frame.
+        """
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        frame = [(component_name, method_name), time.perf_counter(), 0.0]
+        stack.append(frame)
+        return frame
+
+    def stop(self, frame):
+        """
+        Closes a frame opened by `start` and records its timings.
+
+        Args:
+            frame (list): The frame returned by `start`.
+        """
+        end = time.perf_counter()
+        stack = self.local.stack
+        # Pop up to and including the frame in case nested frames were not closed (e.g. profiler toggled mid-call).
+        while stack and stack.pop() is not frame:
+            pass
+        key, start, child_time = frame
+        duration = end - start
+        if stack:
+            stack[-1][2] += duration
+
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = ProfileStats(self.num_samples)
+        stats.add(duration, duration - child_time)
+        if self.trace:
+            self.trace_events.append((key[0], key[1], start, duration, threading.get_ident()))
+
+    def get_stats(self, sort_by="total_time"):
+        """
+        Returns aggregated statistics.
+
+        Args:
+            sort_by (str): Statistic to sort by in descending order (e.g. "total_time", "self_time", "count").
+
+        Returns:
+            List[Tuple[str,dict]]: Tuples of "component.method" and its statistics dict.
+        """
+        ret = [("{}.{}".format(*key), stats.to_dict()) for key, stats in self.stats.items()]
+        return sorted(ret, key=lambda v: v[1][sort_by], reverse=True)
+
+    def print_stats(self, sort_by="total_time", top=None):
+        """
+        Prints aggregated statistics to stdout.
+
+        Args:
+            sort_by (str): Statistic to sort by.
+            top (Optional[int]): Only print the first `top` entries.
+        """
+        stats = self.get_stats(sort_by)[:top]
+        print("{:<60} {:>8} {:>12} {:>12} {:>12} {:>12}".format(
+            "Component.method", "count", "total (s)", "self (s)", "p50 (s)", "p99 (s)"
+        ))
+        for name, s in stats:
+            print("{:<60} {:>8} {:>12.6f} {:>12.6f} {:>12.6f} {:>12.6f}".format(
+                name, s["count"], s["total_time"], s["self_time"], s["p50"], s["p99"]
+            ))
+
+    def get_call_chain(self):
+        """
+        Returns:
+            List[Tuple[str,str,float]]: Recorded trace events as (component, method, duration) tuples in order of
+                completion, as consumed by `print_call_chain`.
+        """
+        return [(component, method, duration) for component, method, _, duration, _ in self.trace_events]
+
+    def export_chrome_trace(self, path):
+        """
+        Writes recorded trace events to a JSON file in the Chrome trace format.
+
+        Args:
+            path (str): Output file path.
+        """
+        pid = os.getpid()
+        events = [dict(
+            name="{}.{}".format(component, method), cat=component, ph="X",
+            ts=(start - self.origin) * 1e6, dur=duration * 1e6, pid=pid, tid=tid
+        ) for component, method, start, duration, tid in self.trace_events]
+        with open(path, "w") as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit="ms"), f)
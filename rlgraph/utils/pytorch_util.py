@@ -104,6 +104,40 @@ def pytorch_tile(tensor, n_tile, dim=0):
     return torch.index_select(tensor, dim, order_index)
 
 
+def pytorch_segmented_reverse_decayed_sum(values, sequence_indices, decay):
+    """
+    PyTorch version of `rlgraph.utils.numpy.segmented_reverse_decayed_sum`, see there for details.
+
+    Args:
+        values (torch.Tensor): Values of shape [N, ...].
+        sequence_indices (torch.Tensor): Flags of shape [N] denoting sub-sequence ends.
+        decay (float): The decay factor.
+
+    Returns:
+        torch.Tensor: The decayed sums (float32) of shape [N, ...].
+    """
+    values = torch.as_tensor(values).detach()
+    num_values = values.shape[0]
+    if num_values == 0:
+        return torch.zeros(values.shape, dtype=torch.float32)
+    resets = torch.as_tensor(sequence_indices).detach().reshape(num_values).bool()
+    positions = torch.arange(num_values)
+
+    # Scan step at which the running sum was last reset.
+    zero = torch.zeros(1, dtype=torch.long)
+    segment_starts = torch.cat([zero, positions[:-1][resets[:-1]] + 1])
+    starts = segment_starts[torch.cat([zero, torch.cumsum(resets[:-1].long(), 0)])]
+    lengths = positions - starts + (starts > 0).long()
+
+    weights = torch.pow(float(decay), lengths.double())
+    weighted = values.flip(0).double() * weights.reshape((num_values,) + (1,) * (values.dim() - 1))
+    sums = torch.cumsum(weighted, 0)
+    # Subtract everything accumulated before the current sub-sequence.
+    previous = torch.cat([torch.zeros_like(sums[:1]), sums[:-1]], 0)
+    sums = sums - previous[starts]
+    return sums.flip(0).float()
+
+
 # TODO remove when we have handled pytorch placeholder inference better.
 def get_input_channels(shape):
     """
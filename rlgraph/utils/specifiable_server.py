@@ -19,6 +19,8 @@ from __future__ import print_function
 
 import multiprocessing
 
+import numpy as np
+
 from rlgraph import get_backend
 from rlgraph.spaces.space import Space
 from rlgraph.spaces.containers import ContainerSpace
@@ -41,7 +43,7 @@ class SpecifiableServer(Specifiable):
     # Class instances get registered/deregistered here.
     INSTANCES = []
 
-    def __init__(self, specifiable_class, spec, output_spaces, shutdown_method=None):
+    def __init__(self, specifiable_class, spec, output_spaces, shutdown_method=None, shared_memory=False):
         """
         Args:
             specifiable_class (type): The class to use for constructing the Specifiable from spec. This class needs to be
@@ -72,6 +74,13 @@ class SpecifiableServer(Specifiable):
         else:
             self.output_spaces = output_spaces
         self.shutdown_method = shutdown_method
+        if shared_memory is True and not isinstance(self.output_spaces, dict):
+            raise RLGraphError("Shared-memory transport requires `output_spaces` to be a dict!")
+        self.shared_memory = shared_memory
+        # Method name -> list of (shared buffer, dtype, shape) per return value. Created in `start_server`.
+        self.shared_buffers = None
+        # Method name -> list of numpy views on `shared_buffers`.
+        self.shared_arrays = None
 
         # The process in which the Specifiable will run.
         self.process = None
@@ -145,6 +154,10 @@ class SpecifiableServer(Specifiable):
                         # If an error occurred, it'll be passed back through the pipe.
                         if isinstance(received_results, Exception):
                             raise received_results
+                        # Results were written to shared memory. Copy them out as tf may keep referencing the
+                        # returned arrays while the next call overwrites the buffers.
+                        elif isinstance(received_results, _InSharedMemory):
+                            return [np.array(array) for array in self.shared_arrays[method_name]]
                         elif received_results is not None:
                             return received_results
 
@@ -172,9 +185,12 @@ class SpecifiableServer(Specifiable):
     def start_server(self):
         # Create the in- and out- pipes to communicate with the proxy-Specifiable.
         self.out_pipe, self.in_pipe = multiprocessing.Pipe()
+        if self.shared_memory is True:
+            self.create_shared_buffers()
         # Create and start the process passing it the spec to construct the desired Specifiable object..
         self.process = multiprocessing.Process(
-            target=self.run_server, args=(self.specifiable_class, self.spec, self.in_pipe, self.shutdown_method)
+            target=self.run_server,
+            args=(self.specifiable_class, self.spec, self.in_pipe, self.shutdown_method, self.shared_buffers)
         )
         self.process.start()
 
@@ -185,6 +201,28 @@ class SpecifiableServer(Specifiable):
         if isinstance(result, Exception):
             raise result
 
+    def create_shared_buffers(self):
+        """
+        Allocates one shared-memory buffer per return value of each method whose return Spaces are all known.
+        """
+        self.shared_buffers = {}
+        self.shared_arrays = {}
+        for method_name, specs in self.output_spaces.items():
+            if specs is None:
+                continue
+            spaces = force_list(specs)
+            if any(space is None or space == 0 or isinstance(space, ContainerSpace) for space in spaces):
+                continue
+            buffers = []
+            for space in spaces:
+                dtype = np.dtype(convert_dtype(space.dtype, to="np"))
+                shape = tuple(space.shape)
+                buffers.append((
+                    multiprocessing.RawArray("b", max(1, int(np.prod(shape)) * dtype.itemsize)), dtype, shape
+                ))
+            self.shared_buffers[method_name] = buffers
+            self.shared_arrays[method_name] = [_buffer_as_array(buffer) for buffer in buffers]
+
     def stop_server(self):  #, session):
         try:
             self.out_pipe.send(None)
@@ -193,9 +231,14 @@ class SpecifiableServer(Specifiable):
             pass
         self.process.join()
 
-    def run_server(self, class_, spec, in_pipe, shutdown_method=None):
+    def run_server(self, class_, spec, in_pipe, shutdown_method=None, shared_buffers=None):
         proxy_object = None
+        method_name = None
+        inputs = None
         try:
+            shared_arrays = {} if shared_buffers is None else {
+                name: [_buffer_as_array(buffer) for buffer in buffers] for name, buffers in shared_buffers.items()
+            }
 
             # Construct the Specifiable object.
             proxy_object = class_.from_spec(spec)
@@ -220,8 +263,11 @@ class SpecifiableServer(Specifiable):
                 inputs = command[1:]
                 results = getattr(proxy_object, method_name)(*inputs)
 
-                # Send return values back to caller.
-                in_pipe.send(results)
+                # Write return values to shared memory if possible and signal the caller, otherwise send them back.
+                if method_name in shared_arrays and _write_shared(shared_arrays[method_name], results):
+                    in_pipe.send(_InSharedMemory())
+                else:
+                    in_pipe.send(results)
 
         # If something happens during the construction and proxy run phase, pass the exception back through our pipe.
         except Exception as e:
@@ -236,6 +282,41 @@ class SpecifiableServer(Specifiable):
             in_pipe.send(e)
 
 
+class _InSharedMemory(object):
+    """
+    Signal sent through the pipe instead of results that were written to shared memory.
+    """
+    pass
+
+
+def _buffer_as_array(shared_buffer):
+    raw_buffer, dtype, shape = shared_buffer
+    return np.frombuffer(raw_buffer, dtype=np.int8, count=int(np.prod(shape)) * dtype.itemsize).\
+        view(dtype).reshape(shape)
+
+
+def _write_shared(arrays, results):
+    """
+    Writes method results into shared arrays.
+
+    Returns:
+        bool: False if the results do not match the arrays (nothing or only part was written, the caller must
+            send the results through the pipe instead).
+    """
+    results = force_list(results) if len(arrays) > 1 else [results]
+    if len(results) != len(arrays):
+        return False
+    try:
+        for array, result in zip(arrays, results):
+            result = np.asarray(result)
+            if result.shape != array.shape:
+                return False
+            array[...] = result
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
 if get_backend() == "tf":
     class SpecifiableServerHook(tf.train.SessionRunHook):
         """
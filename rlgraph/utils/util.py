@@ -368,32 +368,53 @@ def strip_source_code(method, remove_nested_functions=True):
     return src
 
 
-def force_torch_tensors(params, requires_grad=False):
+def force_torch_tensors(params, requires_grad=False, dtype_cache=None, zero_copy=True):
     """
     Converts input params to torch tensors
     Args:
         params (list): Input args.
         requires_grad (bool): If gradients need to be computed from these arguments.
+        dtype_cache (Optional[dict]): Dict caching the torch dtype per input position (and flat key for dict
+            inputs). Passing the same dict for calls with the same signature (e.g. per API method) skips
+            repeated dtype resolution.
+        zero_copy (bool): Whether numpy arrays may be converted into torch tensors sharing their memory.
 
     Returns:
         list: List of Torch tensors.
     """
     if get_backend() == "pytorch":
         tensor_params = []
-        for param in params:
+        for i, param in enumerate(params):
             if isinstance(param, dict):
                 # Flatten dict.
                 param = define_by_run_flatten(param)
                 ret = {}
                 for key, value in param.items():
-                    ret[key] = convert_param(value, requires_grad)
+                    ret[key] = convert_param(value, requires_grad, dtype_cache, (i, key), zero_copy)
                 tensor_params.append(ret)
             else:
-                tensor_params.append(convert_param(param, requires_grad))
+                tensor_params.append(convert_param(param, requires_grad, dtype_cache, i, zero_copy))
         return tensor_params
 
 
-def convert_param(param, requires_grad):
+def convert_param(param, requires_grad, dtype_cache=None, cache_key=None, zero_copy=True):
+    """
+    Converts a single input param to a torch tensor.
+
+    Numpy arrays torch can use as they are (C-contiguous and writeable) are wrapped via `torch.from_numpy` without
+    copying. Bool arrays are reinterpreted as uint8.
+
+    Args:
+        param (any): The input param.
+        requires_grad (bool): If gradients need to be computed from this param (floats only).
+        dtype_cache (Optional[dict]): Cache mapping `cache_key` to the (source type, torch dtype) tuple last
+            resolved for it.
+        cache_key (any): Key of this param in `dtype_cache`.
+        zero_copy (bool): Whether numpy arrays may share their memory with the returned tensor.
+
+    Returns:
+        torch.Tensor: The converted param.
+    """
     if get_backend() == "pytorch":
         # Do nothing.
         if isinstance(param, torch.Tensor):
@@ -404,14 +425,28 @@ def convert_param(param, requires_grad):
             param_type = param.dtype
         else:
             param_type = type(param)
-        convert_type = convert_dtype(param_type, to="pytorch")
 
-        # PyTorch cannot convert from a np.bool_, must be uint.
-        if isinstance(param, np.ndarray) and param.dtype == np.bool_:
-            param = param.astype(np.uint8)
+        cached = dtype_cache.get(cache_key) if dtype_cache is not None else None
+        if cached is not None and cached[0] == param_type:
+            convert_type = cached[1]
+        else:
+            convert_type = convert_dtype(param_type, to="pytorch")
+            if dtype_cache is not None:
+                dtype_cache[cache_key] = (param_type, convert_type)
+        # Only floats can require grad.
+        requires_grad = requires_grad and convert_type in [torch.float32, torch.float, torch.float16]
 
-        if convert_type == torch.float32 or convert_type == torch.float or convert_type == torch.float16:
-            # Only floats can require grad.
-            return torch.tensor(param, dtype=convert_type, requires_grad=requires_grad)
+        if isinstance(param, np.ndarray):
+            # PyTorch cannot convert from a np.bool_, must be uint. Same item size -> reinterpret without a copy.
+            if param.dtype == np.bool_:
+                param = param.view(np.uint8)
+            if zero_copy and param.flags.c_contiguous and param.flags.writeable:
+                tensor = torch.from_numpy(param)
+                if tensor.dtype != convert_type:
+                    tensor = tensor.to(dtype=convert_type)
+                return tensor.requires_grad_() if requires_grad else tensor
+
+        if requires_grad:
+            return torch.tensor(param, dtype=convert_type, requires_grad=True)
         else:
-            return torch.tensor(param, dtype=convert_type)
\ No newline at end of file
+            return torch.tensor(param, dtype=convert_type)